@@ -0,0 +1,164 @@
+"""Cache of the Kafka bootstrap server addresses that the registries
+connect to.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from threading import Lock
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+__all__ = ("BootstrapServerCache",)
+
+
+class BootstrapServerCache:
+    """Resolved bootstrap server addresses, keyed by Kafka cluster and
+    listener name.
+
+    Resolving an address (see
+    `strimziregistryoperator.deployments.get_kafka_bootstrap_server`) takes
+    the whole Kafka resource, which is large once its ``status`` is
+    populated. The cache keeps only the resolved addresses, and the names of
+    the registries that use each one.
+
+    The cache is fed by the watch on Kafka resources (see `observe`). When
+    the listeners of a Kafka cluster change, its addresses are dropped and
+    the registries that used them are reported so that their Deployments
+    can be updated.
+    """
+
+    def __init__(self) -> None:
+        self._addresses: Dict[Tuple[str, str, str], str] = {}
+        self._registries: Dict[Tuple[str, str, str], Set[str]] = {}
+        self._fingerprints: Dict[Tuple[str, str], str] = {}
+        self._lock = Lock()
+        self.hits = 0
+        """Number of lookups answered by a cached address."""
+
+        self.misses = 0
+        """Number of lookups that required the Kafka resource."""
+
+        self.invalidations = 0
+        """Number of times the addresses of a cluster were dropped because
+        its listeners changed.
+        """
+
+    def lookup(
+        self,
+        *,
+        namespace: str,
+        cluster: str,
+        listener_name: str,
+        registry: str,
+    ) -> Optional[str]:
+        """Get the cached address of a listener for a registry, counting a
+        hit or a miss.
+
+        Returns
+        -------
+        address : `str` or `None`
+            The bootstrap server address, or `None` if it isn't cached. In
+            that case, resolve it and `put` it.
+        """
+        key = (namespace, cluster, listener_name)
+        with self._lock:
+            address = self._addresses.get(key)
+            if address is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._registries.setdefault(key, set()).add(registry)
+            return address
+
+    def put(
+        self,
+        kafka: Mapping[str, Any],
+        *,
+        namespace: str,
+        cluster: str,
+        listener_name: str,
+        registry: str,
+        address: str,
+    ) -> None:
+        """Cache the address of a listener for a registry.
+
+        Parameters
+        ----------
+        kafka : `dict`
+            The Kafka resource that the address was resolved from.
+        namespace : `str`
+            The namespace of the Kafka resource.
+        cluster : `str`
+            The name of the Kafka resource.
+        listener_name : `str`
+            The name of the listener.
+        registry : `str`
+            The name of the registry that uses the address.
+        address : `str`
+            The bootstrap server address.
+        """
+        key = (namespace, cluster, listener_name)
+        with self._lock:
+            self._fingerprints.setdefault(
+                (namespace, cluster), _fingerprint_listeners(kafka)
+            )
+            self._addresses[key] = address
+            self._registries.setdefault(key, set()).add(registry)
+
+    def observe(self, event_type: str, kafka: Mapping[str, Any]) -> List[str]:
+        """Update the cache from a watch event of a Kafka resource.
+
+        Returns
+        -------
+        registries : `list` of `str`
+            The registries that used an address of the cluster, if its
+            listeners changed. The list is empty otherwise.
+        """
+        cluster_key = (
+            kafka["metadata"]["namespace"],
+            kafka["metadata"]["name"],
+        )
+        with self._lock:
+            if event_type == "DELETED":
+                self._fingerprints.pop(cluster_key, None)
+                self._drop(cluster_key)
+                return []
+
+            fingerprint = _fingerprint_listeners(kafka)
+            previous = self._fingerprints.get(cluster_key)
+            self._fingerprints[cluster_key] = fingerprint
+            if previous is None or previous == fingerprint:
+                return []
+            self.invalidations += 1
+            return sorted(self._drop(cluster_key))
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache size and counters."""
+        with self._lock:
+            return {
+                "size": len(self._addresses),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, cluster_key: Tuple[str, str]) -> Set[str]:
+        """Drop the addresses of a cluster, returning their registries."""
+        registries: Set[str] = set()
+        for key in [k for k in self._addresses if k[:2] == cluster_key]:
+            del self._addresses[key]
+            registries |= self._registries.pop(key, set())
+        return registries
+
+
+def _fingerprint_listeners(kafka: Mapping[str, Any]) -> str:
+    """Hash the parts of a Kafka resource that bootstrap server addresses
+    are resolved from.
+    """
+    listeners = {
+        "spec": kafka.get("spec", {}).get("kafka", {}).get("listeners"),
+        "status": (kafka.get("status") or {}).get("listeners"),
+    }
+    encoded = json.dumps(listeners, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
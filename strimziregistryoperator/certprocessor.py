@@ -2,22 +2,54 @@
 based on the cluster's CA cert and the KafkaUser's key.
 """
 
-__all__ = ("create_secret", "create_truststore", "create_keystore")
-
+__all__ = (
+    "KEYSTORE_TYPES",
+    "apply_secret",
+    "create_secret",
+    "get_cluster_truststore",
+    "create_truststore",
+    "create_keystore",
+)
+
+import asyncio
 import base64
+import logging
 import secrets
 import string
 import subprocess
 import tempfile
-from functools import lru_cache
 from pathlib import Path
 
 import kopf
+from cryptography.hazmat.primitives.serialization import (
+    BestAvailableEncryption,
+    Encoding,
+    PrivateFormat,
+    load_der_private_key,
+)
+from kubernetes.client.rest import ApiException
+
+from . import jks, pkcs12, state
+from .k8s import FIELD_MANAGER, get_secret
+from .keystorecache import KeystoreBundle, compute_input_digest, fingerprint
+
+KEYSTORE_BACKENDS = ("python", "keytool")
+"""Engines that can build JKS truststores and keystores.
+
+``python`` builds the stores in-process with `strimziregistryoperator.jks`.
+``keytool`` calls out to the ``keytool`` and ``openssl`` command-line tools.
+"""
 
-from .k8s import get_secret
+KEYSTORE_TYPES = {"JKS": "jks", "PKCS12": "p12", "PEM": "pem"}
+"""Supported keystore and truststore formats, mapped to the file extension
+of the corresponding keys in the JKS Secret.
+
+Only ``JKS`` stores are built by a `KEYSTORE_BACKENDS` engine. ``PKCS12`` and
+``PEM`` stores are always written in-process.
+"""
 
 
-def create_secret(
+async def create_secret(
     *,
     kafka_username,
     namespace,
@@ -26,10 +58,12 @@ def create_secret(
     k8s_client,
     cluster_ca_secret=None,
     client_secret=None,
+    keystore_type="JKS",
+    jks_secret_name=None,
     logger=None,
 ):
     """Create and deploy a new Secret for the StrimziSchemaRegistry with
-    JKS-formatted key and truststores.
+    the key and truststores.
 
     Parameters
     ----------
@@ -53,121 +87,405 @@ def create_secret(
         The Kubernetes secret resource created by Strimzi with the certificates
         for the KafkaUser. This secret is named after ``registry_name``. If
         not set, this resource will be retrieved automatically for you.
+    keystore_type : `str`, optional
+        The format of the key and truststores; one of `KEYSTORE_TYPES`.
+        Default is ``JKS``. The stores are written to the ``keystore.<ext>``
+        and ``truststore.<ext>`` keys of the Secret.
+    jks_secret_name : `str`, optional
+        The name of the Secret with the stores. Defaults to
+        ``<kafka_username>-jks``; set it when several registries connect as
+        the same KafkaUser.
+
+    Returns
+    -------
+    secret : `dict`
+        The JKS Secret, including its current ``resourceVersion``.
+
+    Notes
+    -----
+    Kubernetes API calls run in threads and the stores are built in
+    `strimziregistryoperator.state.keystore_pool`, so this coroutine does not
+    block the event loop.
     """
     if logger is None:
-        logger = logger.getLogger(__name__)
+        logger = logging.getLogger(__name__)
 
     key_prefix = "strimziregistryoperator.roundtable.lsst.codes"
     ca_version_key = f"{key_prefix}/caSecretVersion"
     user_version_key = f"{key_prefix}/clientSecretVersion"
-
-    if cluster_ca_secret is None:
-        cluster_ca_secret = get_secret(
+    keystore_type_key = f"{key_prefix}/keystoreType"
+    digest_key = f"{key_prefix}/inputDigest"
+    extension = KEYSTORE_TYPES[keystore_type]
+
+    # The Strimzi secrets and the current JKS secret don't depend on each
+    # other, so read them concurrently
+    if jks_secret_name is None:
+        jks_secret_name = f"{kafka_username}-jks"
+    cluster_ca_result, client_result, jks_result = await asyncio.gather(
+        _read_secret(
+            cluster_ca_secret,
             namespace=namespace,
             name=f"{cluster}-cluster-ca-cert",
             k8s_client=k8s_client,
-        )
+        ),
+        _read_secret(
+            client_secret,
+            namespace=namespace,
+            name=kafka_username,
+            k8s_client=k8s_client,
+        ),
+        _read_secret(
+            None,
+            namespace=namespace,
+            name=jks_secret_name,
+            k8s_client=k8s_client,
+        ),
+        return_exceptions=True,
+    )
+    if isinstance(cluster_ca_result, BaseException):
+        raise cluster_ca_result
+    if isinstance(client_result, BaseException):
+        raise client_result
+    if cluster_ca_secret is None:
         logger.info("Retrieved cluster CA certificate")
+    if client_secret is None:
+        logger.info("Retrieved client certificates")
+    cluster_ca_secret = cluster_ca_result
+    client_secret = client_result
+
     cluster_secret_version = cluster_ca_secret["metadata"]["resourceVersion"]
-    logger.info(f"Cluster CA certificate version: {cluster_secret_version}")
     cluster_ca_cert = decode_secret_field(cluster_ca_secret["data"]["ca.crt"])
 
-    if client_secret is None:
-        client_secret = get_secret(
-            namespace=namespace, name=kafka_username, k8s_client=k8s_client
-        )
-        logger.info("Retrieved cluster CA certificate")
     client_secret_version = client_secret["metadata"]["resourceVersion"]
-    logger.info(f"Client certification version: {client_secret_version}")
     client_ca_cert = decode_secret_field(client_secret["data"]["ca.crt"])
     client_cert = decode_secret_field(client_secret["data"]["user.crt"])
     client_key = decode_secret_field(client_secret["data"]["user.key"])
 
-    jks_secret_name = f"{kafka_username}-jks"
+    fingerprints = compute_fingerprints(
+        cluster_ca_cert=cluster_ca_cert,
+        client_ca_cert=client_ca_cert,
+        client_cert=client_cert,
+        client_key=client_key,
+    )
+    input_digest = compute_input_digest(
+        cluster_ca_cert=cluster_ca_cert,
+        client_ca_cert=client_ca_cert,
+        client_cert=client_cert,
+        client_key=client_key,
+        keystore_type=keystore_type,
+    )
+    cache = state.keystore_cache
+
     try:
-        jks_secret = get_secret(
-            namespace=namespace, name=jks_secret_name, k8s_client=k8s_client
-        )
+        if isinstance(jks_result, BaseException):
+            raise jks_result
+        jks_secret = jks_result
         logger.info("Got JKS secret")
 
+        annotations = jks_secret["metadata"].get("annotations", {})
+        if all(key not in annotations for key in fingerprints):
+            # Secret written before certificate fingerprints were recorded;
+            # fall back to the versions of the Strimzi secrets.
+            legacy_up_to_date = (
+                annotations.get(ca_version_key) == cluster_secret_version
+                and annotations.get(user_version_key) == client_secret_version
+                # Secrets from before keystoreType was configurable are JKS
+                and annotations.get(keystore_type_key, "JKS") == keystore_type
+            )
+            reasons = (
+                []
+                if legacy_up_to_date
+                else ["Strimzi secret versions changed"]
+            )
+        else:
+            reasons = get_rebuild_reasons(
+                annotations, fingerprints, keystore_type=keystore_type
+            )
+
         if (
-            jks_secret["metadata"]["annotations"][ca_version_key]
-            == cluster_secret_version
-            and jks_secret["metadata"]["annotations"][user_version_key]
-            == client_secret_version
+            not reasons
+            and keystore_type == "PEM"
+            and "keystore_password" not in jks_secret.get("data", {})
         ):
-            # No need to build a new secret
-            logger.info("JKS secret is up-to-date")
+            # PEM secrets written before the private key was encrypted
+            reasons = ["the PEM private key is not encrypted"]
+
+        if not reasons:
+            # The secret already holds stores built from these inputs, so
+            # there's no need to build or write a new secret. Keep the stores
+            # in memory for later lookups.
+            bundle = KeystoreBundle.from_secret(
+                jks_secret, keystore_type=keystore_type, extension=extension
+            )
+            cache.record_persistent_hit(input_digest, bundle)
+            # Share this truststore with the cluster's other registries
+            state.truststore_cache.put(
+                cluster=f"{namespace}/{cluster}",
+                ca_fingerprint=fingerprint(cluster_ca_cert),
+                store_type=keystore_type,
+                truststore=bundle.truststore,
+                password=bundle.truststore_password,
+            )
+            logger.info("JKS secret is up-to-date (%s)", cache.stats())
             return jks_secret
+        logger.info("Rebuilding JKS secret: %s", "; ".join(reasons))
     except Exception:
         # Either the secret doesn't exist yet or it is outdated
         logger.exception("Couldn't check JKS secret; replacing it.")
         pass
 
-    # Try to delete the old secret (if it exists)
-    try:
-        logger.info("About to delete JKS secret")
-        delete_secret(
-            namespace=namespace, name=jks_secret_name, k8s_client=k8s_client
+    bundle = cache.get(input_digest)
+    if bundle is None:
+        truststore, truststore_password = await get_cluster_truststore(
+            cluster=f"{namespace}/{cluster}",
+            cluster_ca_cert=cluster_ca_cert,
+            store_type=keystore_type,
         )
-        logger.info("Deleted JKS secret")
-    except Exception:
-        logger.exception("Something failed with deleting JKS secret")
-        pass
-
-    truststore, truststore_password = create_truststore(cluster_ca_cert)
-    keystore, keystore_password = create_keystore(
-        client_ca_cert, client_cert, client_key
-    )
+        keystore, keystore_password = await state.keystore_pool.run(
+            create_keystore,
+            client_ca_cert,
+            client_cert,
+            client_key,
+            store_type=keystore_type,
+        )
+        bundle = KeystoreBundle(
+            keystore_type=keystore_type,
+            truststore=truststore,
+            truststore_password=truststore_password,
+            keystore=keystore,
+            keystore_password=keystore_password,
+        )
+        cache.put(input_digest, bundle)
+        logger.info("Built new stores (%s)", cache.stats())
+    else:
+        logger.info("Reusing cached stores (%s)", cache.stats())
 
-    # Build a new JKS-formatted secret
+    # Build a new secret with the key and truststores
     api_instance = k8s_client.CoreV1Api()
     secret = k8s_client.V1Secret()
     secret.metadata = k8s_client.V1ObjectMeta(name=jks_secret_name)
     secret.metadata.annotations = {
-        ca_version_key: cluster_secret_version,
-        user_version_key: client_secret_version,
+        **fingerprints,
+        keystore_type_key: keystore_type,
+        digest_key: input_digest,
     }
     secret.type = "Opaque"
     secret.data = {
-        "truststore.jks": base64.b64encode(truststore).decode("utf-8"),
-        "keystore.jks": base64.b64encode(keystore).decode("utf-8"),
-        "truststore_password": base64.b64encode(
-            truststore_password.encode("utf-8")
-        ).decode("utf-8"),
-        "keystore_password": base64.b64encode(
-            keystore_password.encode("utf-8")
-        ).decode("utf-8"),
+        f"truststore.{extension}": base64.b64encode(bundle.truststore).decode(
+            "utf-8"
+        ),
+        f"keystore.{extension}": base64.b64encode(bundle.keystore).decode(
+            "utf-8"
+        ),
     }
+    # PEM truststores are not password-protected
+    if bundle.truststore_password is not None:
+        secret.data["truststore_password"] = base64.b64encode(
+            bundle.truststore_password.encode("utf-8")
+        ).decode("utf-8")
+    if bundle.keystore_password is not None:
+        secret.data["keystore_password"] = base64.b64encode(
+            bundle.keystore_password.encode("utf-8")
+        ).decode("utf-8")
 
     # Set the owner on the secret. kopf.adopt only works on dicts
     secret_body = api_instance.api_client.sanitize_for_serialization(secret)
     kopf.adopt(secret_body, owner=owner)
 
-    api_instance.create_namespaced_secret(
-        namespace=namespace, body=secret_body
+    # Replace the secret in one write, so that it never goes missing
+    response = await asyncio.to_thread(
+        apply_secret,
+        namespace=namespace,
+        body=secret_body,
+        k8s_client=k8s_client,
     )
+    logger.info("Wrote JKS secret")
 
-    logger.info("Created new JKS secret")
+    # The written Secret has its resourceVersion. Cache it so that reads
+    # don't wait for its watch event.
+    created_secret = api_instance.api_client.sanitize_for_serialization(
+        response
+    )
+    state.resource_cache.put("secrets", created_secret)
+    return created_secret
+
+
+FINGERPRINT_ANNOTATIONS = {
+    "clusterCaCertFingerprint": "cluster CA certificate",
+    "clientCaCertFingerprint": "clients CA certificate",
+    "userCertFingerprint": "user certificate",
+    "userKeyFingerprint": "user key",
+}
+"""Annotations on the JKS Secret that record the SHA-256 fingerprints of its
+inputs (without the ``strimziregistryoperator.roundtable.lsst.codes/``
+prefix), mapped to descriptions of those inputs.
+"""
 
-    return api_instance.api_client.sanitize_for_serialization(secret)
+
+def compute_fingerprints(
+    *, cluster_ca_cert, client_ca_cert, client_cert, client_key
+):
+    """Compute the fingerprint annotations for the inputs of the JKS Secret.
+
+    Parameters
+    ----------
+    cluster_ca_cert : `str`
+        The ``ca.crt`` field of the ``<cluster>-cluster-ca-cert`` Secret.
+    client_ca_cert : `str`
+        The ``ca.crt`` field of the KafkaUser's Secret.
+    client_cert : `str`
+        The ``user.crt`` field of the KafkaUser's Secret.
+    client_key : `str`
+        The ``user.key`` field of the KafkaUser's Secret.
+
+    Returns
+    -------
+    fingerprints : `dict`
+        Mapping of annotation keys (see `FINGERPRINT_ANNOTATIONS`) to the
+        hex-encoded SHA-256 fingerprints of the inputs.
+    """
+    key_prefix = "strimziregistryoperator.roundtable.lsst.codes"
+    values = {
+        "clusterCaCertFingerprint": cluster_ca_cert,
+        "clientCaCertFingerprint": client_ca_cert,
+        "userCertFingerprint": client_cert,
+        "userKeyFingerprint": client_key,
+    }
+    return {
+        f"{key_prefix}/{name}": fingerprint(value)
+        for name, value in values.items()
+    }
+
+
+def get_rebuild_reasons(annotations, fingerprints, *, keystore_type):
+    """Explain why a JKS Secret needs to be rebuilt.
+
+    Parameters
+    ----------
+    annotations : `dict`
+        The annotations of the existing JKS Secret.
+    fingerprints : `dict`
+        The current fingerprints, from `compute_fingerprints`.
+    keystore_type : `str`
+        The configured keystore type.
+
+    Returns
+    -------
+    reasons : `list` of `str`
+        Descriptions of each change. The list is empty if the Secret is
+        up-to-date.
+    """
+    key_prefix = "strimziregistryoperator.roundtable.lsst.codes"
+    reasons = []
+    for key, value in fingerprints.items():
+        if annotations.get(key) != value:
+            name = key.rsplit("/", 1)[-1]
+            description = FINGERPRINT_ANNOTATIONS.get(name, name)
+            reasons.append(f"{description} changed")
+    existing_type = annotations.get(f"{key_prefix}/keystoreType", "JKS")
+    if existing_type != keystore_type:
+        reasons.append(
+            f"keystore type changed from {existing_type} to {keystore_type}"
+        )
+    return reasons
 
 
 def decode_secret_field(value):
     return base64.b64decode(value).decode("utf-8")
 
 
-def delete_secret(*, namespace, name, k8s_client):
+async def _read_secret(secret, *, namespace, name, k8s_client):
+    """Read a Secret, unless the caller already provided it."""
+    if secret is not None:
+        return secret
+    return await asyncio.to_thread(
+        get_secret, namespace=namespace, name=name, k8s_client=k8s_client
+    )
+
+
+def apply_secret(*, namespace, body, k8s_client):
+    """Replace a Secret, or create it if it doesn't exist.
+
+    Parameters
+    ----------
+    namespace : `str`
+        The Kubernetes namespace of the Secret.
+    body : `dict`
+        The complete Secret resource.
+    k8s_client
+        A Kubernetes client (see
+        `strimziregistryoperator.k8s.create_k8sclient`).
+
+    Returns
+    -------
+    secret : `kubernetes.client.V1Secret`
+        The Secret as written, including its new ``resourceVersion``.
+
+    Notes
+    -----
+    The replacement is a single write, so the Secret exists at all times.
+    Writes are attributed to `strimziregistryoperator.k8s.FIELD_MANAGER` in
+    the Secret's managed fields.
+    """
     v1_api = k8s_client.CoreV1Api()
-    secret = v1_api.read_namespaced_secret(name=name, namespace=namespace)
-    v1_api.delete_namespaced_secret(
-        name=name, namespace=namespace, body=secret
+    name = body["metadata"]["name"]
+    try:
+        return v1_api.replace_namespaced_secret(
+            name=name,
+            namespace=namespace,
+            body=body,
+            field_manager=FIELD_MANAGER,
+        )
+    except ApiException as e:
+        if e.status != 404:
+            raise
+    return v1_api.create_namespaced_secret(
+        namespace=namespace, body=body, field_manager=FIELD_MANAGER
+    )
+
+
+async def get_cluster_truststore(
+    *, cluster, cluster_ca_cert, store_type="JKS"
+):
+    """Get the truststore shared by every registry of a Kafka cluster.
+
+    The truststore is built once for each cluster CA certificate (see
+    `strimziregistryoperator.state.truststore_cache`) in the keystore pool,
+    so a CA rotation costs one truststore build no matter how many
+    registries there are.
+
+    Parameters
+    ----------
+    cluster : `str`
+        The Strimzi Kafka cluster, as ``<namespace>/<name>``.
+    cluster_ca_cert : `str`
+        The content of the Kafka cluster CA certificate.
+    store_type : `str`, optional
+        The truststore format; one of `KEYSTORE_TYPES`. Default is ``JKS``.
+
+    Returns
+    -------
+    truststore_content : `bytes`
+        The content of the truststore.
+    password : `str` or `None`
+        The password of the truststore (see `create_truststore`).
+    """
+
+    async def build():
+        return await state.keystore_pool.run(
+            create_truststore, cluster_ca_cert, store_type=store_type
+        )
+
+    return await state.truststore_cache.get_or_build(
+        cluster=cluster,
+        ca_fingerprint=fingerprint(cluster_ca_cert),
+        store_type=store_type,
+        build=build,
     )
 
 
-@lru_cache(maxsize=128)
-def create_truststore(cert, password=None):
-    """Create a JKS-formatted truststore using the cluster's CA certificate.
+def create_truststore(cert, password=None, backend=None, store_type="JKS"):
+    """Create a truststore using the cluster's CA certificate.
 
     Parameters
     ----------
@@ -176,29 +494,56 @@ def create_truststore(cert, password=None):
         a Kubernetes Secret named ``<cluster>-cluster-ca-cert``, and
         specifially the secret key named ``ca.crt``. See
         `get_cluster_ca_cert`.
+    password : `str`, optional
+        Password for the truststore. A random password is generated if not
+        set.
+    backend : `str`, optional
+        The engine that builds a JKS truststore; one of `KEYSTORE_BACKENDS`.
+        Defaults to `strimziregistryoperator.state.keystore_backend`.
+    store_type : `str`, optional
+        The truststore format; one of `KEYSTORE_TYPES`. Default is ``JKS``.
 
     Returns
     -------
     truststore_content : `bytes`
-        The content of a JKS truststore containing the cluster CA certificate.
-    password : `str`
-        The password generated for the truststore.
+        The content of a truststore containing the cluster CA certificate.
+    password : `str` or `None`
+        The password generated for the truststore. `None` for ``PEM``
+        truststores, which are not password-protected.
 
     Raises
     ------
     subprocess.CalledProcessError
         Raised if the call to :command:`keystore` results in a non-zero
-        exit status.
+        exit status (``keytool`` backend).
     RuntimeError
         Raised if the truststore is not generated.
-
-    Notes
-    -----
-    Internally this function calls out to the ``keytool`` command-line tool.
+    ValueError
+        Raised if the backend or store type is unknown or the certificate
+        can't be decoded.
     """
+    _check_store_type(store_type)
+    if store_type == "PEM":
+        pem = "".join(jks.der_to_pem(der) for der in jks.pem_to_der(cert))
+        if not pem:
+            raise ValueError("Could not find a PEM certificate")
+        return pem.encode("utf-8"), None
+
     if password is None:
         password = generate_password()
 
+    if store_type == "PKCS12":
+        return pkcs12.build_truststore(cert, password), password
+
+    backend = _resolve_backend(backend)
+    if backend == "python":
+        return jks.build_truststore(cert, password), password
+    else:
+        return _create_truststore_keytool(cert, password), password
+
+
+def _create_truststore_keytool(cert, password):
+    """Create a JKS truststore with the ``keytool`` command-line tool."""
     with tempfile.TemporaryDirectory() as tempdirname:
         tempdir = Path(tempdirname)
 
@@ -230,13 +575,19 @@ def create_truststore(cert, password=None):
             _print_result(result)
             raise RuntimeError("truststore was not generated")
 
-        return output_path.read_bytes(), password
+        return output_path.read_bytes()
 
 
-@lru_cache(maxsize=128)
-def create_keystore(user_ca_cert, user_cert, user_key, password=None):
-    """Create a JKS-formatted keystore using the client's CA certificate,
-    certificate, and key.
+def create_keystore(
+    user_ca_cert,
+    user_cert,
+    user_key,
+    password=None,
+    backend=None,
+    store_type="JKS",
+):
+    """Create a keystore using the client's CA certificate, certificate, and
+    key.
 
     Parameters
     ----------
@@ -252,11 +603,22 @@ def create_keystore(user_ca_cert, user_cert, user_key, password=None):
         The content of the KafkaUser's private key. You can get this from
         the Kubernetes Secret named after the KafkaUser and specifically the
         ``user.key`` field. See the `get_user_certs` function.
+    password : `str`, optional
+        Password for the keystore and its private key entry (for ``PEM``
+        keystores, the password of the encrypted private key). A random
+        password is generated if not set.
+    backend : `str`, optional
+        The engine that builds a JKS keystore; one of `KEYSTORE_BACKENDS`.
+        Defaults to `strimziregistryoperator.state.keystore_backend`.
+    store_type : `str`, optional
+        The keystore format; one of `KEYSTORE_TYPES`. Default is ``JKS``.
 
     Returns
     -------
     keytore_content : `bytes`
-        The content of a JKS keystore.
+        The content of the keystore. A ``PEM`` keystore is the encrypted
+        PKCS#8 private key followed by the certificate chain, which Kafka
+        reads with ``ssl.key.password``.
     password : `str`
         Password to protect the output keystore (``keystore_content``)
         with.
@@ -265,18 +627,54 @@ def create_keystore(user_ca_cert, user_cert, user_key, password=None):
     ------
     subprocess.CalledProcessError
         Raised if the calls to :command:`keystore` or :command:`openssl` result
-        in a non-zero exit status.
+        in a non-zero exit status (``keytool`` backend).
     RuntimeError
         Raised if the truststore is not generated.
-
-    Notes
-    -----
-    Internally this function calls out to the ``openssl`` and ``keytool``
-    command-line tool.
+    ValueError
+        Raised if the backend or store type is unknown or the certificates or
+        key can't be decoded.
     """
+    _check_store_type(store_type)
     if password is None:
         password = generate_password()
 
+    if store_type == "PEM":
+        # Kafka's file-based PEM keystores need an encrypted private key
+        key = load_der_private_key(jks.private_key_to_pkcs8(user_key), None)
+        pem = key.private_bytes(
+            Encoding.PEM,
+            PrivateFormat.PKCS8,
+            BestAvailableEncryption(password.encode("utf-8")),
+        ).decode("utf-8")
+        pem += "".join(
+            jks.der_to_pem(cert.public_bytes(Encoding.DER))
+            for cert in pkcs12.load_pem_chain([user_cert, user_ca_cert])
+        )
+        return pem.encode("utf-8"), password
+
+    if store_type == "PKCS12":
+        keystore = pkcs12.build_keystore(
+            user_key, [user_cert, user_ca_cert], password
+        )
+        return keystore, password
+
+    backend = _resolve_backend(backend)
+    if backend == "python":
+        keystore = jks.build_keystore(
+            user_key, [user_cert, user_ca_cert], password
+        )
+        return keystore, password
+    else:
+        keystore = _create_keystore_keytool(
+            user_ca_cert, user_cert, user_key, password
+        )
+        return keystore, password
+
+
+def _create_keystore_keytool(user_ca_cert, user_cert, user_key, password):
+    """Create a JKS keystore with the ``openssl`` and ``keytool``
+    command-line tools.
+    """
     with tempfile.TemporaryDirectory() as tempdirname:
         tempdir = Path(tempdirname)
 
@@ -341,7 +739,26 @@ def create_keystore(user_ca_cert, user_cert, user_key, password=None):
             _print_result(keytool_result)
             raise RuntimeError("keystore not generated by keytool")
 
-        return keystore_path.read_bytes(), password
+        return keystore_path.read_bytes()
+
+
+def _check_store_type(store_type):
+    if store_type not in KEYSTORE_TYPES:
+        raise ValueError(
+            f"Unknown keystore type {store_type!r}. Use one of "
+            f"{', '.join(KEYSTORE_TYPES)}."
+        )
+
+
+def _resolve_backend(backend):
+    if backend is None:
+        backend = state.keystore_backend
+    if backend not in KEYSTORE_BACKENDS:
+        raise ValueError(
+            f"Unknown keystore backend {backend!r}. Use one of "
+            f"{', '.join(KEYSTORE_BACKENDS)}."
+        )
+    return backend
 
 
 def _print_result(result):
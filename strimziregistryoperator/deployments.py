@@ -6,7 +6,16 @@ from typing import Any, Dict, Mapping, Optional
 
 import kopf
 
-__all__ = ["get_kafka_bootstrap_server", "create_deployment", "create_service"]
+from .certprocessor import KEYSTORE_TYPES
+from .k8s import FIELD_MANAGER
+
+__all__ = [
+    "get_kafka_bootstrap_server",
+    "create_deployment",
+    "create_deployment_patch",
+    "create_service",
+    "update_deployment",
+]
 
 
 def get_kafka_bootstrap_server(kafka, *, listener_name):
@@ -137,6 +146,7 @@ def create_deployment(
     registry_mem_request: Optional[str],
     compatibility_level: str,
     security_protocol: str,
+    keystore_type: str = "JKS",
 ) -> Dict[str, Any]:
     """Create the JSON resource for a Deployment of the Confluence Schema
     Registry.
@@ -178,6 +188,9 @@ def create_deployment(
     security_protocol : `str`
         The Kafka store security policy. Can be SSL, PLAINTEXT, SASL_PLAINTEXT,
         or SASL_SSL.
+    keystore_type : `str`
+        The format of the keystore and truststore in the Secret: JKS, PKCS12,
+        or PEM.
 
     Returns
     -------
@@ -197,6 +210,7 @@ def create_deployment(
         registry_mem_request=registry_mem_request,
         compatibility_level=compatibility_level,
         security_protocol=security_protocol,
+        keystore_type=keystore_type,
     )
 
     # The pod template
@@ -249,6 +263,7 @@ def create_container_spec(
     registry_mem_request: Optional[str],
     compatibility_level: str,
     security_protocol: str,
+    keystore_type: str = "JKS",
 ) -> Dict[str, Any]:
     """Create the container spec for the Schema Registry deployment.
 
@@ -283,7 +298,13 @@ def create_container_spec(
     security_protocol : `str`
         The Kafka store security policy. Can be SSL, PLAINTEXT, SASL_PLAINTEXT,
         or SASL_SSL.
+    keystore_type : `str`
+        The format of the keystore and truststore in the Secret: JKS, PKCS12,
+        or PEM. PEM truststores are not password-protected, and PEM
+        keystores hold an encrypted private key, so the store password
+        variables are replaced by the private key password.
     """
+    extension = KEYSTORE_TYPES[keystore_type]
     registry_env = [
         {
             "name": "SCHEMA_REGISTRY_HOST_NAME",
@@ -309,35 +330,62 @@ def create_container_spec(
         },
         {
             "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_LOCATION",
-            "value": "/var/schemaregistry/keystore.jks",
+            "value": f"/var/schemaregistry/keystore.{extension}",
         },
         {
-            "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_PASSWORD",
-            "valueFrom": {
-                "secretKeyRef": {
-                    "name": secret_name,
-                    "key": "keystore_password",
-                }
-            },
+            "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_TYPE",
+            "value": keystore_type,
         },
         {
             "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_LOCATION",
-            "value": "/var/schemaregistry/truststore.jks",
+            "value": f"/var/schemaregistry/truststore.{extension}",
         },
         {
-            "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_PASSWORD",
-            "valueFrom": {
-                "secretKeyRef": {
-                    "name": secret_name,
-                    "key": "truststore_password",
-                }
-            },
+            "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_TYPE",
+            "value": keystore_type,
         },
         {
             "name": "SCHEMA_REGISTRY_KAFKASTORE_SECURITY_PROTOCOL",
             "value": security_protocol,
         },
     ]
+    if keystore_type == "PEM":
+        registry_env.append(
+            {
+                "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEY_PASSWORD",
+                "valueFrom": {
+                    "secretKeyRef": {
+                        "name": secret_name,
+                        "key": "keystore_password",
+                    }
+                },
+            }
+        )
+    else:
+        registry_env.extend(
+            [
+                {
+                    "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_PASSWORD",
+                    "valueFrom": {
+                        "secretKeyRef": {
+                            "name": secret_name,
+                            "key": "keystore_password",
+                        }
+                    },
+                },
+                {
+                    "name": (
+                        "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_PASSWORD"
+                    ),
+                    "valueFrom": {
+                        "secretKeyRef": {
+                            "name": secret_name,
+                            "key": "truststore_password",
+                        }
+                    },
+                },
+            ]
+        )
 
     registry_container = {
         "name": "server",
@@ -430,17 +478,64 @@ def create_service(
     return s
 
 
-def update_deployment(
-    *, deployment, secret_version, k8s_client, name, namespace
-):
-    """Update the schema registry deploymeent with a new Secret version
-    to trigger a refresh of all its pods.
+def create_deployment_patch(
+    *, secret_version: str, resource_version: Optional[str] = None
+) -> Dict[str, Any]:
+    """Create a patch that points the Schema Registry deployment's pods at a
+    new version of the JKS Secret.
+
+    Parameters
+    ----------
+    secret_version : `str`
+        The ``resourceVersion`` of the Secret containing the JKS-formatted
+        keystore and truststore.
+    resource_version : `str`, optional
+        If set, the ``resourceVersion`` that the Deployment must have for the
+        patch to apply. The API server rejects the patch with a conflict if
+        the Deployment changed since.
+
+    Returns
+    -------
+    patch : `dict`
+        A merge patch that only sets the ``jksVersion`` annotation of the pod
+        template.
     """
     key_prefix = "strimziregistryoperator.roundtable.lsst.codes"
-    secret_version_key = f"{key_prefix}/jksVersion"
-    deployment.metadata.annotations[secret_version_key] = secret_version
+    patch: Dict[str, Any] = {
+        "spec": {
+            "template": {
+                "metadata": {
+                    "annotations": {f"{key_prefix}/jksVersion": secret_version}
+                }
+            }
+        }
+    }
+    if resource_version is not None:
+        patch["metadata"] = {"resourceVersion": resource_version}
+    return patch
 
+
+def update_deployment(
+    *,
+    secret_version: str,
+    k8s_client: Any,
+    name: str,
+    namespace: str,
+    resource_version: Optional[str] = None,
+) -> Any:
+    """Update the schema registry deployment with a new Secret version
+    to trigger a refresh of all its pods.
+
+    Only the ``jksVersion`` annotation of the pod template is patched (see
+    `create_deployment_patch`), so fields managed by other controllers are
+    left alone.
+    """
     apps_api = k8s_client.AppsV1Api()
-    apps_api.patch_namespaced_deployment(
-        name=name, namespace=namespace, body=deployment
+    return apps_api.patch_namespaced_deployment(
+        name=name,
+        namespace=namespace,
+        body=create_deployment_patch(
+            secret_version=secret_version, resource_version=resource_version
+        ),
+        field_manager=FIELD_MANAGER,
     )
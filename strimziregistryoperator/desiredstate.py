@@ -0,0 +1,236 @@
+"""Hashing of the desired state of a registry's resources, for cheap
+level-triggered reconciliation.
+
+The operator stamps each Deployment and Service that it writes with a hash
+of the desired resource (see `stamp_state_hash`). A periodic reconcile
+rebuilds the desired resources and compares them with the live ones (see
+`get_drift`), so that it only writes when the operator's desired state
+changed or when the live resource was modified by someone else.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional
+
+from kubernetes.utils import parse_quantity
+
+__all__ = (
+    "DESIRED_STATE_HASH_KEY",
+    "compute_state_hash",
+    "create_json_patch",
+    "get_drift",
+    "project",
+    "stamp_state_hash",
+)
+
+DESIRED_STATE_HASH_KEY = (
+    "strimziregistryoperator.roundtable.lsst.codes/desiredStateHash"
+)
+"""The annotation that records the hash of the desired state of a resource.
+"""
+
+
+def compute_state_hash(resource: Mapping[str, Any]) -> str:
+    """Compute the hash of a resource, ignoring its desired-state hash
+    annotation.
+
+    Returns
+    -------
+    digest : `str`
+        Hex-encoded SHA-256 digest of the resource's canonical JSON form.
+    """
+    resource = _strip_state_hash(resource)
+    encoded = json.dumps(
+        resource, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def stamp_state_hash(resource: Mapping[str, Any]) -> Dict[str, Any]:
+    """Get a copy of a desired resource that is annotated with its hash
+    (see `DESIRED_STATE_HASH_KEY`).
+    """
+    stamped = copy.deepcopy(dict(resource))
+    metadata = stamped.setdefault("metadata", {})
+    annotations = metadata.get("annotations") or {}
+    annotations[DESIRED_STATE_HASH_KEY] = compute_state_hash(resource)
+    metadata["annotations"] = annotations
+    return stamped
+
+
+def project(live: Any, desired: Any) -> Any:
+    """Reduce a live resource to the fields that the desired resource sets.
+
+    Kubernetes adds defaults, status, and bookkeeping metadata to every
+    resource, so the live resource is never equal to the desired one. Its
+    projection is, unless a field that the operator sets was modified.
+
+    Parameters
+    ----------
+    live
+        The live resource, or a field of it.
+    desired
+        The desired resource, or the corresponding field.
+
+    Returns
+    -------
+    projection
+        ``live``, keeping only the keys of the mappings that are in
+        ``desired``. Lists are projected element by element. Resource
+        quantities that the API server normalized, such as a ``cpu`` of
+        ``500m`` for ``0.5``, are projected to their desired form.
+    """
+    return _project(live, desired, "")
+
+
+def _project(live: Any, desired: Any, path: str) -> Any:
+    if isinstance(desired, Mapping) and isinstance(live, Mapping):
+        return {
+            key: _project(live.get(key), value, f"{path}/{key}")
+            for key, value in desired.items()
+        }
+    if isinstance(desired, list) and isinstance(live, list):
+        if len(live) != len(desired):
+            return live
+        return [
+            _project(lv, dv, f"{path}/{index}")
+            for index, (lv, dv) in enumerate(zip(live, desired))
+        ]
+    if _is_quantity_path(path) and _is_same_quantity(live, desired):
+        return desired
+    return live
+
+
+def get_drift(
+    live: Mapping[str, Any], desired: Mapping[str, Any]
+) -> Optional[str]:
+    """Check whether a live resource needs to be written to reach its
+    desired state.
+
+    Parameters
+    ----------
+    live : `dict`
+        The live resource.
+    desired : `dict`
+        The desired resource, stamped by `stamp_state_hash`.
+
+    Returns
+    -------
+    reason : `str` or `None`
+        Why the live resource differs from the desired one, or `None` if it
+        is up to date.
+    """
+    desired_hash = _get_state_hash(desired)
+    if desired_hash is None:
+        desired_hash = compute_state_hash(desired)
+    if _get_state_hash(live) != desired_hash:
+        return "the desired state changed"
+    if compute_state_hash(project(live, _strip_state_hash(desired))) != (
+        desired_hash
+    ):
+        return "the live resource was modified"
+    return None
+
+
+def create_json_patch(
+    live: Mapping[str, Any], desired: Mapping[str, Any]
+) -> List[Dict[str, Any]]:
+    """Create the smallest JSON patch that brings the fields set by the
+    desired resource to their desired values.
+
+    Fields that only exist in the live resource, such as defaults and fields
+    managed by other controllers, are left alone.
+
+    Parameters
+    ----------
+    live : `dict`
+        The live resource.
+    desired : `dict`
+        The desired resource.
+
+    Returns
+    -------
+    operations : `list` of `dict`
+        The JSON patch (RFC 6902) operations. The patch is empty if the
+        resource is up to date. Otherwise, it starts with a ``test`` of the
+        live ``resourceVersion``, so the patch fails with a conflict if the
+        resource changed since it was read.
+    """
+    operations: List[Dict[str, Any]] = []
+    _diff(live, desired, "", operations)
+    resource_version = (live.get("metadata") or {}).get("resourceVersion")
+    if operations and resource_version is not None:
+        operations.insert(
+            0,
+            {
+                "op": "test",
+                "path": "/metadata/resourceVersion",
+                "value": resource_version,
+            },
+        )
+    return operations
+
+
+def _diff(
+    live: Any, desired: Any, path: str, operations: List[Dict[str, Any]]
+) -> None:
+    if isinstance(desired, Mapping) and isinstance(live, Mapping):
+        for key, value in desired.items():
+            child_path = f"{path}/{_escape_pointer(key)}"
+            if key not in live:
+                operations.append(
+                    {"op": "add", "path": child_path, "value": value}
+                )
+            else:
+                _diff(live[key], value, child_path, operations)
+    elif (
+        isinstance(desired, list)
+        and isinstance(live, list)
+        and len(desired) == len(live)
+    ):
+        for index, (lv, dv) in enumerate(zip(live, desired)):
+            _diff(lv, dv, f"{path}/{index}", operations)
+    elif _project(live, desired, path) != desired:
+        # Scalars, and lists whose length changed, are replaced as a whole
+        operations.append({"op": "replace", "path": path, "value": desired})
+
+
+def _is_quantity_path(path: str) -> bool:
+    """Check whether a path leads to a resource quantity, such as the
+    ``cpu`` limit of a container.
+    """
+    return "/resources/limits/" in path or "/resources/requests/" in path
+
+
+def _is_same_quantity(live: Any, desired: Any) -> bool:
+    try:
+        return parse_quantity(live) == parse_quantity(desired)
+    except (TypeError, ValueError):
+        return False
+
+
+def _escape_pointer(key: str) -> str:
+    """Escape a key for a JSON pointer (RFC 6901)."""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _get_state_hash(resource: Mapping[str, Any]) -> Optional[str]:
+    metadata = resource.get("metadata") or {}
+    annotations = metadata.get("annotations") or {}
+    return annotations.get(DESIRED_STATE_HASH_KEY)
+
+
+def _strip_state_hash(resource: Mapping[str, Any]) -> Dict[str, Any]:
+    """Get a copy of a resource without its desired-state hash annotation,
+    dropping the annotations altogether if that was the only one.
+    """
+    stripped = copy.deepcopy(dict(resource))
+    metadata = stripped.get("metadata")
+    if metadata and metadata.get("annotations"):
+        metadata["annotations"].pop(DESIRED_STATE_HASH_KEY, None)
+        if not metadata["annotations"]:
+            del metadata["annotations"]
+    return stripped
@@ -1,9 +1,17 @@
 """Kopf handlers for the strimzi-registry-operator.
 """
 
-from ..startup import start_operator
-
-start_operator()
-
 from .createregistry import create_registry  # noqa
+from .deleteregistry import delete_registry  # noqa
+from .lifecycle import (  # noqa
+    shutdown_k8sclient,
+    shutdown_keystore_pool,
+    start_registry_resync,
+)
+from .reconcileregistry import (  # noqa
+    reconcile_registry,
+    refresh_bootstrap_servers,
+)
+from .resourcewatcher import cache_secret  # noqa
 from .secretwatcher import handle_secret_change  # noqa
+from .updateregistry import resume_registry, update_registry  # noqa
@@ -1,23 +1,16 @@
 """Kopf handler for the creation of a StrimziSchemaRegistry."""
 
-from __future__ import annotations
-
-from typing import Dict, Optional
-
 import kopf
 
 from .. import state
-from ..certprocessor import create_secret
-from ..deployments import (
-    create_deployment,
-    create_service,
-    get_kafka_bootstrap_server,
-)
-from ..k8s import create_k8sclient, get_deployment, get_secret, get_service
+from ..provisioning import deploy_registry
+from ..registryindex import registry_key
 
 
 @kopf.on.create("roundtable.lsst.codes", "v1beta1", "strimzischemaregistries")
-def create_registry(spec, meta, namespace, name, uid, logger, body, **kwargs):
+async def create_registry(
+    spec, meta, namespace, name, uid, logger, body, **kwargs
+):
     """Handle creation of a StrimziSchemaRegistry resource by deploying a
     new Schema Registry.
 
@@ -38,183 +31,22 @@ def create_registry(spec, meta, namespace, name, uid, logger, body, **kwargs):
         The full body of the ``StrimziSchemaRegistry`` as a read-only dict.
     logger
         The kopf logger.
-    """
-
-    k8s_client = create_k8sclient()
-    k8s_apps_v1_api = k8s_client.AppsV1Api()
-    k8s_cr_api = k8s_client.CustomObjectsApi()
-    k8s_core_v1_api = k8s_client.CoreV1Api()
-
-    # Get configurations from StrimziSchemaRegistry
-    try:
-        strimzi_api_version = spec["strimziVersion"]
-    except KeyError:
-        try:
-            strimzi_api_version = spec["strimzi-version"]
-            logger.warning(
-                "The strimzi-version configuration is deprecated. "
-                "Use strimziVersion instead."
-            )
-        except KeyError:
-            strimzi_api_version = "v1beta2"
-            logger.warning(
-                "StrimziSchemaRegistry %s is missing a strimziVersion, "
-                "using default %s",
-                name,
-                strimzi_api_version,
-            )
-
-    try:
-        listener_name = spec["listener"]
-    except KeyError:
-        listener_name = "tls"
-        logger.warning(
-            "StrimziSchemaRegistry %s is missing a listener name, "
-            "using default %s",
-            name,
-            listener_name,
-        )
-
-    service_type = spec.get("serviceType", "ClusterIP")
-
-    registry_image = spec.get(
-        "registryImage", "confluentinc/cp-schema-registry"
-    )
-
-    registry_image_tag = spec.get("registryImageTag", "7.2.1")
-
-    # Limits and requests can be None so that they are omitted from the
-    # registry's deployment specification
-    registry_cpu_limit = get_nullable(spec, "cpuLimit")
-    registry_cpu_request = get_nullable(spec, "cpuRequest")
-    registry_mem_limit = get_nullable(spec, "memoryLimit")
-    registry_mem_request = get_nullable(spec, "memoryRequest")
-
-    # Additional schema Registry configurations
-    registry_compatibility_level = spec.get("compatibilitylevel", "forward")
-    security_protocol = spec.get("securityProtocol", "SSL")
-
-    logger.info(
-        "Creating a new Schema Registry deployment: %s with listener=%s "
-        "(security protocol=%s) and strimzi-version=%s serviceType=%s "
-        "image=%s:%s",
-        name,
-        listener_name,
-        security_protocol,
-        strimzi_api_version,
-        service_type,
-        registry_image,
-        registry_image_tag,
-    )
-
-    # Get the name of the Kafka cluster associated with the
-    # StrimziSchemaRegistry's associated strimzi KafkaUser resource.
-    # The StrimziSchemaRegistry and its KafkaUser have the same name.
-    kafkauser = k8s_cr_api.get_namespaced_custom_object(
-        group="kafka.strimzi.io",
-        version=strimzi_api_version,
-        namespace=namespace,
-        plural="kafkausers",
-        name=name,  # assume StrimziSchemaRegistry name matches
-    )
-    cluster_name = kafkauser["metadata"]["labels"]["strimzi.io/cluster"]
 
-    # Get the Kafka bootstrap server corresponding to the configured
-    # Kafka listener name.
-    kafka = k8s_cr_api.get_namespaced_custom_object(
-        group="kafka.strimzi.io",
-        version=strimzi_api_version,
-        namespace=namespace,
-        plural="kafkas",
-        name=cluster_name,
-    )
-    bootstrap_server = get_kafka_bootstrap_server(
-        kafka, listener_name=listener_name
-    )
-
-    # Create the JKS-formatted truststore/keystore secrets
-    secret = create_secret(
-        kafka_username=name,  # assume the StrimziSchemaRegistry name matches
+    Notes
+    -----
+    The deployment runs in `state.refresh_queue`, so it never overlaps with
+    a certificate refresh of the same registry, and failures are retried with
+    backoff.
+    """
+    key = registry_key(namespace, name)
+    await state.refresh_queue.submit(
+        f"{key}/create",
+        deploy_registry,
+        group=key,
+        debounce=0,
+        spec=spec,
         namespace=namespace,
-        cluster=cluster_name,
-        owner=body,
-        k8s_client=k8s_client,
+        name=name,
         logger=logger,
+        body=body,
     )
-    secret_name = secret["metadata"]["name"]
-
-    # Get the secret so now it has the resourceVersion metadata
-    secret_body = get_secret(
-        name=secret_name, namespace=namespace, k8s_client=k8s_client
-    )
-    secret_version = secret_body["metadata"]["resourceVersion"]
-
-    deployment_exists = False
-    service_exists = False
-
-    try:
-        get_deployment(name=name, namespace=namespace, k8s_client=k8s_client)
-        deployment_exists = True
-    except Exception:
-        logger.exception("Did not retrieve existing deployment")
-
-    # Create the Schema Registry deployment
-    if not deployment_exists:
-        dep_body = create_deployment(
-            name=name,
-            bootstrap_server=bootstrap_server,
-            secret_name=secret_name,
-            secret_version=secret_version,
-            registry_image=registry_image,
-            registry_image_tag=registry_image_tag,
-            registry_cpu_limit=registry_cpu_limit,
-            registry_cpu_request=registry_cpu_request,
-            registry_mem_limit=registry_mem_limit,
-            registry_mem_request=registry_mem_request,
-            compatibility_level=registry_compatibility_level,
-            security_protocol=security_protocol,
-        )
-        # Set the StrimziSchemaRegistry as the owner
-        kopf.adopt(dep_body, owner=body)
-        dep_response = k8s_apps_v1_api.create_namespaced_deployment(
-            body=dep_body, namespace=namespace
-        )
-        logger.debug(str(dep_response))
-    else:
-        logger.info("Deployment already exists")
-
-    try:
-        get_service(name=name, namespace=namespace, k8s_client=k8s_client)
-        service_exists = True
-    except Exception:
-        logger.exception("Did not retrieve existing service")
-
-    # Create the http service to access the Schema Registry REST API
-    if not service_exists:
-        svc_body = create_service(name=name, service_type=service_type)
-        # Set the StrimziSchemaRegistry as the owner
-        kopf.adopt(svc_body, owner=body)
-        svc_response = k8s_core_v1_api.create_namespaced_service(
-            body=svc_body, namespace=namespace
-        )
-        logger.debug(str(svc_response))
-    else:
-        logger.info("Service already exists")
-
-    # Add the name of the registry to the cache
-    state.registry_names.add(name)
-
-
-def get_nullable(spec: Dict[str, str], key: str) -> Optional[str]:
-    """Get a nullable property of the StrimziSchemaRegistry resource.
-
-    If the propety is an empty string, it is null. If it is missing, it is =
-    null.
-    """
-    value = spec.get(key)
-    if value is None:
-        return None
-    elif value == "":
-        return None
-    else:
-        return value
@@ -0,0 +1,42 @@
+"""Kopf handler for the deletion of a StrimziSchemaRegistry."""
+
+__all__ = ("delete_registry",)
+
+import kopf
+
+from .. import state
+from ..registryindex import registry_key
+
+
+@kopf.on.delete(
+    "roundtable.lsst.codes",
+    "v1beta1",
+    "strimzischemaregistries",
+    optional=True,
+)
+async def delete_registry(namespace, name, logger, **kwargs):
+    """Stop tracking a deleted StrimziSchemaRegistry.
+
+    The registry's Deployment, Service, and JKS Secret are owned by the
+    StrimziSchemaRegistry, so Kubernetes deletes them. This handler removes
+    the registry from `state.registry_names`, so certificate changes no
+    longer fan out to it, and drops its pending work from
+    `state.refresh_queue`.
+
+    The handler is optional, so kopf doesn't add a finalizer that would
+    block the deletion while the operator is down. Deletions that the
+    operator misses are caught by the periodic sync of the index (see
+    `strimziregistryoperator.handlers.lifecycle.resync_registry_index`).
+    """
+    key = registry_key(namespace, name)
+    state.registry_names.discard(key)
+    state.registry_secrets.discard(namespace, name)
+    state.partitions.discard_registry(namespace, name)
+    cancelled = state.refresh_queue.cancel(key)
+    logger.info(
+        "Stopped tracking deleted registry %s (%d pending work items "
+        "cancelled). Registry index: %s",
+        name,
+        cancelled,
+        state.registry_names.stats(),
+    )
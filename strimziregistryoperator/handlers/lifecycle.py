@@ -0,0 +1,85 @@
+"""Kopf handlers for the operator's own start-up and shutdown."""
+
+__all__ = (
+    "start_registry_resync",
+    "resync_registry_index",
+    "shutdown_registry_resync",
+    "shutdown_keystore_pool",
+    "shutdown_k8sclient",
+)
+
+import asyncio
+import time
+
+import kopf
+
+from .. import state
+from ..k8s import close_k8sclient
+from ..startup import list_registry_names, start_operator, warm_up
+
+
+@kopf.on.startup()
+async def start_registry_resync(memo, logger, **kwargs):
+    """Start priming, and then periodically syncing, `state.registry_names`
+    in the background.
+
+    The startup handler returns right away, so the watches start while the
+    index is primed (see `strimziregistryoperator.startup.start_operator`).
+    """
+    memo.registry_resync = asyncio.create_task(
+        resync_registry_index(logger=logger)
+    )
+
+
+async def resync_registry_index(*, logger):
+    """Sync `state.registry_names` with a list of the StrimziSchemaRegistry
+    resources every `state.registry_resync_interval` seconds.
+
+    The index is first primed, with retries, by
+    `strimziregistryoperator.startup.start_operator`, and the registries are
+    warmed up (see `strimziregistryoperator.startup.warm_up`). The periodic
+    syncs catch deletions that the operator missed, so that certificate changes
+    don't fan out to registries that no longer exist.
+    """
+    await start_operator(logger=logger)
+    await warm_up(logger=logger)
+    while True:
+        await asyncio.sleep(state.registry_resync_interval)
+        started = time.monotonic()
+        try:
+            keys = await asyncio.to_thread(list_registry_names)
+        except Exception:
+            logger.exception("Failed to list StrimziSchemaRegistries")
+            continue
+        added, removed = state.registry_names.sync(keys, started=started)
+        for key in removed:
+            state.refresh_queue.cancel(key)
+        if added or removed:
+            logger.info(
+                "Synced registry index (added: %s; removed: %s)",
+                ", ".join(added) or "none",
+                ", ".join(removed) or "none",
+            )
+
+
+@kopf.on.cleanup()
+async def shutdown_registry_resync(memo, **kwargs):
+    """Stop syncing `state.registry_names` when the operator exits."""
+    task = getattr(memo, "registry_resync", None)
+    if task is not None:
+        task.cancel()
+
+
+@kopf.on.cleanup()
+def shutdown_keystore_pool(logger, **kwargs):
+    """Shut down the keystore pool when the operator exits."""
+    logger.info("Keystore pool: %s", state.keystore_pool.stats())
+    state.keystore_pool.shutdown()
+
+
+@kopf.on.cleanup()
+def shutdown_k8sclient(**kwargs):
+    """Close the pooled Kubernetes API connections when the operator
+    exits.
+    """
+    close_k8sclient()
@@ -0,0 +1,302 @@
+"""Kopf handler for the periodic, level-triggered reconciliation of each
+StrimziSchemaRegistry.
+"""
+
+__all__ = (
+    "reconcile_registry",
+    "refresh_bootstrap_servers",
+    "reconcile_resources",
+    "patch_resource",
+)
+
+import asyncio
+import functools
+
+import kopf
+from kubernetes.client.rest import ApiException
+
+from .. import state
+from ..desiredstate import create_json_patch, get_drift
+from ..k8s import (
+    FIELD_MANAGER,
+    create_k8sclient,
+    get_deployment,
+    get_service,
+    get_ssr,
+)
+from ..provisioning import get_desired_state
+from ..registryindex import registry_key, split_registry_key
+from ..registrystatus import get_registry_status, update_registry_status
+from ..rollouts import wait_for_restart
+
+
+@kopf.on.timer(
+    "roundtable.lsst.codes",
+    "v1beta1",
+    "strimzischemaregistries",
+    interval=state.reconcile_interval,
+    initial_delay=state.reconcile_interval,
+)
+async def reconcile_registry(spec, namespace, name, logger, body, **kwargs):
+    """Periodically bring a registry's JKS Secret, Deployment, and Service
+    back to their desired state.
+
+    Events can be missed, for example while the operator restarts, and the
+    registry's resources can be edited or deleted by hand. Rather than
+    relying on events alone, this timer rebuilds the desired resources and
+    writes only those whose desired-state hash or projected live state
+    differ (see `strimziregistryoperator.desiredstate.get_drift`), so a
+    registry in its steady state costs no writes.
+
+    The reconcile runs in `state.refresh_queue`, so it never overlaps with
+    the creation or a certificate refresh of the same registry.
+    """
+    key = registry_key(namespace, name)
+    if key not in state.registry_names:
+        # The registry hasn't been deployed yet (see create_registry)
+        return
+    await state.refresh_queue.submit(
+        f"{key}/reconcile",
+        reconcile_resources,
+        group=key,
+        debounce=0,
+        spec=spec,
+        namespace=namespace,
+        name=name,
+        logger=logger,
+        body=body,
+    )
+
+
+@kopf.on.event("kafka.strimzi.io", "kafkas")
+async def refresh_bootstrap_servers(event, body, name, logger, **kwargs):
+    """Update the Deployments of the registries that connect to a Kafka
+    cluster whose listeners changed.
+
+    `state.bootstrap_servers` reports the registries that used a listener
+    address of the cluster. Their Deployments are re-rendered and patched
+    (see `reconcile_resources`), which only changes the
+    ``SCHEMA_REGISTRY_KAFKASTORE_BOOTSTRAP_SERVERS`` variable if the address
+    changed. The JKS Secrets are left alone.
+    """
+    # This handler runs before cache_kafka, so cache the event now for the
+    # re-rendered Deployments to resolve the new address
+    state.resource_cache.observe("kafkas", event["type"], body)
+    registry_keys = [
+        key
+        for key in state.bootstrap_servers.observe(event["type"], body)
+        if key in state.registry_names
+    ]
+    if not registry_keys:
+        return
+    logger.info(
+        "Listeners of Kafka cluster %s changed; updating %s",
+        name,
+        ", ".join(registry_keys),
+    )
+    k8s_client = create_k8sclient()
+
+    async def refresh(key):
+        namespace, registry_name = split_registry_key(key)
+        ssr = await asyncio.to_thread(
+            get_ssr,
+            name=registry_name,
+            namespace=namespace,
+            k8s_client=k8s_client,
+        )
+        await state.refresh_queue.submit(
+            f"{key}/bootstrap",
+            reconcile_resources,
+            group=key,
+            debounce=0,
+            spec=ssr["spec"],
+            namespace=namespace,
+            name=registry_name,
+            logger=logger,
+            body=ssr,
+            refresh_secret=False,
+        )
+
+    results = await asyncio.gather(
+        *(refresh(key) for key in registry_keys),
+        return_exceptions=True,
+    )
+    for key, result in zip(registry_keys, results):
+        if isinstance(result, Exception):
+            logger.error(
+                "Failed to update the bootstrap server of %s: %s",
+                key,
+                result,
+            )
+    logger.info("Bootstrap servers: %s", state.bootstrap_servers.stats())
+
+
+async def reconcile_resources(
+    *, spec, namespace, name, logger, body, refresh_secret=True
+):
+    """Write the resources of a registry that drifted from their desired
+    state (see `reconcile_registry`).
+
+    Drifted resources are patched with a JSON patch of only the fields that
+    differ (see `strimziregistryoperator.desiredstate.create_json_patch`),
+    so fields set by Kubernetes or other controllers are left alone. The
+    StrimziSchemaRegistry's status is then brought up to date (see
+    `strimziregistryoperator.registrystatus`).
+
+    Patches that change the Deployment's pod template restart the registry.
+    They hold one of `state.rollout_slots` until the pods are ready (see
+    `strimziregistryoperator.rollouts.wait_for_restart`), so when many
+    registries drift at once, such as when an upgraded operator resumes
+    registries without a status, they restart in waves.
+
+    Parameters
+    ----------
+    refresh_secret : bool
+        Whether to check the JKS Secret against the Strimzi certificates
+        (see `strimziregistryoperator.provisioning.get_desired_state`). If
+        `False`, the current JKS Secret is used as-is.
+
+    Returns
+    -------
+    writes : int
+        The number of Deployment and Service writes.
+    """
+    k8s_client = create_k8sclient()
+    k8s_apps_v1_api = k8s_client.AppsV1Api()
+    k8s_core_v1_api = k8s_client.CoreV1Api()
+
+    # The JKS Secret is only rewritten if its certificate fingerprints are
+    # outdated (see create_secret)
+    secret, dep_body, svc_body = await get_desired_state(
+        spec=spec,
+        namespace=namespace,
+        name=name,
+        body=body,
+        k8s_client=k8s_client,
+        logger=logger,
+        refresh_secret=refresh_secret,
+    )
+
+    writes = 0
+    rolled_out = False
+    for kind, cache_kind, desired, get, create, patch in (
+        (
+            "Deployment",
+            "deployments",
+            dep_body,
+            get_deployment,
+            k8s_apps_v1_api.create_namespaced_deployment,
+            k8s_apps_v1_api.patch_namespaced_deployment,
+        ),
+        (
+            "Service",
+            "services",
+            svc_body,
+            get_service,
+            k8s_core_v1_api.create_namespaced_service,
+            k8s_core_v1_api.patch_namespaced_service,
+        ),
+    ):
+        try:
+            live = await asyncio.to_thread(
+                get, name=name, namespace=namespace, k8s_client=k8s_client
+            )
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            logger.warning("%s %s is missing; re-creating it", kind, name)
+            kopf.adopt(desired, owner=body)
+            await asyncio.to_thread(
+                create,
+                body=desired,
+                namespace=namespace,
+                field_manager=FIELD_MANAGER,
+            )
+            writes += 1
+            rolled_out = rolled_out or kind == "Deployment"
+            continue
+
+        reason = get_drift(live, desired)
+        if reason is None:
+            continue
+        kopf.adopt(desired, owner=body)
+        operations = create_json_patch(live, desired)
+        logger.info(
+            "Patching %s %s because %s: %s",
+            kind,
+            name,
+            reason,
+            ", ".join(op["path"] for op in operations if op["op"] != "test"),
+        )
+        # Changes to the pod template restart the pods
+        restarts = kind == "Deployment" and any(
+            op["path"].startswith("/spec/template") for op in operations
+        )
+        # A list body is sent as a JSON patch
+        write = functools.partial(
+            patch_resource,
+            patch,
+            cache_kind,
+            name=name,
+            namespace=namespace,
+            operations=operations,
+            api_client=k8s_core_v1_api.api_client,
+        )
+        if restarts:
+            async with state.rollout_slots:
+                generation = await write()
+                await wait_for_restart(
+                    name=name,
+                    namespace=namespace,
+                    k8s_client=k8s_client,
+                    generation=generation,
+                    timeout=state.rollout_wave_timeout,
+                    logger=logger,
+                )
+        else:
+            await write()
+        writes += 1
+        rolled_out = rolled_out or restarts
+
+    # Only the status fields that changed are written, so a registry in its
+    # steady state still costs no writes
+    await update_registry_status(
+        name=name,
+        namespace=namespace,
+        status=get_registry_status(
+            secret=secret,
+            deployment=dep_body,
+            generation=body["metadata"].get("generation"),
+            rolled_out=rolled_out,
+        ),
+        k8s_client=k8s_client,
+        logger=logger,
+        current=body.get("status"),
+    )
+    logger.debug("Reconciled %s with %d writes", name, writes)
+    return writes
+
+
+async def patch_resource(
+    patch, cache_kind, *, name, namespace, operations, api_client
+):
+    """Send a JSON patch for a registry's resource (see
+    `reconcile_resources`) and cache the patched resource.
+
+    Returns
+    -------
+    generation : int
+        The ``metadata.generation`` of the patched resource.
+    """
+    response = await asyncio.to_thread(
+        patch,
+        name=name,
+        namespace=namespace,
+        body=operations,
+        field_manager=FIELD_MANAGER,
+    )
+    # Cache the patched resource so that the next reconcile, or the wait for
+    # a rollout, doesn't wait for its watch event
+    patched = api_client.sanitize_for_serialization(response)
+    state.resource_cache.put(cache_kind, patched)
+    return patched["metadata"].get("generation")
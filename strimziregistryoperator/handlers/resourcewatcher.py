@@ -0,0 +1,85 @@
+"""Kopf handlers that feed the resource cache (`state.resource_cache`) from
+the operator's watch streams.
+"""
+
+__all__ = (
+    "cache_secret",
+    "cache_deployment",
+    "cache_service",
+    "cache_kafka",
+    "cache_kafkauser",
+    "cache_ssr",
+)
+
+import kopf
+
+from .. import state
+from ..partitions import is_served_cluster
+from ..registryindex import registry_key
+
+
+def is_cached_secret(name, namespace, labels, **kwargs):
+    """Filter for the Secrets that the operator reads: the cluster and
+    clients CA certificates of the served clusters, and each registry's
+    KafkaUser and JKS Secrets.
+    """
+    cluster = labels.get("strimzi.io/cluster")
+    if is_served_cluster(cluster, state.cluster_names) and name in (
+        f"{cluster}-cluster-ca-cert",
+        f"{cluster}-clients-ca-cert",
+    ):
+        return True
+    return (
+        registry_key(namespace, name) in state.registry_names
+        or state.registry_secrets.is_kafka_user(namespace, name)
+        or (
+            name.endswith("-jks")
+            and registry_key(namespace, name[: -len("-jks")])
+            in state.registry_names
+        )
+    )
+
+
+def is_registry_resource(name, namespace, **kwargs):
+    """Filter for the Deployments and Services of the registries."""
+    return registry_key(namespace, name) in state.registry_names
+
+
+@kopf.on.event("", "v1", "secrets", when=is_cached_secret)
+def cache_secret(event, body, **kwargs):
+    state.resource_cache.observe("secrets", event["type"], body)
+
+
+@kopf.on.event("apps", "v1", "deployments", when=is_registry_resource)
+def cache_deployment(event, body, **kwargs):
+    state.resource_cache.observe("deployments", event["type"], body)
+
+
+@kopf.on.event("", "v1", "services", when=is_registry_resource)
+def cache_service(event, body, **kwargs):
+    state.resource_cache.observe("services", event["type"], body)
+
+
+@kopf.on.event("kafka.strimzi.io", "kafkas")
+def cache_kafka(event, body, namespace, name, **kwargs):
+    state.resource_cache.observe("kafkas", event["type"], body)
+    if event["type"] == "DELETED":
+        state.partitions.discard(namespace, name)
+
+
+@kopf.on.event("kafka.strimzi.io", "kafkausers")
+def cache_kafkauser(event, body, **kwargs):
+    state.resource_cache.observe("kafkausers", event["type"], body)
+    state.registry_secrets.observe_kafkauser(event["type"], body)
+
+
+@kopf.on.event("roundtable.lsst.codes", "v1beta1", "strimzischemaregistries")
+def cache_ssr(event, body, name, namespace, **kwargs):
+    state.resource_cache.observe(
+        "strimzischemaregistries", event["type"], body
+    )
+    if event["type"] == "DELETED":
+        state.registry_names.discard(registry_key(namespace, name))
+        state.registry_secrets.discard(namespace, name)
+    else:
+        state.registry_secrets.update(body)
@@ -4,120 +4,489 @@ for the cluster CA certificate or the client certificates.
 
 __all__ = (
     "handle_secret_change",
+    "is_watched_secret",
     "refresh_with_new_cluster_ca",
     "refresh_with_new_client_secret",
+    "refresh_registry",
+    "load_record",
+    "resolve_record_cluster",
+    "retry_refresh",
+    "REFRESH_RETRY_DELAY",
 )
 
+import asyncio
+import time
+
 import kopf
+from kubernetes.client.rest import ApiException
 
 from .. import state
-from ..certprocessor import create_secret
-from ..deployments import update_deployment
-from ..k8s import create_k8sclient, get_deployment, get_ssr
+from ..certprocessor import create_secret, decode_secret_field
+from ..k8s import create_k8sclient, get_kafkauser, get_ssr
+from ..keystorecache import fingerprint
+from ..partitions import is_served_cluster
+from ..provisioning import get_keystore_type
+from ..registryindex import registry_key, split_registry_key
+from ..registrystatus import get_registry_status, update_registry_status
+from ..rollouts import roll_out_in_waves, roll_out_registry
+
+REFRESH_RETRY_DELAY = 60.0
+"""The time, in seconds, between retries of a registry refresh that failed
+after a KafkaUser Secret change (see `retry_refresh`).
+"""
+
+_retries = {}
+"""The pending `retry_refresh` tasks, by registry key."""
+
+
+def is_watched_secret(name, namespace, labels, **kwargs):
+    """Filter for the Secrets that `handle_secret_change` acts on: the
+    cluster CA certificates of the served clusters (`state.cluster_names`)
+    and the KafkaUser Secrets of the registries.
+    """
+    cluster = labels.get("strimzi.io/cluster")
+    if not is_served_cluster(cluster, state.cluster_names):
+        return False
+    return (
+        name == f"{cluster}-cluster-ca-cert"
+        or registry_key(namespace, name) in state.registry_names
+        or state.registry_secrets.is_kafka_user(namespace, name)
+    )
 
 
-@kopf.on.event("", "v1", "secrets")
-def handle_secret_change(
+@kopf.on.event(
+    "",
+    "v1",
+    "secrets",
+    labels={"strimzi.io/cluster": kopf.PRESENT},
+    when=is_watched_secret,
+)
+async def handle_secret_change(
     spec, meta, namespace, name, uid, event, body, logger, **kwargs
 ):
     """Handle changes in secrets managed by Strimzi for the
     KafkaUser corresponding to a StrimziSchemaRegistry deployment.
+
+    Only Secrets with a ``strimzi.io/cluster`` label that pass
+    `is_watched_secret` reach this handler. KafkaUser Secrets are routed to
+    their registries by `state.registry_secrets`, without API calls.
     """
     # Act only on Secrets that have been created or updated
     if event["type"] not in ("ADDED", "MODIFIED"):
         return
 
-    # Act only on Secrets with the matching strimzi.io/cluster configuration.
-    try:
-        if meta["labels"]["strimzi.io/cluster"] != state.cluster_name:
-            return
-    except KeyError:
-        # didn't have a strimzio.io/cluster key; so no action is needed.
-        return
-
-    if name == f"{state.cluster_name}-cluster-ca-cert":
+    cluster = meta["labels"]["strimzi.io/cluster"]
+    if name == f"{cluster}-cluster-ca-cert":
         # Handle a change in the cluster CA certificate
-        refresh_with_new_cluster_ca(
+        await refresh_with_new_cluster_ca(
             cluster_ca_secret=body, namespace=namespace, logger=logger
         )
-    elif name in state.registry_names:
-        # Handle a change in the KafkaUser client certificate of a
-        # StrimziSchemaRegistry
-        refresh_with_new_client_secret(
+    else:
+        # Handle a change in the KafkaUser client certificate of one or more
+        # StrimziSchemaRegistries
+        await refresh_with_new_client_secret(
             kafkauser_secret=body, namespace=namespace, logger=logger
         )
 
 
-def refresh_with_new_cluster_ca(*, cluster_ca_secret, namespace, logger):
-    k8s_client = create_k8sclient()
+async def refresh_with_new_cluster_ca(*, cluster_ca_secret, namespace, logger):
+    """Refresh the JKS Secret and Deployment of every registry after a
+    change to the cluster CA certificate.
 
-    # Iterate over each managed registry...
-    for registry_name in state.registry_names:
-        cluster = cluster_ca_secret["metadata"]["labels"]["strimzi.io/cluster"]
+    Each registry's JKS Secret is refreshed through `state.refresh_queue`,
+    which collapses it with other pending certificate changes for the
+    registry and runs up to `state.rotation_concurrency` refreshes at a
+    time. The Deployments are then restarted in waves of
+    `state.rollout_wave_size` (see
+    `strimziregistryoperator.rollouts.roll_out_in_waves`). A failure for one
+    registry is logged and doesn't stop the refresh of the others.
 
-        ssr_body = get_ssr(
-            name=registry_name, namespace=namespace, k8s_client=k8s_client
+    Only the registries of the CA's Kafka cluster, from
+    `state.registry_secrets`, are refreshed: registries whose KafkaUser
+    hasn't been seen yet are checked with `resolve_record_cluster` and
+    skipped if they belong to another cluster. Registries whose JKS Secret
+    already has this CA, such as those validated by the startup warm-up
+    (see `strimziregistryoperator.startup.warm_up`), are skipped too. The
+    cluster's partition (see `strimziregistryoperator.partitions`) records
+    the CA fingerprint once they all are. Events that don't change the
+    fingerprint, such as label or annotation edits, are then skipped, and a
+    rotation never touches the registries of other clusters.
+    """
+    k8s_client = create_k8sclient()
+    cluster = cluster_ca_secret["metadata"]["labels"]["strimzi.io/cluster"]
+    partition = state.partitions.get(namespace, cluster)
+    ca_fingerprint = fingerprint(
+        decode_secret_field(cluster_ca_secret["data"]["ca.crt"])
+    )
+    if partition.is_current(ca_fingerprint):
+        logger.info(
+            "Registries of %s/%s already use this cluster CA",
+            namespace,
+            cluster,
         )
+        return
 
-        secret = create_secret(
-            kafka_username=registry_name,
-            namespace=namespace,
-            cluster=cluster,
-            owner=ssr_body,
-            k8s_client=k8s_client,
-            cluster_ca_secret=cluster_ca_secret,
-            logger=logger,
+    records = {
+        record.name: record
+        for record in state.registry_secrets.for_cluster(namespace, cluster)
+        if registry_key(namespace, record.name) in state.registry_names
+    }
+    # Registries of the namespace whose watch event hasn't been indexed yet
+    # may belong to this cluster; refresh() checks
+    unindexed = [
+        registry_name
+        for registry_namespace, registry_name in (
+            split_registry_key(key) for key in state.registry_names
         )
-        secret_version = secret["metadata"]["resourceVersion"]
+        if registry_namespace == namespace
+        and state.registry_secrets.get(namespace, registry_name) is None
+    ]
+    registry_names = sorted([*records, *unindexed])
+    skipped = set()
 
-        deployment = get_deployment(
-            name=registry_name,
-            namespace=namespace,
-            k8s_client=k8s_client,
-            raw=False,
+    async def refresh(registry_name):
+        start = time.perf_counter()
+        try:
+            record = records.get(registry_name)
+            if record is None:
+                # The registry's watch event hasn't been indexed yet
+                record = await load_record(
+                    registry_name=registry_name,
+                    namespace=namespace,
+                    k8s_client=k8s_client,
+                )
+            record_cluster = await resolve_record_cluster(
+                record, k8s_client=k8s_client
+            )
+            if record_cluster != cluster:
+                # The registry connects to another Kafka cluster
+                logger.debug(
+                    "Skipping %s, which uses Kafka cluster %s",
+                    registry_name,
+                    record_cluster,
+                )
+                skipped.add(registry_name)
+                return None, time.perf_counter() - start
+            if partition.is_registry_current(registry_name, ca_fingerprint):
+                skipped.add(registry_name)
+                return None, time.perf_counter() - start
+            secret_version = await state.refresh_queue.submit(
+                registry_key(namespace, registry_name),
+                refresh_registry,
+                record=record,
+                cluster=cluster,
+                k8s_client=k8s_client,
+                cluster_ca_secret=cluster_ca_secret,
+                roll_out=False,
+                logger=logger,
+            )
+            partition.record_registry(registry_name, ca_fingerprint)
+        except Exception:
+            logger.exception(
+                "Failed to refresh %s with the new cluster CA",
+                registry_name,
+            )
+            return None, time.perf_counter() - start
+        return secret_version, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = dict(
+        zip(
+            registry_names,
+            await asyncio.gather(
+                *(refresh(registry_name) for registry_name in registry_names)
+            ),
         )
+    )
+    registry_names = [
+        registry_name
+        for registry_name in registry_names
+        if registry_name not in skipped
+    ]
+    secret_versions = {
+        registry_name: results[registry_name][0]
+        for registry_name in registry_names
+        if results[registry_name][0] is not None
+    }
+    rollout_outcomes = await roll_out_in_waves(
+        secret_versions,
+        namespace=namespace,
+        k8s_client=k8s_client,
+        wave_size=state.rollout_wave_size,
+        wave_timeout=state.rollout_wave_timeout,
+        logger=logger,
+    )
+    elapsed = time.perf_counter() - start
 
-        update_deployment(
-            deployment=deployment,
-            secret_version=secret_version,
-            name=registry_name,
+    outcomes = ", ".join(
+        f"{registry_name}={rollout_outcomes.get(registry_name, 'failed')} "
+        f"({results[registry_name][1]:.2f}s)"
+        for registry_name in registry_names
+    )
+    failures = sum(
+        1
+        for registry_name in registry_names
+        if rollout_outcomes.get(registry_name) not in ("ready", "unchanged")
+    )
+    logger.info(
+        "Refreshed %d registries of %s/%s with the new cluster CA in %.2fs "
+        "(%d failed or not ready): %s",
+        len(registry_names),
+        namespace,
+        cluster,
+        elapsed,
+        failures,
+        outcomes,
+    )
+    if len(secret_versions) == len(registry_names):
+        # Every JKS Secret has the new CA. Otherwise, the next event for
+        # this CA retries the registries that failed.
+        partition.record_rotation(ca_fingerprint)
+
+    # Every registry shares a truststore built once for this CA
+    logger.info("Truststore cache: %s", state.truststore_cache.stats())
+    logger.info("Cluster partitions: %s", state.partitions.stats())
+    logger.info("Resource cache: %s", state.resource_cache.stats())
+    logger.info("Refresh queue: %s", state.refresh_queue.stats())
+
+
+async def refresh_with_new_client_secret(
+    *, kafkauser_secret, namespace, logger
+):
+    """Refresh the JKS Secrets and Deployments of the registries that use a
+    KafkaUser after a change to its client certificate.
+
+    The registries are looked up in `state.registry_secrets`. Each refresh
+    is submitted to `state.refresh_queue`, so a burst of changes to a
+    registry's certificates results in one refresh.
+
+    Raises
+    ------
+    kopf.TemporaryError
+        Raised if a refresh still failed after the queue's retries. kopf
+        doesn't re-run event handlers, so the failed refreshes are also
+        retried in the background (see `retry_refresh`).
+    """
+    secret_name = kafkauser_secret["metadata"]["name"]
+    cluster = kafkauser_secret["metadata"]["labels"]["strimzi.io/cluster"]
+    k8s_client = create_k8sclient()
+    records = [
+        record
+        for record in state.registry_secrets.lookup(
+            namespace, secret_name, cluster
+        )
+        if registry_key(namespace, record.name) in state.registry_names
+    ]
+    if (
+        not records
+        and registry_key(namespace, secret_name) in state.registry_names
+    ):
+        # The registry's watch event hasn't been indexed yet; by default,
+        # a registry connects as the KafkaUser of the same name
+        record = await load_record(
+            registry_name=secret_name,
             namespace=namespace,
             k8s_client=k8s_client,
         )
+        records = [record] if record.kafka_user == secret_name else []
 
+    results = await asyncio.gather(
+        *(
+            state.refresh_queue.submit(
+                registry_key(record.namespace, record.name),
+                refresh_registry,
+                record=record,
+                cluster=cluster,
+                k8s_client=k8s_client,
+                client_secret=kafkauser_secret,
+                logger=logger,
+            )
+            for record in records
+        ),
+        return_exceptions=True,
+    )
+    failures = [
+        (record, result)
+        for record, result in zip(records, results)
+        if isinstance(result, Exception)
+    ]
+    for record, _ in failures:
+        key = registry_key(record.namespace, record.name)
+        if key not in _retries:
+            _retries[key] = asyncio.create_task(
+                retry_refresh(
+                    record,
+                    cluster=cluster,
+                    k8s_client=k8s_client,
+                    logger=logger,
+                )
+            )
+    logger.info("Refresh queue: %s", state.refresh_queue.stats())
+    if failures:
+        errors = ", ".join(
+            f"{record.name} ({result})" for record, result in failures
+        )
+        raise kopf.TemporaryError(
+            f"Failed to refresh {errors}; retrying in "
+            f"{REFRESH_RETRY_DELAY:.0f}s",
+            delay=REFRESH_RETRY_DELAY,
+        )
 
-def refresh_with_new_client_secret(*, kafkauser_secret, namespace, logger):
-    k8s_client = create_k8sclient()
 
-    kafka_username = kafkauser_secret["metadata"]["name"]
-    cluster = kafkauser_secret["metadata"]["labels"]["strimzi.io/cluster"]
+async def refresh_registry(
+    *,
+    record,
+    cluster,
+    k8s_client,
+    logger,
+    cluster_ca_secret=None,
+    client_secret=None,
+    roll_out=True,
+):
+    """Regenerate a registry's JKS Secret and point its Deployment at the
+    new Secret version.
 
-    ssr_body = get_ssr(
-        name=kafka_username, namespace=namespace, k8s_client=k8s_client
-    )
+    The Secret version and certificate fingerprints are recorded in the
+    StrimziSchemaRegistry's status.
 
-    secret = create_secret(
-        kafka_username=kafka_username,
-        namespace=namespace,
+    Parameters
+    ----------
+    record : `strimziregistryoperator.secretindex.RegistryRecord`
+        The registry's record, which names its KafkaUser and owns the JKS
+        Secret.
+    roll_out : `bool`
+        If `False`, only the JKS Secret is refreshed and the caller is
+        responsible for restarting the Deployment (see
+        `strimziregistryoperator.rollouts.roll_out_registry`).
+
+    Returns
+    -------
+    secret_version : `str`
+        The ``resourceVersion`` of the JKS Secret.
+    """
+    secret = await create_secret(
+        kafka_username=record.kafka_user,
+        namespace=record.namespace,
         cluster=cluster,
-        owner=ssr_body,
+        owner=record.owner,
         k8s_client=k8s_client,
-        client_secret=kafkauser_secret,
+        cluster_ca_secret=cluster_ca_secret,
+        client_secret=client_secret,
+        keystore_type=get_keystore_type(record.spec),
+        jks_secret_name=f"{record.name}-jks",
         logger=logger,
     )
     secret_version = secret["metadata"]["resourceVersion"]
-
-    deployment = get_deployment(
-        name=kafka_username,
-        namespace=namespace,
+    await update_registry_status(
+        name=record.name,
+        namespace=record.namespace,
+        status=get_registry_status(secret=secret),
         k8s_client=k8s_client,
-        raw=False,
+        logger=logger,
+        current=record.status,
     )
 
-    update_deployment(
-        deployment=deployment,
-        secret_version=secret_version,
-        name=kafka_username,
-        namespace=namespace,
-        k8s_client=k8s_client,
-    )
+    if roll_out:
+        await roll_out_registry(
+            name=record.name,
+            namespace=record.namespace,
+            secret_version=secret_version,
+            k8s_client=k8s_client,
+            logger=logger,
+        )
+    return secret_version
+
+
+async def load_record(*, registry_name, namespace, k8s_client):
+    """Read a StrimziSchemaRegistry and add its record to
+    `state.registry_secrets`, for registries whose watch event hasn't been
+    indexed yet.
+
+    Returns
+    -------
+    record : `strimziregistryoperator.secretindex.RegistryRecord`
+        The registry's record.
+
+    Raises
+    ------
+    kopf.TemporaryError
+        Raised if the StrimziSchemaRegistry isn't found. Only the delete
+        handler and the registry resync decide that a registry is gone, so
+        the registry stays in `state.registry_names`.
+    """
+    try:
+        ssr_body = await asyncio.to_thread(
+            get_ssr,
+            name=registry_name,
+            namespace=namespace,
+            k8s_client=k8s_client,
+        )
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        raise kopf.TemporaryError(
+            f"StrimziSchemaRegistry {registry_name} was not found."
+        )
+    return state.registry_secrets.update(ssr_body)
+
+
+async def resolve_record_cluster(record, *, k8s_client):
+    """Get the Kafka cluster of a registry's KafkaUser.
+
+    Records whose KafkaUser hasn't been seen by the KafkaUser watch yet
+    don't name their cluster. For those, the KafkaUser is read and recorded
+    in `state.registry_secrets`.
+
+    Returns
+    -------
+    cluster : `str` or `None`
+        The ``strimzi.io/cluster`` label of the KafkaUser, or `None` if the
+        KafkaUser doesn't exist.
+    """
+    if record.cluster is not None:
+        return record.cluster
+    try:
+        kafkauser = await asyncio.to_thread(
+            get_kafkauser,
+            namespace=record.namespace,
+            name=record.kafka_user,
+            k8s_client=k8s_client,
+            version=record.spec.get("strimziVersion", "v1beta2"),
+        )
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        return None
+    state.registry_secrets.observe_kafkauser("ADDED", kafkauser)
+    labels = kafkauser["metadata"].get("labels") or {}
+    return labels.get("strimzi.io/cluster")
+
+
+async def retry_refresh(record, *, cluster, k8s_client, logger):
+    """Retry a failed refresh of a registry's JKS Secret every
+    `REFRESH_RETRY_DELAY` seconds until it succeeds or the registry is
+    deleted.
+
+    The refresh reads the current KafkaUser Secret, so a retry never writes
+    certificates older than those of a later event.
+    """
+    key = registry_key(record.namespace, record.name)
+    try:
+        while key in state.registry_names:
+            await asyncio.sleep(REFRESH_RETRY_DELAY)
+            try:
+                await state.refresh_queue.submit(
+                    key,
+                    refresh_registry,
+                    record=record,
+                    cluster=cluster,
+                    k8s_client=k8s_client,
+                    logger=logger,
+                )
+            except Exception as e:
+                logger.warning("Failed to refresh %s again: %s", key, e)
+            else:
+                logger.info("Refreshed %s after a failure", key)
+                return
+    finally:
+        _retries.pop(key, None)
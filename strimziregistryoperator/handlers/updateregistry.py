@@ -0,0 +1,110 @@
+"""Kopf handlers for changes to the spec of a StrimziSchemaRegistry, and for
+registries that already exist when the operator starts.
+"""
+
+__all__ = (
+    "TLS_SPEC_FIELDS",
+    "is_tls_change",
+    "update_registry",
+    "resume_registry",
+)
+
+import kopf
+
+from .. import state
+from ..registryindex import registry_key
+from ..registrystatus import is_reconciled
+from .reconcileregistry import reconcile_resources
+
+TLS_SPEC_FIELDS = ("keystoreType", "kafkaUser")
+"""The ``spec`` fields of a StrimziSchemaRegistry that change its JKS Secret.
+"""
+
+
+def is_tls_change(diff):
+    """Check whether a kopf diff of a StrimziSchemaRegistry's ``spec``
+    changes any of the `TLS_SPEC_FIELDS`.
+
+    A change of the whole ``spec`` counts as a TLS change.
+    """
+    return any(
+        not field or field[0] in TLS_SPEC_FIELDS for _, field, _, _ in diff
+    )
+
+
+@kopf.on.update(
+    "roundtable.lsst.codes",
+    "v1beta1",
+    "strimzischemaregistries",
+    field="spec",
+)
+async def update_registry(spec, diff, namespace, name, logger, body, **kwargs):
+    """Apply a change to the spec of a StrimziSchemaRegistry, such as a new
+    ``registryImageTag``, resource limit, or ``compatibilitylevel``.
+
+    The Deployment and Service are re-rendered and patched with only the
+    fields that changed (see
+    `strimziregistryoperator.handlers.reconcileregistry.reconcile_resources`),
+    so the registry is not re-created. The JKS Secret is only rebuilt if one
+    of the `TLS_SPEC_FIELDS` changed.
+    """
+    refresh_secret = is_tls_change(diff)
+    key = registry_key(namespace, name)
+    logger.info(
+        "Updating Schema Registry %s (%s)",
+        name,
+        ", ".join(".".join(field) for _, field, _, _ in diff),
+    )
+    # Submissions for the same key are merged, so keep TLS changes apart
+    # from changes that would skip the JKS Secret
+    await state.refresh_queue.submit(
+        f"{key}/update-tls" if refresh_secret else f"{key}/update",
+        reconcile_resources,
+        group=key,
+        debounce=0,
+        spec=spec,
+        namespace=namespace,
+        name=name,
+        logger=logger,
+        body=body,
+        refresh_secret=refresh_secret,
+    )
+    state.registry_names.add(key)
+
+
+@kopf.on.resume("roundtable.lsst.codes", "v1beta1", "strimzischemaregistries")
+async def resume_registry(spec, namespace, name, logger, body, **kwargs):
+    """Bring an existing StrimziSchemaRegistry's resources up to date when
+    the operator starts, since its spec may have changed while the operator
+    was down.
+
+    Registries whose status shows that their current spec was reconciled
+    (see `strimziregistryoperator.registrystatus.is_reconciled`) are
+    skipped, so a restart doesn't re-read the resources of every registry.
+    Their certificates are checked by the startup warm-up (see
+    `strimziregistryoperator.startup.warm_up`), and drift in their
+    Deployment or Service is caught by
+    `strimziregistryoperator.handlers.reconcileregistry.reconcile_registry`.
+    """
+    key = registry_key(namespace, name)
+    if is_reconciled(body):
+        logger.info(
+            "Schema Registry %s is up to date (generation %s)",
+            name,
+            body["status"]["observedGeneration"],
+        )
+        state.registry_names.add(key)
+        return
+    await state.refresh_queue.submit(
+        f"{key}/resume",
+        reconcile_resources,
+        group=key,
+        debounce=0,
+        spec=spec,
+        namespace=namespace,
+        name=name,
+        logger=logger,
+        body=body,
+        refresh_secret=True,
+    )
+    state.registry_names.add(key)
@@ -0,0 +1,308 @@
+"""A pure-Python writer for Java KeyStore (JKS) files.
+
+This module builds JKS truststores and keystores directly in memory from
+PEM-encoded certificates and keys, without starting ``keytool`` or
+``openssl``. The output is the classic ``JKS`` format (magic number
+``0xFEEDFEED``, version 2) that ``keytool`` and the Java runtime used by the
+Confluent Schema Registry can read.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import re
+import secrets
+import struct
+import time
+from typing import List, Optional, Sequence
+
+__all__ = (
+    "build_truststore",
+    "build_keystore",
+    "der_to_pem",
+    "encode_der",
+    "pem_to_der",
+    "private_key_to_pkcs8",
+)
+
+_JKS_MAGIC = 0xFEEDFEED
+_JKS_VERSION = 2
+_PRIVATE_KEY_TAG = 1
+_TRUSTED_CERT_TAG = 2
+_CERT_TYPE = "X.509"
+
+# The whitener that keytool mixes into the integrity digest of every JKS
+# file (see sun.security.provider.JavaKeyStore).
+_DIGEST_WHITENER = b"Mighty Aphrodite"
+
+# DER-encoded OBJECT IDENTIFIER contents.
+_SUN_KEY_PROTECTOR_OID = bytes.fromhex("2b060104012a02110101")
+_RSA_ENCRYPTION_OID = bytes.fromhex("2a864886f70d010101")
+
+_PEM_PATTERN = re.compile(
+    r"-----BEGIN (?P<label>[A-Z0-9 ]+)-----"
+    r"(?P<body>.*?)"
+    r"-----END (?P=label)-----",
+    re.DOTALL,
+)
+
+
+def pem_to_der(pem: str, *, label: str = "CERTIFICATE") -> List[bytes]:
+    """Decode every PEM block with the given label.
+
+    Parameters
+    ----------
+    pem : `str`
+        Text containing one or more PEM blocks.
+    label : `str`
+        The PEM label to select, such as ``CERTIFICATE``.
+
+    Returns
+    -------
+    blocks : `list` of `bytes`
+        The DER-encoded contents of each matching block, in order.
+    """
+    return [
+        base64.b64decode("".join(match.group("body").split()))
+        for match in _PEM_PATTERN.finditer(pem)
+        if match.group("label") == label
+    ]
+
+
+def der_to_pem(der: bytes, *, label: str = "CERTIFICATE") -> str:
+    """Encode DER content as a PEM block.
+
+    Parameters
+    ----------
+    der : `bytes`
+        The DER-encoded content.
+    label : `str`
+        The PEM label, such as ``CERTIFICATE`` or ``PRIVATE KEY``.
+
+    Returns
+    -------
+    pem : `str`
+        The PEM block, terminated by a newline.
+    """
+    body = base64.b64encode(der).decode("ascii")
+    lines = [body[i : i + 64] for i in range(0, len(body), 64)]
+    return "\n".join(
+        [f"-----BEGIN {label}-----", *lines, f"-----END {label}-----", ""]
+    )
+
+
+def private_key_to_pkcs8(key_pem: str) -> bytes:
+    """Get the DER-encoded PKCS#8 ``PrivateKeyInfo`` for a PEM private key.
+
+    Parameters
+    ----------
+    key_pem : `str`
+        A PEM-encoded private key, either PKCS#8 (``BEGIN PRIVATE KEY``, as
+        generated by Strimzi) or PKCS#1 RSA (``BEGIN RSA PRIVATE KEY``).
+
+    Returns
+    -------
+    key : `bytes`
+        The DER-encoded PKCS#8 private key.
+
+    Raises
+    ------
+    ValueError
+        Raised if the text does not contain a supported, unencrypted private
+        key.
+    """
+    pkcs8_keys = pem_to_der(key_pem, label="PRIVATE KEY")
+    if pkcs8_keys:
+        return pkcs8_keys[0]
+
+    rsa_keys = pem_to_der(key_pem, label="RSA PRIVATE KEY")
+    if rsa_keys:
+        algorithm = encode_der(
+            0x30, encode_der(0x06, _RSA_ENCRYPTION_OID) + encode_der(0x05, b"")
+        )
+        return encode_der(
+            0x30,
+            encode_der(0x02, b"\x00")
+            + algorithm
+            + encode_der(0x04, rsa_keys[0]),
+        )
+
+    raise ValueError("Could not find an unencrypted PEM private key.")
+
+
+def build_truststore(
+    ca_cert: str,
+    password: str,
+    *,
+    alias: str = "caroot",
+    timestamp: Optional[float] = None,
+) -> bytes:
+    """Build a JKS truststore containing trusted certificate entries.
+
+    Parameters
+    ----------
+    ca_cert : `str`
+        PEM-encoded CA certificate(s). Each certificate becomes a trusted
+        certificate entry. The first entry is named ``alias`` and any
+        additional entries are suffixed with ``-1``, ``-2``, and so on.
+    password : `str`
+        The store password, used for the integrity digest.
+    alias : `str`
+        The alias of the first trusted certificate entry.
+    timestamp : `float`, optional
+        The creation time of the entries as a Unix timestamp. Defaults to the
+        current time.
+
+    Returns
+    -------
+    truststore : `bytes`
+        The content of the JKS truststore.
+
+    Raises
+    ------
+    ValueError
+        Raised if ``ca_cert`` does not contain any certificates.
+    """
+    certs = pem_to_der(ca_cert)
+    if not certs:
+        raise ValueError("Could not find a PEM certificate for the truststore")
+    timestamp_ms = _timestamp_ms(timestamp)
+
+    entries = []
+    for i, cert in enumerate(certs):
+        entry_alias = alias if i == 0 else f"{alias}-{i}"
+        entries.append(
+            struct.pack(">I", _TRUSTED_CERT_TAG)
+            + _utf(entry_alias.lower())
+            + struct.pack(">q", timestamp_ms)
+            + _cert(cert)
+        )
+    return _store(entries, password)
+
+
+def build_keystore(
+    key: str,
+    cert_chain: Sequence[str],
+    password: str,
+    *,
+    alias: str = "confluent-schema-registry",
+    timestamp: Optional[float] = None,
+) -> bytes:
+    """Build a JKS keystore with a single private key entry.
+
+    Parameters
+    ----------
+    key : `str`
+        The PEM-encoded private key (see `private_key_to_pkcs8`).
+    cert_chain : sequence of `str`
+        PEM-encoded certificates for the key's certificate chain, starting
+        with the certificate for ``key`` and followed by its issuers.
+        Duplicate certificates are dropped.
+    password : `str`
+        The password for both the store and the private key entry.
+    alias : `str`
+        The alias of the private key entry.
+    timestamp : `float`, optional
+        The creation time of the entry as a Unix timestamp. Defaults to the
+        current time.
+
+    Returns
+    -------
+    keystore : `bytes`
+        The content of the JKS keystore.
+
+    Raises
+    ------
+    ValueError
+        Raised if the key or certificates can't be decoded.
+    """
+    chain: List[bytes] = []
+    for pem in cert_chain:
+        for cert in pem_to_der(pem):
+            if cert not in chain:
+                chain.append(cert)
+    if not chain:
+        raise ValueError("Could not find a PEM certificate for the keystore")
+
+    protected_key = _protect_key(private_key_to_pkcs8(key), password)
+    entry = (
+        struct.pack(">I", _PRIVATE_KEY_TAG)
+        + _utf(alias.lower())
+        + struct.pack(">q", _timestamp_ms(timestamp))
+        + struct.pack(">I", len(protected_key))
+        + protected_key
+        + struct.pack(">I", len(chain))
+        + b"".join(_cert(cert) for cert in chain)
+    )
+    return _store([entry], password)
+
+
+def _store(entries: Sequence[bytes], password: str) -> bytes:
+    """Assemble the JKS header, entries, and trailing integrity digest."""
+    body = struct.pack(">III", _JKS_MAGIC, _JKS_VERSION, len(entries))
+    body += b"".join(entries)
+    digest = hashlib.sha1(
+        _password_bytes(password) + _DIGEST_WHITENER + body
+    ).digest()
+    return body + digest
+
+
+def _protect_key(pkcs8_key: bytes, password: str) -> bytes:
+    """Encrypt a PKCS#8 key with the JKS key protector algorithm and wrap it
+    as an ``EncryptedPrivateKeyInfo``.
+
+    This mirrors ``sun.security.provider.KeyProtector``: the key is XORed
+    with a SHA-1 keystream seeded by a random salt, and a SHA-1 check value
+    is appended.
+    """
+    password_bytes = _password_bytes(password)
+    salt = secrets.token_bytes(20)
+
+    keystream = b""
+    digest = salt
+    while len(keystream) < len(pkcs8_key):
+        digest = hashlib.sha1(password_bytes + digest).digest()
+        keystream += digest
+    encrypted = bytes(a ^ b for a, b in zip(pkcs8_key, keystream))
+    check = hashlib.sha1(password_bytes + pkcs8_key).digest()
+
+    algorithm = encode_der(
+        0x30, encode_der(0x06, _SUN_KEY_PROTECTOR_OID) + encode_der(0x05, b"")
+    )
+    return encode_der(
+        0x30, algorithm + encode_der(0x04, salt + encrypted + check)
+    )
+
+
+def _cert(der: bytes) -> bytes:
+    return _utf(_CERT_TYPE) + struct.pack(">I", len(der)) + der
+
+
+def _utf(value: str) -> bytes:
+    # Java's DataOutput.writeUTF; identical to UTF-8 for the ASCII aliases
+    # and type names used here.
+    encoded = value.encode("utf-8")
+    return struct.pack(">H", len(encoded)) + encoded
+
+
+def _password_bytes(password: str) -> bytes:
+    # Java passwords are char arrays, serialized as big-endian UTF-16.
+    return password.encode("utf-16-be")
+
+
+def _timestamp_ms(timestamp: Optional[float]) -> int:
+    if timestamp is None:
+        timestamp = time.time()
+    return int(timestamp * 1000)
+
+
+def encode_der(tag: int, content: bytes) -> bytes:
+    """Encode a DER type-length-value triplet."""
+    length = len(content)
+    if length < 0x80:
+        encoded_length = bytes([length])
+    else:
+        length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+        encoded_length = bytes([0x80 | len(length_bytes)]) + length_bytes
+    return bytes([tag]) + encoded_length + content
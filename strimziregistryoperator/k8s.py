@@ -1,24 +1,126 @@
-__all__ = ("create_k8sclient", "get_deployment", "get_service", "get_secret")
+__all__ = (
+    "FIELD_MANAGER",
+    "K8sClient",
+    "close_k8sclient",
+    "create_k8sclient",
+    "get_deployment",
+    "get_kafka",
+    "get_kafkauser",
+    "get_service",
+    "get_secret",
+    "get_ssr",
+)
 
 import json
+import threading
 
 import kubernetes
 
+from . import state
+
+FIELD_MANAGER = "strimzi-registry-operator"
+"""The field manager name that the operator's writes are recorded under."""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class K8sClient:
+    """A Kubernetes client that shares one `kubernetes.client.ApiClient`,
+    and therefore one pool of keep-alive connections, between all API
+    groups.
+
+    Instances stand in for the ``kubernetes.client`` module: the
+    ``CoreV1Api``, ``AppsV1Api``, and ``CustomObjectsApi`` methods return
+    cached API objects bound to the shared ApiClient, and any other
+    attribute, such as ``V1Secret``, is looked up in ``kubernetes.client``.
+
+    Parameters
+    ----------
+    configuration : `kubernetes.client.Configuration`
+        The client configuration, with credentials already loaded.
+    """
+
+    def __init__(self, configuration):
+        self.configuration = configuration
+        self.api_client = kubernetes.client.ApiClient(configuration)
+        self._apis = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(kubernetes.client, name)
+
+    def CoreV1Api(self):
+        """Get the shared `kubernetes.client.CoreV1Api`."""
+        return self._get_api(kubernetes.client.CoreV1Api)
+
+    def AppsV1Api(self):
+        """Get the shared `kubernetes.client.AppsV1Api`."""
+        return self._get_api(kubernetes.client.AppsV1Api)
+
+    def CustomObjectsApi(self):
+        """Get the shared `kubernetes.client.CustomObjectsApi`."""
+        return self._get_api(kubernetes.client.CustomObjectsApi)
+
+    def close(self):
+        """Close the pooled connections."""
+        self.api_client.close()
+
+    def _get_api(self, api_class):
+        with self._lock:
+            api = self._apis.get(api_class)
+            if api is None:
+                api = api_class(api_client=self.api_client)
+                self._apis[api_class] = api
+            return api
+
 
 def create_k8sclient():
-    """Get a Kubernetes client configured with available cluster
-    authentication.
+    """Get the process-wide Kubernetes client, configured with available
+    cluster authentication.
 
     If in-cluster authentication is available, that is used. Otherwise
     this function falls-back to using a kubectl config file, which is
     appropriate for development.
+
+    The configuration is loaded once, on the first call. With in-cluster
+    authentication, the service account token is re-read from disk when it
+    expires, so rotated tokens are picked up without reloading the
+    configuration.
+
+    Returns
+    -------
+    K8sClient
+        The shared client. Its connection pool holds up to
+        `state.k8s_pool_size` connections.
     """
-    try:
-        kubernetes.config.load_incluster_config()
-    except Exception:
-        kubernetes.config.load_kube_config()
-    kubernetes.client.configuration.assert_hostname = False
-    return kubernetes.client
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            configuration = kubernetes.client.Configuration()
+            try:
+                kubernetes.config.load_incluster_config(
+                    client_configuration=configuration, try_refresh_token=True
+                )
+            except Exception:
+                kubernetes.config.load_kube_config(
+                    client_configuration=configuration
+                )
+            configuration.assert_hostname = False
+            configuration.connection_pool_maxsize = state.k8s_pool_size
+            _client = K8sClient(configuration)
+        return _client
+
+
+def close_k8sclient():
+    """Close the process-wide Kubernetes client, if it was created."""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
 
 
 def get_deployment(*, name, namespace, k8s_client, raw=True):
@@ -33,14 +135,20 @@ def get_deployment(*, name, namespace, k8s_client, raw=True):
     k8s_client
         A Kubernetes client (see `create_k8sclient`).
     raw : `bool`
-        If `True`, the raw Kubernetes manifest is returned as a `dict`.
-        Otherwise the Python object representation of the resource is returned.
+        If `True`, the raw Kubernetes manifest is returned as a `dict`, from
+        `state.resource_cache` if it is cached. Otherwise the Python object
+        representation of the resource is read from the Kubernetes API.
 
     Returns
     -------
     service
         The Kubernetes Deployment resource either as a `dict` or an object.
     """
+    if raw:
+        cached = state.resource_cache.get("deployments", namespace, name)
+        if cached is not None:
+            return cached
+
     if raw:
         preload_content = False
     else:
@@ -68,14 +176,20 @@ def get_service(*, name, namespace, k8s_client, raw=True):
     k8s_client
         A Kubernetes client (see `create_k8sclient`).
     raw : `bool`
-        If `True`, the raw Kubernetes manifest is returned as a `dict`.
-        Otherwise the Python object representation of the resource is returned.
+        If `True`, the raw Kubernetes manifest is returned as a `dict`, from
+        `state.resource_cache` if it is cached. Otherwise the Python object
+        representation of the resource is read from the Kubernetes API.
 
     Returns
     -------
     service
         The Kubernetes Service resource either as a `dict` or an object.
     """
+    if raw:
+        cached = state.resource_cache.get("services", namespace, name)
+        if cached is not None:
+            return cached
+
     if raw:
         preload_content = False
     else:
@@ -103,14 +217,20 @@ def get_secret(*, namespace, name, k8s_client, raw=True):
     k8s_client
         A Kubernetes client (see `create_k8sclient`).
     raw : `bool`
-        If `True`, the raw Kubernetes manifest is returned as a `dict`.
-        Otherwise the Python object representation of the resource is returned.
+        If `True`, the raw Kubernetes manifest is returned as a `dict`, from
+        `state.resource_cache` if it is cached. Otherwise the Python object
+        representation of the resource is read from the Kubernetes API.
 
     Returns
     -------
     secret
         The Kubernetes Secret resource either as a `dict` or an object.
     """
+    if raw:
+        cached = state.resource_cache.get("secrets", namespace, name)
+        if cached is not None:
+            return cached
+
     if raw:
         preload_content = False
     else:
@@ -138,8 +258,9 @@ def get_ssr(*, namespace, name, k8s_client, raw=True):
     k8s_client
         A Kubernetes client (see `create_k8sclient`).
     raw : `bool`
-        If `True`, the raw Kubernetes manifest is returned as a `dict`.
-        Otherwise the Python object representation of the resource is returned.
+        If `True`, the raw Kubernetes manifest is returned as a `dict`, from
+        `state.resource_cache` if it is cached. Otherwise the Python object
+        representation of the resource is read from the Kubernetes API.
 
     Returns
     -------
@@ -147,6 +268,13 @@ def get_ssr(*, namespace, name, k8s_client, raw=True):
         The Kubernetes StrimziSchemaRegistry resource either as a `dict` or an
         object.
     """
+    if raw:
+        cached = state.resource_cache.get(
+            "strimzischemaregistries", namespace, name
+        )
+        if cached is not None:
+            return cached
+
     if raw:
         preload_content = False
     else:
@@ -157,7 +285,7 @@ def get_ssr(*, namespace, name, k8s_client, raw=True):
         group="roundtable.lsst.codes",
         version="v1beta1",
         namespace=namespace,
-        plural="ssrs",
+        plural="strimzischemaregistries",
         name=name,
         _preload_content=preload_content,
     )
@@ -165,3 +293,79 @@ def get_ssr(*, namespace, name, k8s_client, raw=True):
         return json.loads(result.data)
     else:
         return result
+
+
+def get_kafkauser(*, namespace, name, k8s_client, version="v1beta2"):
+    """Get a Strimzi KafkaUser resource.
+
+    Parameters
+    ----------
+    namespace : `str`
+        The Kubernetes namespace where the Strimzi Kafka cluster operates.
+    name : `str`
+        The name of the KafkaUser.
+    k8s_client
+        A Kubernetes client (see `create_k8sclient`).
+    version : `str`
+        The version of the ``kafka.strimzi.io`` API.
+
+    Returns
+    -------
+    kafkauser : `dict`
+        The KafkaUser resource, from `state.resource_cache` if it is cached
+        with the same API version.
+    """
+    return _get_strimzi_resource(
+        plural="kafkausers",
+        namespace=namespace,
+        name=name,
+        k8s_client=k8s_client,
+        version=version,
+    )
+
+
+def get_kafka(*, namespace, name, k8s_client, version="v1beta2"):
+    """Get a Strimzi Kafka resource.
+
+    Parameters
+    ----------
+    namespace : `str`
+        The Kubernetes namespace where the Strimzi Kafka cluster operates.
+    name : `str`
+        The name of the Kafka cluster.
+    k8s_client
+        A Kubernetes client (see `create_k8sclient`).
+    version : `str`
+        The version of the ``kafka.strimzi.io`` API.
+
+    Returns
+    -------
+    kafka : `dict`
+        The Kafka resource, from `state.resource_cache` if it is cached with
+        the same API version.
+    """
+    return _get_strimzi_resource(
+        plural="kafkas",
+        namespace=namespace,
+        name=name,
+        k8s_client=k8s_client,
+        version=version,
+    )
+
+
+def _get_strimzi_resource(*, plural, namespace, name, k8s_client, version):
+    cached = state.resource_cache.get(plural, namespace, name)
+    # The shape of Strimzi resources differs between API versions
+    if cached is not None and (
+        cached.get("apiVersion") == f"kafka.strimzi.io/{version}"
+    ):
+        return cached
+
+    api = k8s_client.CustomObjectsApi()
+    return api.get_namespaced_custom_object(
+        group="kafka.strimzi.io",
+        version=version,
+        namespace=namespace,
+        plural=plural,
+        name=name,
+    )
@@ -0,0 +1,338 @@
+"""Content-addressed cache of generated truststores and keystores.
+
+Stores are keyed by a SHA-256 digest of the PEM inputs they were built from
+(see `compute_input_digest`). The digest and the fingerprints of each input
+(see `fingerprint`) are also recorded as annotations on the ``<user>-jks``
+Secret, which makes the Secret itself a persistent cache entry: after an
+operator restart, a Secret whose fingerprints match the current inputs is
+reused without rebuilding or rewriting it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+__all__ = (
+    "KeystoreBundle",
+    "KeystoreCache",
+    "TruststoreCache",
+    "compute_input_digest",
+    "fingerprint",
+)
+
+
+@dataclass(frozen=True)
+class KeystoreBundle:
+    """A truststore and keystore pair, with their passwords."""
+
+    keystore_type: str
+    """The store format (see
+    `strimziregistryoperator.certprocessor.KEYSTORE_TYPES`).
+    """
+
+    truststore: bytes
+    """The content of the truststore."""
+
+    truststore_password: Optional[str]
+    """The truststore password, or `None` for unprotected stores."""
+
+    keystore: bytes
+    """The content of the keystore."""
+
+    keystore_password: Optional[str]
+    """The keystore password, or `None` for unprotected stores."""
+
+    @classmethod
+    def from_secret(
+        cls, secret: Mapping[str, Any], *, keystore_type: str, extension: str
+    ) -> KeystoreBundle:
+        """Load the stores from the ``data`` of a JKS Secret resource.
+
+        Raises
+        ------
+        KeyError
+            Raised if the Secret does not have the stores for this type.
+        """
+        data = secret["data"]
+
+        def decode_password(key: str) -> Optional[str]:
+            if key not in data:
+                return None
+            return base64.b64decode(data[key]).decode("utf-8")
+
+        return cls(
+            keystore_type=keystore_type,
+            truststore=base64.b64decode(data[f"truststore.{extension}"]),
+            truststore_password=decode_password("truststore_password"),
+            keystore=base64.b64decode(data[f"keystore.{extension}"]),
+            keystore_password=decode_password("keystore_password"),
+        )
+
+
+def fingerprint(value: str) -> str:
+    """Get the hex-encoded SHA-256 fingerprint of a PEM field."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def compute_input_digest(
+    *,
+    cluster_ca_cert: str,
+    client_ca_cert: str,
+    client_cert: str,
+    client_key: str,
+    keystore_type: str,
+) -> str:
+    """Compute the cache key for the stores built from these inputs.
+
+    Returns
+    -------
+    digest : `str`
+        Hex-encoded SHA-256 digest of the keystore type and PEM inputs.
+    """
+    h = hashlib.sha256()
+    for value in (
+        keystore_type,
+        cluster_ca_cert,
+        client_ca_cert,
+        client_cert,
+        client_key,
+    ):
+        encoded = value.encode("utf-8")
+        # Length-prefix each field so that boundaries are unambiguous
+        h.update(len(encoded).to_bytes(8, "big"))
+        h.update(encoded)
+    return h.hexdigest()
+
+
+class KeystoreCache:
+    """A bounded, least-recently-used cache of `KeystoreBundle` objects.
+
+    Parameters
+    ----------
+    maxsize : `int`
+        The maximum number of entries. When the cache is full, adding an
+        entry evicts the least-recently-used one.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, KeystoreBundle] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        """Number of lookups answered from memory."""
+
+        self.persistent_hits = 0
+        """Number of lookups answered by an up-to-date JKS Secret."""
+
+        self.misses = 0
+        """Number of lookups that required building new stores."""
+
+        self.evictions = 0
+        """Number of entries evicted to respect ``maxsize``."""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> Optional[KeystoreBundle]:
+        """Get the stores for an input digest, counting a hit or a miss."""
+        with self._lock:
+            bundle = self._entries.get(digest)
+            if bundle is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return bundle
+
+    def put(self, digest: str, bundle: KeystoreBundle) -> None:
+        """Add or refresh an entry, evicting the least-recently-used entry
+        if the cache is full.
+        """
+        with self._lock:
+            self._entries[digest] = bundle
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_persistent_hit(
+        self, digest: str, bundle: KeystoreBundle
+    ) -> None:
+        """Record that an existing Secret already holds the stores for a
+        digest, and keep them in memory for later lookups.
+        """
+        self.put(digest, bundle)
+        with self._lock:
+            self.persistent_hits += 1
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.persistent_hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache size and counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class TruststoreCache:
+    """A bounded cache of truststores shared by every registry of a Kafka
+    cluster.
+
+    Every registry of a cluster trusts the same cluster CA certificate, so
+    the truststore is built once per cluster, CA fingerprint, and store type,
+    and then reused (with the same password) for each registry's Secret.
+
+    The cache is partitioned by cluster: a CA rotation in one cluster never
+    evicts the truststores of another.
+
+    Parameters
+    ----------
+    maxsize : `int`
+        The maximum number of truststores per cluster. When a cluster's
+        partition is full, adding an entry evicts the cluster's
+        least-recently-used one.
+    """
+
+    def __init__(self, maxsize: int = 4) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[
+            Tuple[str, str, str], Tuple[bytes, Optional[str]]
+        ] = OrderedDict()
+        self._lock = Lock()
+        self._build_locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+        self.hits = 0
+        """Number of lookups answered by a cached truststore."""
+
+        self.builds = 0
+        """Number of truststores built."""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_build(
+        self,
+        *,
+        cluster: str,
+        ca_fingerprint: str,
+        store_type: str,
+        build: Callable[[], Awaitable[Tuple[bytes, Optional[str]]]],
+    ) -> Tuple[bytes, Optional[str]]:
+        """Get the truststore for a cluster CA, building it if necessary.
+
+        Parameters
+        ----------
+        cluster : `str`
+            The Kafka cluster, such as ``<namespace>/<name>``.
+        ca_fingerprint : `str`
+            The fingerprint of the cluster CA certificate (see
+            `fingerprint`).
+        store_type : `str`
+            The truststore format.
+        build : callable
+            Coroutine function that builds the truststore, returning the
+            content and password. It is called at most once per key, even if
+            several registries ask for the same truststore concurrently.
+
+        Returns
+        -------
+        truststore : `bytes`
+            The content of the truststore.
+        password : `str` or `None`
+            The truststore's password.
+        """
+        key = (cluster, ca_fingerprint, store_type)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+        build_lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with build_lock:
+            try:
+                # Another caller may have built it while we waited
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+                entry = await build()
+            finally:
+                # Also drop the lock of a failed build, so that failing keys
+                # don't accumulate
+                self._build_locks.pop(key, None)
+            self.put(
+                cluster=cluster,
+                ca_fingerprint=ca_fingerprint,
+                store_type=store_type,
+                truststore=entry[0],
+                password=entry[1],
+            )
+            with self._lock:
+                self.builds += 1
+            return entry
+
+    def put(
+        self,
+        *,
+        cluster: str,
+        ca_fingerprint: str,
+        store_type: str,
+        truststore: bytes,
+        password: Optional[str],
+    ) -> None:
+        """Add a truststore, such as one loaded from an up-to-date Secret
+        after a restart.
+        """
+        key = (cluster, ca_fingerprint, store_type)
+        with self._lock:
+            self._entries[key] = (truststore, password)
+            self._entries.move_to_end(key)
+            cluster_keys = [k for k in self._entries if k[0] == cluster]
+            # Evict the cluster's least-recently-used entries
+            for evicted in cluster_keys[: len(cluster_keys) - self.maxsize]:
+                del self._entries[evicted]
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.builds = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache size and counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "builds": self.builds,
+            }
+
+    def _lookup(
+        self, key: Tuple[str, str, str]
+    ) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
@@ -0,0 +1,157 @@
+"""A bounded worker pool for building truststores and keystores off the
+operator's event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import kopf
+
+__all__ = ("KeystorePool", "KeystorePoolFullError", "POOL_KINDS")
+
+T = TypeVar("T")
+
+POOL_KINDS = ("thread", "process")
+"""Supported kinds of keystore pools.
+
+A ``thread`` pool suits the ``keytool`` backend, which mostly waits on
+subprocesses. A ``process`` pool spreads the in-process crypto of the
+``python`` backend across CPU cores.
+"""
+
+
+class KeystorePoolFullError(kopf.TemporaryError):
+    """Raised when the keystore pool's queue is full.
+
+    Being a `kopf.TemporaryError`, kopf retries the handler later.
+    """
+
+
+class KeystorePool:
+    """A size-limited executor for keystore builds with a queue-depth limit.
+
+    Parameters
+    ----------
+    max_workers : `int`
+        The number of builds that can run at once.
+    max_queue_depth : `int`
+        The number of builds that can wait for a free worker. Submitting a
+        build when the queue is full raises `KeystorePoolFullError`.
+    kind : `str`
+        Either ``thread`` or ``process`` (see `POOL_KINDS`).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 4,
+        max_queue_depth: int = 64,
+        kind: str = "thread",
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue_depth < 0:
+            raise ValueError("max_queue_depth can't be negative")
+        if kind not in POOL_KINDS:
+            raise ValueError(
+                f"Unknown keystore pool kind {kind!r}. Use one of "
+                f"{', '.join(POOL_KINDS)}."
+            )
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._running = 0
+        self._waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.completed = 0
+        """Number of builds that finished, successfully or not."""
+
+        self.rejected = 0
+        """Number of builds rejected because the queue was full."""
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of builds waiting for a free worker."""
+        return self._waiting
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a function in the pool and wait for its result.
+
+        With a ``process`` pool, the function and its arguments must be
+        picklable.
+
+        Raises
+        ------
+        KeystorePoolFullError
+            Raised if ``max_queue_depth`` builds are already waiting.
+        """
+        if self._semaphore is None:
+            # Created lazily so that it binds to the operator's event loop
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        if self._running >= self.max_workers and (
+            self._waiting >= self.max_queue_depth
+        ):
+            self.rejected += 1
+            raise KeystorePoolFullError(
+                f"Keystore pool is full ({self._waiting} builds queued).",
+                delay=5,
+            )
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the pool's configuration and counters."""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "running": self._running,
+            "queued": self._waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """Shut down the executor, waiting for running builds."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._semaphore = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Spawn rather than fork; the operator process runs threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="keystore",
+                )
+        return self._executor
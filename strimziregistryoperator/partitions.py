@@ -0,0 +1,185 @@
+"""Per-cluster partitions of the operator's state, for operators that serve
+several Strimzi Kafka clusters and namespaces.
+
+Each Kafka cluster, identified by its namespace and name, gets its own
+`ClusterPartition`, so a certificate rotation in one cluster only reads and
+writes the state of that cluster. The registries of each cluster are
+indexed by `strimziregistryoperator.secretindex.SecretIndex`, and their
+truststores are kept by
+`strimziregistryoperator.keystorecache.TruststoreCache`, which evicts
+entries per cluster.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import time
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+__all__ = (
+    "ClusterPartition",
+    "ClusterPartitions",
+    "get_single_namespace",
+    "is_served_cluster",
+    "match_namespace",
+    "parse_cluster_names",
+)
+
+
+def parse_cluster_names(value: str) -> Tuple[str, ...]:
+    """Parse a comma-separated list of Kafka cluster names, such as the
+    ``SSR_CLUSTER_NAME`` environment variable.
+
+    ``*`` stands for any cluster.
+    """
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def is_served_cluster(
+    cluster: Optional[str], cluster_names: Tuple[str, ...]
+) -> bool:
+    """Check whether the operator serves a Kafka cluster (see
+    `parse_cluster_names`).
+    """
+    if cluster is None:
+        return False
+    return "*" in cluster_names or cluster in cluster_names
+
+
+def match_namespace(namespace: str, pattern: str) -> bool:
+    """Check whether a namespace matches a namespace pattern, such as the
+    ``SSR_NAMESPACE`` environment variable.
+
+    The pattern is a comma-separated list of globs, with the syntax of
+    kopf's ``--namespace`` option: globs that start with ``!`` exclude
+    namespaces, the last glob that matches a namespace decides, and a
+    namespace that no glob matches is included only if the pattern starts
+    with an exclusion.
+    """
+    globs = [glob.strip() for glob in pattern.split(",") if glob.strip()]
+    matches = bool(globs) and globs[0].startswith("!")
+    for glob in globs:
+        if glob.startswith("!"):
+            if fnmatch.fnmatch(namespace, glob[1:]):
+                matches = False
+        elif fnmatch.fnmatch(namespace, glob):
+            matches = True
+    return matches
+
+
+def get_single_namespace(pattern: str) -> Optional[str]:
+    """Get the namespace that a namespace pattern names, or `None` if the
+    pattern can match several namespaces.
+    """
+    if any(character in pattern for character in "*?[!,"):
+        return None
+    return pattern.strip()
+
+
+class ClusterPartition:
+    """The state of one Kafka cluster."""
+
+    def __init__(self, namespace: str, cluster: str) -> None:
+        self.namespace = namespace
+        """The namespace of the Kafka cluster."""
+
+        self.cluster = cluster
+        """The name of the Kafka cluster."""
+
+        self.ca_fingerprint: Optional[str] = None
+        """The fingerprint of the cluster CA certificate that every
+        registry of the cluster was last refreshed with, or `None` if the
+        registries haven't been refreshed since the operator started.
+        """
+
+        self.rotations = 0
+        """Number of cluster CA certificates that the registries were
+        refreshed with.
+        """
+
+        self.last_rotation: Optional[float] = None
+        """The `time.monotonic` time of the last refresh."""
+
+        self.registries: Dict[str, str] = {}
+        """The fingerprint of the cluster CA certificate in each registry's
+        JKS Secret, by registry name, as last written or validated by the
+        operator.
+        """
+
+    def is_current(self, ca_fingerprint: str) -> bool:
+        """Check whether the registries of the cluster were already
+        refreshed with a cluster CA certificate.
+        """
+        return self.ca_fingerprint == ca_fingerprint
+
+    def is_registry_current(self, name: str, ca_fingerprint: str) -> bool:
+        """Check whether a registry's JKS Secret was already written or
+        validated with a cluster CA certificate.
+        """
+        return self.registries.get(name) == ca_fingerprint
+
+    def record_registry(self, name: str, ca_fingerprint: str) -> None:
+        """Record that a registry's JKS Secret has a cluster CA
+        certificate.
+        """
+        self.registries[name] = ca_fingerprint
+
+    def record_rotation(self, ca_fingerprint: str) -> None:
+        """Record that every registry of the cluster was refreshed with a
+        cluster CA certificate.
+        """
+        self.ca_fingerprint = ca_fingerprint
+        self.rotations += 1
+        self.last_rotation = time.monotonic()
+
+
+class ClusterPartitions:
+    """The `ClusterPartition` of each Kafka cluster, created as the
+    clusters are seen.
+    """
+
+    def __init__(self) -> None:
+        self._partitions: Dict[Tuple[str, str], ClusterPartition] = {}
+        self._lock = Lock()
+
+    def __iter__(self) -> Iterator[ClusterPartition]:
+        with self._lock:
+            return iter(list(self._partitions.values()))
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def get(self, namespace: str, cluster: str) -> ClusterPartition:
+        """Get the partition of a Kafka cluster, creating it if needed."""
+        with self._lock:
+            key = (namespace, cluster)
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = ClusterPartition(namespace, cluster)
+                self._partitions[key] = partition
+            return partition
+
+    def discard(self, namespace: str, cluster: str) -> None:
+        """Remove the partition of a deleted Kafka cluster."""
+        with self._lock:
+            self._partitions.pop((namespace, cluster), None)
+
+    def discard_registry(self, namespace: str, name: str) -> None:
+        """Forget a deleted registry in the partitions of its namespace."""
+        for partition in self:
+            if partition.namespace == namespace:
+                partition.registries.pop(name, None)
+
+    def stats(self) -> List[Dict[str, object]]:
+        """Get the state of each partition."""
+        return [
+            {
+                "namespace": partition.namespace,
+                "cluster": partition.cluster,
+                "rotations": partition.rotations,
+            }
+            for partition in sorted(
+                self, key=lambda p: (p.namespace, p.cluster)
+            )
+        ]
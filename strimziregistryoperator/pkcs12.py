@@ -0,0 +1,231 @@
+"""Writers for PKCS#12 truststores and keystores.
+
+The keystore is serialized with the ``cryptography`` package. The truststore
+is assembled directly because Java only treats a certificate without a
+private key as a trusted entry if the certificate bag carries Oracle's
+``trustedKeyUsage`` attribute, which general-purpose PKCS#12 writers don't
+set.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+from typing import List, Sequence
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+from .jks import encode_der, pem_to_der
+
+__all__ = ("build_truststore", "build_keystore", "load_pem_chain")
+
+# DER-encoded OBJECT IDENTIFIER contents.
+_DATA_OID = bytes.fromhex("2a864886f70d010701")
+_CERT_BAG_OID = bytes.fromhex("2a864886f70d010c0a0103")
+_X509_CERTIFICATE_OID = bytes.fromhex("2a864886f70d01091601")
+_FRIENDLY_NAME_OID = bytes.fromhex("2a864886f70d010914")
+_TRUSTED_KEY_USAGE_OID = bytes.fromhex("6086480186f966adca7b0101")
+_ANY_EXTENDED_KEY_USAGE_OID = bytes.fromhex("551d2500")
+_SHA1_OID = bytes.fromhex("2b0e03021a")
+
+_MAC_ITERATIONS = 2048
+
+
+def load_pem_chain(cert_chain: Sequence[str]) -> List[x509.Certificate]:
+    """Load PEM certificates, dropping duplicates but preserving order.
+
+    Parameters
+    ----------
+    cert_chain : sequence of `str`
+        PEM texts, each containing one or more certificates.
+
+    Returns
+    -------
+    certificates : `list` of `cryptography.x509.Certificate`
+        The certificates.
+    """
+    ders: List[bytes] = []
+    for pem in cert_chain:
+        for der in pem_to_der(pem):
+            if der not in ders:
+                ders.append(der)
+    return [x509.load_der_x509_certificate(der) for der in ders]
+
+
+def build_truststore(
+    ca_cert: str, password: str, *, alias: str = "caroot"
+) -> bytes:
+    """Build a PKCS#12 truststore of trusted certificate entries.
+
+    Parameters
+    ----------
+    ca_cert : `str`
+        PEM-encoded CA certificate(s). The first entry is named ``alias``
+        and any additional entries are suffixed with ``-1``, ``-2``, and so
+        on.
+    password : `str`
+        The store password, used for the integrity MAC.
+    alias : `str`
+        The alias of the first trusted certificate entry.
+
+    Returns
+    -------
+    truststore : `bytes`
+        The content of the PKCS#12 truststore.
+
+    Raises
+    ------
+    ValueError
+        Raised if ``ca_cert`` does not contain any certificates.
+    """
+    certs = pem_to_der(ca_cert)
+    if not certs:
+        raise ValueError("Could not find a PEM certificate for the truststore")
+
+    bags = b""
+    for i, cert in enumerate(certs):
+        entry_alias = alias if i == 0 else f"{alias}-{i}"
+        cert_bag = encode_der(
+            0x30,
+            encode_der(0x06, _X509_CERTIFICATE_OID)
+            + encode_der(0xA0, encode_der(0x04, cert)),
+        )
+        attributes = encode_der(
+            0x31,
+            encode_der(
+                0x30,
+                encode_der(0x06, _FRIENDLY_NAME_OID)
+                + encode_der(
+                    0x31, encode_der(0x1E, entry_alias.encode("utf-16-be"))
+                ),
+            )
+            + encode_der(
+                0x30,
+                encode_der(0x06, _TRUSTED_KEY_USAGE_OID)
+                + encode_der(
+                    0x31, encode_der(0x06, _ANY_EXTENDED_KEY_USAGE_OID)
+                ),
+            ),
+        )
+        bags += encode_der(
+            0x30,
+            encode_der(0x06, _CERT_BAG_OID)
+            + encode_der(0xA0, cert_bag)
+            + attributes,
+        )
+
+    safe_contents = encode_der(0x30, bags)
+    authenticated_safe = encode_der(0x30, _data_content_info(safe_contents))
+
+    salt = secrets.token_bytes(20)
+    mac_key = _pkcs12_kdf(
+        password, salt, purpose=3, iterations=_MAC_ITERATIONS, size=20
+    )
+    mac = hmac.new(mac_key, authenticated_safe, hashlib.sha1).digest()
+    mac_data = encode_der(
+        0x30,
+        encode_der(
+            0x30,
+            encode_der(
+                0x30, encode_der(0x06, _SHA1_OID) + encode_der(0x05, b"")
+            )
+            + encode_der(0x04, mac),
+        )
+        + encode_der(0x04, salt)
+        + encode_der(0x02, _MAC_ITERATIONS.to_bytes(2, "big")),
+    )
+
+    return encode_der(
+        0x30,
+        encode_der(0x02, b"\x03")
+        + _data_content_info(authenticated_safe)
+        + mac_data,
+    )
+
+
+def build_keystore(
+    key: str,
+    cert_chain: Sequence[str],
+    password: str,
+    *,
+    alias: str = "confluent-schema-registry",
+) -> bytes:
+    """Build a PKCS#12 keystore with a single private key entry.
+
+    Parameters
+    ----------
+    key : `str`
+        The PEM-encoded, unencrypted private key.
+    cert_chain : sequence of `str`
+        PEM-encoded certificates for the key's certificate chain, starting
+        with the certificate for ``key`` and followed by its issuers.
+    password : `str`
+        The password for the store and the private key.
+    alias : `str`
+        The friendly name of the private key entry.
+
+    Returns
+    -------
+    keystore : `bytes`
+        The content of the PKCS#12 keystore.
+    """
+    private_key = serialization.load_pem_private_key(
+        key.encode("utf-8"), password=None
+    )
+    certs = load_pem_chain(cert_chain)
+    if not certs:
+        raise ValueError("Could not find a PEM certificate for the keystore")
+    return pkcs12.serialize_key_and_certificates(
+        alias.encode("utf-8"),
+        private_key,  # type: ignore[arg-type]
+        certs[0],
+        certs[1:],
+        serialization.BestAvailableEncryption(password.encode("utf-8")),
+    )
+
+
+def _data_content_info(content: bytes) -> bytes:
+    return encode_der(
+        0x30,
+        encode_der(0x06, _DATA_OID)
+        + encode_der(0xA0, encode_der(0x04, content)),
+    )
+
+
+def _pkcs12_kdf(
+    password: str, salt: bytes, *, purpose: int, iterations: int, size: int
+) -> bytes:
+    """Derive key material with the PKCS#12 KDF (RFC 7292, appendix B.2)
+    using SHA-1.
+    """
+    u = 20  # SHA-1 digest size
+    v = 64  # SHA-1 block size
+
+    def fill(data: bytes) -> bytes:
+        if not data:
+            return b""
+        length = v * ((len(data) + v - 1) // v)
+        return (data * (length // len(data) + 1))[:length]
+
+    # Passwords are BMPStrings with a trailing NULL character.
+    password_bytes = password.encode("utf-16-be") + b"\x00\x00"
+    diversifier = bytes([purpose]) * v
+    i_block = bytearray(fill(salt) + fill(password_bytes))
+
+    output = b""
+    while len(output) < size:
+        a = hashlib.sha1(diversifier + bytes(i_block)).digest()
+        for _ in range(iterations - 1):
+            a = hashlib.sha1(a).digest()
+        output += a
+
+        b = int.from_bytes((a * (v // u + 1))[:v], "big")
+        for j in range(0, len(i_block), v):
+            chunk = int.from_bytes(i_block[j : j + v], "big")
+            chunk = (chunk + b + 1) % (1 << (v * 8))
+            i_block[j : j + v] = chunk.to_bytes(v, "big")
+
+    return output[:size]
@@ -0,0 +1,402 @@
+"""Provisioning of the JKS Secret, Deployment, and Service of a Schema
+Registry.
+
+Creating a registry takes several Kubernetes API reads and writes. Those that
+don't depend on each other run concurrently, so the time to create a registry
+is bound by its longest chain of dependent calls rather than by the total
+number of calls:
+
+1. The KafkaUser is read, alongside the Deployment and Service existence
+   checks.
+2. Once the KafkaUser names the Kafka cluster, the bootstrap server is
+   resolved (see `strimziregistryoperator.bootstrapservers`) while the
+   cluster CA, client, and JKS Secrets are read (concurrently) and the JKS
+   Secret is rebuilt if needed.
+3. The Deployment and Service are created concurrently.
+4. What was deployed is recorded in the StrimziSchemaRegistry's status (see
+   `strimziregistryoperator.registrystatus`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import kopf
+from kubernetes.client.rest import ApiException
+
+from . import state
+from .certprocessor import KEYSTORE_TYPES, create_secret
+from .deployments import (
+    create_deployment,
+    create_service,
+    get_kafka_bootstrap_server,
+)
+from .desiredstate import stamp_state_hash
+from .k8s import (
+    create_k8sclient,
+    get_deployment,
+    get_kafka,
+    get_kafkauser,
+    get_secret,
+    get_service,
+)
+from .registryindex import registry_key
+from .registrystatus import get_registry_status, update_registry_status
+from .secretindex import get_kafka_username
+
+__all__ = (
+    "deploy_registry",
+    "get_desired_state",
+    "get_keystore_type",
+    "get_nullable",
+)
+
+
+async def deploy_registry(*, spec, namespace, name, logger, body):
+    """Deploy the JKS Secret, Schema Registry Deployment, and Service for a
+    StrimziSchemaRegistry (see
+    `strimziregistryoperator.handlers.createregistry.create_registry`).
+
+    The existence checks of the Deployment and Service overlap with the
+    lookups and the JKS Secret build of `get_desired_state`, and the
+    Deployment and Service are created concurrently.
+    """
+    k8s_client = create_k8sclient()
+    k8s_apps_v1_api = k8s_client.AppsV1Api()
+    k8s_core_v1_api = k8s_client.CoreV1Api()
+
+    (
+        (secret, dep_body, svc_body),
+        deployment_exists,
+        service_exists,
+    ) = await asyncio.gather(
+        get_desired_state(
+            spec=spec,
+            namespace=namespace,
+            name=name,
+            body=body,
+            k8s_client=k8s_client,
+            logger=logger,
+            creating=True,
+        ),
+        _resource_exists(
+            get_deployment,
+            name=name,
+            namespace=namespace,
+            k8s_client=k8s_client,
+        ),
+        _resource_exists(
+            get_service, name=name, namespace=namespace, k8s_client=k8s_client
+        ),
+    )
+
+    async def create(kind, exists, create_fn, resource_body):
+        if exists:
+            logger.info("%s already exists", kind)
+            return False
+        # Set the StrimziSchemaRegistry as the owner
+        kopf.adopt(resource_body, owner=body)
+        response = await asyncio.to_thread(
+            create_fn, body=resource_body, namespace=namespace
+        )
+        logger.debug(str(response))
+        return True
+
+    # Create the Schema Registry deployment and the http service to access
+    # the Schema Registry REST API
+    deployment_created, _ = await asyncio.gather(
+        create(
+            "Deployment",
+            deployment_exists,
+            k8s_apps_v1_api.create_namespaced_deployment,
+            dep_body,
+        ),
+        create(
+            "Service",
+            service_exists,
+            k8s_core_v1_api.create_namespaced_service,
+            svc_body,
+        ),
+    )
+
+    await update_registry_status(
+        name=name,
+        namespace=namespace,
+        status=get_registry_status(
+            secret=secret,
+            deployment=dep_body,
+            generation=body["metadata"].get("generation"),
+            rolled_out=deployment_created,
+        ),
+        k8s_client=k8s_client,
+        logger=logger,
+        current=body.get("status"),
+    )
+
+    # Add the name of the registry to the cache
+    state.registry_names.add(registry_key(namespace, name))
+    logger.info("Resource cache: %s", state.resource_cache.stats())
+
+
+async def _resource_exists(get, *, name, namespace, k8s_client):
+    """Check whether a resource exists, with one of the getters of
+    `strimziregistryoperator.k8s`.
+    """
+    try:
+        await asyncio.to_thread(
+            get, name=name, namespace=namespace, k8s_client=k8s_client
+        )
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        return False
+    return True
+
+
+async def get_desired_state(
+    *,
+    spec,
+    namespace,
+    name,
+    body,
+    k8s_client,
+    logger,
+    creating=False,
+    refresh_secret=True,
+):
+    """Build the desired JKS Secret, Deployment, and Service of a
+    StrimziSchemaRegistry.
+
+    The JKS Secret is written (see
+    `strimziregistryoperator.certprocessor.create_secret`) if it is missing
+    or outdated, since the Deployment refers to its ``resourceVersion``.
+    With ``refresh_secret=False``, an existing JKS Secret is used as-is,
+    without checking it against the Strimzi certificates.
+
+    Parameters
+    ----------
+    spec : dict
+        The ``spec`` field of the ``StrimziSchemaRegistry``.
+    namespace : str
+        The Kubernetes namespace of the ``StrimziSchemaRegistry``.
+    name : str
+        The name of the ``StrimziSchemaRegistry``.
+    body : dict
+        The full body of the ``StrimziSchemaRegistry``, which owns the
+        Secret.
+    k8s_client
+        A Kubernetes client (see
+        `strimziregistryoperator.k8s.create_k8sclient`).
+    logger
+        The kopf logger.
+    creating : bool
+        Whether the registry is being created, which is logged at the
+        ``INFO`` level (``DEBUG`` otherwise).
+    refresh_secret : bool
+        Whether to check the JKS Secret against the Strimzi certificates,
+        rebuilding it if needed.
+
+    Returns
+    -------
+    secret : dict
+        The JKS Secret.
+    deployment : dict
+        The desired Deployment, with its desired-state hash (see
+        `strimziregistryoperator.desiredstate.stamp_state_hash`). It isn't
+        adopted by the ``StrimziSchemaRegistry`` yet.
+    service : dict
+        The desired Service, with its desired-state hash.
+    """
+    # Get configurations from StrimziSchemaRegistry
+    try:
+        strimzi_api_version = spec["strimziVersion"]
+    except KeyError:
+        try:
+            strimzi_api_version = spec["strimzi-version"]
+            logger.warning(
+                "The strimzi-version configuration is deprecated. "
+                "Use strimziVersion instead."
+            )
+        except KeyError:
+            strimzi_api_version = "v1beta2"
+            logger.warning(
+                "StrimziSchemaRegistry %s is missing a strimziVersion, "
+                "using default %s",
+                name,
+                strimzi_api_version,
+            )
+
+    try:
+        listener_name = spec["listener"]
+    except KeyError:
+        listener_name = "tls"
+        logger.warning(
+            "StrimziSchemaRegistry %s is missing a listener name, "
+            "using default %s",
+            name,
+            listener_name,
+        )
+
+    service_type = spec.get("serviceType", "ClusterIP")
+
+    registry_image = spec.get(
+        "registryImage", "confluentinc/cp-schema-registry"
+    )
+
+    registry_image_tag = spec.get("registryImageTag", "7.2.1")
+
+    # Limits and requests can be None so that they are omitted from the
+    # registry's deployment specification
+    registry_cpu_limit = get_nullable(spec, "cpuLimit")
+    registry_cpu_request = get_nullable(spec, "cpuRequest")
+    registry_mem_limit = get_nullable(spec, "memoryLimit")
+    registry_mem_request = get_nullable(spec, "memoryRequest")
+
+    # Additional schema Registry configurations
+    registry_compatibility_level = spec.get("compatibilitylevel", "forward")
+    security_protocol = spec.get("securityProtocol", "SSL")
+    keystore_type = get_keystore_type(spec)
+
+    logger.log(
+        logging.INFO if creating else logging.DEBUG,
+        "%s Schema Registry deployment: %s with listener=%s "
+        "(security protocol=%s, keystore type=%s) and strimzi-version=%s "
+        "serviceType=%s image=%s:%s",
+        "Creating a new" if creating else "Reconciling the",
+        name,
+        listener_name,
+        security_protocol,
+        keystore_type,
+        strimzi_api_version,
+        service_type,
+        registry_image,
+        registry_image_tag,
+    )
+
+    # Get the name of the Kafka cluster associated with the
+    # StrimziSchemaRegistry's associated strimzi KafkaUser resource.
+    # The KafkaUser defaults to the name of the StrimziSchemaRegistry.
+    kafka_username = get_kafka_username(spec, name)
+    kafkauser = await asyncio.to_thread(
+        get_kafkauser,
+        namespace=namespace,
+        name=kafka_username,
+        k8s_client=k8s_client,
+        version=strimzi_api_version,
+    )
+    cluster_name = kafkauser["metadata"]["labels"]["strimzi.io/cluster"]
+
+    async def get_bootstrap_server():
+        # Get the Kafka bootstrap server corresponding to the configured
+        # Kafka listener name.
+        bootstrap_server = state.bootstrap_servers.lookup(
+            namespace=namespace,
+            cluster=cluster_name,
+            listener_name=listener_name,
+            registry=registry_key(namespace, name),
+        )
+        if bootstrap_server is not None:
+            return bootstrap_server
+        kafka = await asyncio.to_thread(
+            get_kafka,
+            namespace=namespace,
+            name=cluster_name,
+            k8s_client=k8s_client,
+            version=strimzi_api_version,
+        )
+        bootstrap_server = get_kafka_bootstrap_server(
+            kafka, listener_name=listener_name
+        )
+        state.bootstrap_servers.put(
+            kafka,
+            namespace=namespace,
+            cluster=cluster_name,
+            listener_name=listener_name,
+            registry=registry_key(namespace, name),
+            address=bootstrap_server,
+        )
+        return bootstrap_server
+
+    async def get_jks_secret():
+        if not refresh_secret:
+            try:
+                return await asyncio.to_thread(
+                    get_secret,
+                    namespace=namespace,
+                    name=f"{name}-jks",
+                    k8s_client=k8s_client,
+                )
+            except ApiException as e:
+                if e.status != 404:
+                    raise
+                logger.warning("JKS secret is missing; creating it")
+        # Create the JKS-formatted truststore/keystore secrets
+        return await create_secret(
+            kafka_username=kafka_username,
+            namespace=namespace,
+            cluster=cluster_name,
+            owner=body,
+            k8s_client=k8s_client,
+            keystore_type=keystore_type,
+            jks_secret_name=f"{name}-jks",
+            logger=logger,
+        )
+
+    # The Kafka lookup and the JKS Secret only depend on the cluster name
+    bootstrap_server, secret = await asyncio.gather(
+        get_bootstrap_server(), get_jks_secret()
+    )
+    secret_name = secret["metadata"]["name"]
+    secret_version = secret["metadata"]["resourceVersion"]
+
+    dep_body = create_deployment(
+        name=name,
+        bootstrap_server=bootstrap_server,
+        secret_name=secret_name,
+        secret_version=secret_version,
+        registry_image=registry_image,
+        registry_image_tag=registry_image_tag,
+        registry_cpu_limit=registry_cpu_limit,
+        registry_cpu_request=registry_cpu_request,
+        registry_mem_limit=registry_mem_limit,
+        registry_mem_request=registry_mem_request,
+        compatibility_level=registry_compatibility_level,
+        security_protocol=security_protocol,
+        keystore_type=keystore_type,
+    )
+    svc_body = create_service(name=name, service_type=service_type)
+    return secret, stamp_state_hash(dep_body), stamp_state_hash(svc_body)
+
+
+def get_nullable(spec: Dict[str, str], key: str) -> Optional[str]:
+    """Get a nullable property of the StrimziSchemaRegistry resource.
+
+    If the propety is an empty string, it is null. If it is missing, it is =
+    null.
+    """
+    value = spec.get(key)
+    if value is None:
+        return None
+    elif value == "":
+        return None
+    else:
+        return value
+
+
+def get_keystore_type(spec: Dict[str, str]) -> str:
+    """Get the keystore type of the StrimziSchemaRegistry resource.
+
+    Raises
+    ------
+    kopf.PermanentError
+        Raised if the ``keystoreType`` is not supported.
+    """
+    keystore_type = spec.get("keystoreType", "JKS")
+    if keystore_type not in KEYSTORE_TYPES:
+        raise kopf.PermanentError(
+            f"Unsupported keystoreType {keystore_type!r}. Use one of "
+            f"{', '.join(KEYSTORE_TYPES)}."
+        )
+    return keystore_type
@@ -0,0 +1,122 @@
+"""Index of the StrimziSchemaRegistry resources that the operator manages."""
+
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+__all__ = ("RegistryIndex", "registry_key", "split_registry_key")
+
+
+def registry_key(namespace: str, name: str) -> str:
+    """Get the key of a StrimziSchemaRegistry, ``<namespace>/<name>``, which
+    identifies it in a `RegistryIndex` and in
+    `strimziregistryoperator.state.refresh_queue` when the operator watches
+    several namespaces.
+    """
+    return f"{namespace}/{name}"
+
+
+def split_registry_key(key: str) -> Tuple[str, str]:
+    """Split a key from `registry_key` into the namespace and name of the
+    StrimziSchemaRegistry.
+    """
+    namespace, name = key.split("/", 1)
+    return namespace, name
+
+
+class RegistryIndex:
+    """The names of the StrimziSchemaRegistry resources that exist, which
+    the Secret handlers fan out to.
+
+    Names are added when a registry is created or resumed and removed when
+    it is deleted. Because deletion events can be missed, the index is also
+    periodically replaced by the result of a list call (see `sync`).
+
+    Deleted names are remembered, with the time of their deletion, until
+    the next `sync`. This keeps a list call that started before the deletion
+    from adding the registry back.
+    """
+
+    def __init__(self) -> None:
+        self._names: Set[str] = set()
+        self._deleted: Dict[str, float] = {}
+        self._lock = Lock()
+        self.syncs = 0
+        """Number of times the index was synced with a list call."""
+
+        self.last_sync: Optional[float] = None
+        """The `time.monotonic` time of the last sync."""
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterate over a snapshot, so handlers can update the index
+        with self._lock:
+            return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str) -> None:
+        """Add a registry, such as one that was just created."""
+        with self._lock:
+            self._names.add(name)
+            self._deleted.pop(name, None)
+
+    def discard(self, name: str) -> None:
+        """Remove a deleted registry, if it is in the index."""
+        with self._lock:
+            self._names.discard(name)
+            self._deleted[name] = time.monotonic()
+
+    def sync(
+        self, names: Iterable[str], *, started: float
+    ) -> Tuple[List[str], List[str]]:
+        """Replace the index with the result of a list call.
+
+        Parameters
+        ----------
+        names : iterable of `str`
+            The names of the StrimziSchemaRegistry resources that were
+            listed.
+        started : `float`
+            The `time.monotonic` time when the list call started. Registries
+            deleted after that time aren't added back.
+
+        Returns
+        -------
+        added : `list` of `str`
+            The registries that were missing from the index.
+        removed : `list` of `str`
+            The registries that no longer exist.
+        """
+        with self._lock:
+            listed = {
+                name
+                for name in names
+                if self._deleted.get(name, float("-inf")) < started
+            }
+            added = sorted(listed - self._names)
+            removed = sorted(self._names - listed)
+            self._names = listed
+            # Forget deletions that the list call already reflects
+            self._deleted = {
+                name: deleted_at
+                for name, deleted_at in self._deleted.items()
+                if deleted_at >= started
+            }
+            self.syncs += 1
+            self.last_sync = time.monotonic()
+            return added, removed
+
+    def stats(self) -> Dict[str, int]:
+        """Get the index size and counters."""
+        with self._lock:
+            return {
+                "size": len(self._names),
+                "deleted": len(self._deleted),
+                "syncs": self.syncs,
+            }
@@ -0,0 +1,205 @@
+"""The ``status`` of StrimziSchemaRegistry resources, which records what the
+operator last reconciled for each registry.
+
+The status holds the ``metadata.generation`` of the reconciled spec, the
+certificate fingerprints and ``resourceVersion`` of the JKS Secret, the
+Kafka bootstrap server, and the time of the last rollout. With it, whether
+a registry needs any work can be decided from the StrimziSchemaRegistry
+alone (see `is_reconciled`), which is served from
+`strimziregistryoperator.state.resource_cache`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+from typing import Any, Dict, Mapping, Optional
+
+from kubernetes.client.rest import ApiException
+
+from . import state
+from .k8s import FIELD_MANAGER
+
+__all__ = (
+    "STATUS_FINGERPRINTS",
+    "get_registry_status",
+    "is_reconciled",
+    "diff_status",
+    "format_timestamp",
+    "patch_registry_status",
+    "update_registry_status",
+)
+
+STATUS_FINGERPRINTS = {
+    "clusterCaCert": "clusterCaCertFingerprint",
+    "clientCaCert": "clientCaCertFingerprint",
+    "userCert": "userCertFingerprint",
+}
+"""Mapping of the ``status.certificateFingerprints`` fields to the JKS
+Secret annotations they are copied from (see
+`strimziregistryoperator.certprocessor.FINGERPRINT_ANNOTATIONS`).
+
+The fingerprint of the user key stays on the Secret.
+"""
+
+_KEY_PREFIX = "strimziregistryoperator.roundtable.lsst.codes"
+
+
+def get_registry_status(
+    *,
+    secret: Mapping[str, Any],
+    deployment: Optional[Mapping[str, Any]] = None,
+    generation: Optional[int] = None,
+    rolled_out: bool = False,
+) -> Dict[str, Any]:
+    """Build the status of a registry from its JKS Secret and rendered
+    Deployment.
+
+    Parameters
+    ----------
+    secret : `dict`
+        The JKS Secret, as written (see
+        `strimziregistryoperator.certprocessor.create_secret`).
+    deployment : `dict`, optional
+        The desired Deployment (see
+        `strimziregistryoperator.provisioning.get_desired_state`), which
+        ``bootstrapServer`` is read from. If not set, ``bootstrapServer`` is
+        left out.
+    generation : `int`, optional
+        The ``metadata.generation`` of the StrimziSchemaRegistry that the
+        resources were rendered from. If not set, ``observedGeneration`` is
+        left out.
+    rolled_out : `bool`
+        Whether the Deployment's pods were just restarted, in which case
+        ``lastRolloutTime`` is set to the current time.
+
+    Returns
+    -------
+    status : `dict`
+        The fields of the status.
+    """
+    annotations = secret["metadata"].get("annotations") or {}
+    fingerprints = {
+        field: annotations[f"{_KEY_PREFIX}/{annotation}"]
+        for field, annotation in STATUS_FINGERPRINTS.items()
+        if f"{_KEY_PREFIX}/{annotation}" in annotations
+    }
+    status: Dict[str, Any] = {
+        "jksSecretVersion": secret["metadata"]["resourceVersion"],
+        "certificateFingerprints": fingerprints,
+    }
+    if deployment is not None:
+        containers = deployment["spec"]["template"]["spec"]["containers"]
+        for env in containers[0].get("env", []):
+            if env["name"] == "SCHEMA_REGISTRY_KAFKASTORE_BOOTSTRAP_SERVERS":
+                status["bootstrapServer"] = env["value"]
+    if generation is not None:
+        status["observedGeneration"] = generation
+    if rolled_out:
+        status["lastRolloutTime"] = format_timestamp()
+    return status
+
+
+def is_reconciled(body: Mapping[str, Any]) -> bool:
+    """Check whether the status of a StrimziSchemaRegistry shows that its
+    current spec was reconciled.
+
+    Changes to the certificates aren't covered: they reach the operator as
+    Secret events.
+    """
+    status = body.get("status") or {}
+    generation = body["metadata"].get("generation")
+    return (
+        generation is not None
+        and status.get("observedGeneration") == generation
+        and "jksSecretVersion" in status
+    )
+
+
+def diff_status(
+    current: Optional[Mapping[str, Any]], status: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """Get the fields of a status that differ from the current status."""
+    current = current or {}
+    return {
+        field: value
+        for field, value in status.items()
+        if current.get(field) != value
+    }
+
+
+def format_timestamp(now: Optional[datetime.datetime] = None) -> str:
+    """Format a time (by default, the current time) as an RFC 3339 UTC
+    timestamp, like Kubernetes' ``date-time`` fields.
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return now.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def patch_registry_status(
+    *, name: str, namespace: str, status: Mapping[str, Any], k8s_client: Any
+) -> Dict[str, Any]:
+    """Merge fields into the status subresource of a StrimziSchemaRegistry.
+
+    Returns
+    -------
+    ssr : `dict`
+        The patched StrimziSchemaRegistry.
+    """
+    api = k8s_client.CustomObjectsApi()
+    # A dict body is sent as a JSON merge patch
+    return api.patch_namespaced_custom_object_status(
+        "roundtable.lsst.codes",
+        "v1beta1",
+        namespace,
+        "strimzischemaregistries",
+        name,
+        {"status": dict(status)},
+        field_manager=FIELD_MANAGER,
+    )
+
+
+async def update_registry_status(
+    *,
+    name: str,
+    namespace: str,
+    status: Mapping[str, Any],
+    k8s_client: Any,
+    logger: Any,
+    current: Optional[Mapping[str, Any]] = None,
+) -> bool:
+    """Write the fields of a registry's status that changed.
+
+    Parameters
+    ----------
+    current : `dict`, optional
+        The current status. Only the fields that differ from it are written,
+        so a registry in its steady state costs no writes. If not set, every
+        field is written.
+
+    Returns
+    -------
+    written : `bool`
+        Whether the status was patched. A failed patch is logged rather than
+        raised, since the status only records work that already succeeded.
+    """
+    changes = diff_status(current, status)
+    if not changes:
+        return False
+    try:
+        response = await asyncio.to_thread(
+            patch_registry_status,
+            name=name,
+            namespace=namespace,
+            status=changes,
+            k8s_client=k8s_client,
+        )
+    except ApiException as e:
+        logger.warning("Couldn't update the status of %s: %s", name, e)
+        return False
+    # Cache the patched resource so that reads don't wait for its watch
+    # event
+    state.resource_cache.put("strimzischemaregistries", response)
+    logger.debug("Updated the status of %s: %s", name, ", ".join(changes))
+    return True
@@ -0,0 +1,149 @@
+"""A watch-fed, in-memory cache of the Kubernetes resources that the
+operator reads.
+
+The cache is an informer-style store: kopf event handlers (see
+`strimziregistryoperator.handlers.resourcewatcher`) feed it every
+``ADDED``, ``MODIFIED``, and ``DELETED`` event for the watched kinds, and the
+``get_*`` helpers in `strimziregistryoperator.k8s` read from it before falling
+back to the Kubernetes API.
+"""
+
+from __future__ import annotations
+
+import copy
+import time
+from threading import Lock
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+__all__ = ("ResourceCache", "CACHED_KINDS")
+
+CACHED_KINDS = (
+    "secrets",
+    "deployments",
+    "services",
+    "kafkas",
+    "kafkausers",
+    "strimzischemaregistries",
+)
+"""The resource kinds (plural names) that the cache holds."""
+
+
+class ResourceCache:
+    """An in-memory store of raw Kubernetes resources, keyed by kind,
+    namespace, and name.
+
+    Resources are stored and returned as deep copies of their raw ``dict``
+    representation, so callers can't mutate cached entries.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._last_event: Dict[str, float] = {}
+        self._lock = Lock()
+        self.hits = 0
+        """Number of reads answered from the cache."""
+
+        self.misses = 0
+        """Number of reads that fell back to the Kubernetes API."""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe(
+        self, kind: str, event_type: Optional[str], body: Mapping[str, Any]
+    ) -> None:
+        """Apply a watch event to the cache.
+
+        Parameters
+        ----------
+        kind : `str`
+            The plural name of the resource kind (see `CACHED_KINDS`).
+        event_type : `str` or `None`
+            The watch event type: ``ADDED``, ``MODIFIED``, ``DELETED``, or
+            `None` for resources listed when the watch starts.
+        body : `dict`
+            The raw resource.
+        """
+        key = self._key(kind, body)
+        with self._lock:
+            self._last_event[kind] = time.monotonic()
+            if event_type == "DELETED":
+                cached = self._entries.get(key)
+                # A re-created resource with the same name has a new uid
+                if cached is not None and _uid(cached) == _uid(body):
+                    del self._entries[key]
+            else:
+                self._entries[key] = copy.deepcopy(dict(body))
+
+    def put(self, kind: str, body: Mapping[str, Any]) -> None:
+        """Store a resource returned by a write to the Kubernetes API, so
+        that reads see the write before its watch event arrives.
+        """
+        with self._lock:
+            self._entries[self._key(kind, body)] = copy.deepcopy(dict(body))
+
+    def get(
+        self, kind: str, namespace: str, name: str
+    ) -> Optional[Dict[str, Any]]:
+        """Get a resource, counting a hit or a miss.
+
+        Returns
+        -------
+        resource : `dict` or `None`
+            A copy of the raw resource, or `None` if it isn't cached.
+        """
+        with self._lock:
+            body = self._entries.get((kind, namespace, name))
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(body)
+
+    def invalidate(self, kind: str, namespace: str, name: str) -> None:
+        """Drop a resource, such as one the operator just deleted."""
+        with self._lock:
+            self._entries.pop((kind, namespace, name), None)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._last_event.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache size, counters, and staleness.
+
+        The staleness of a kind is the number of seconds since the cache
+        last received a watch event for it, or `None` if it never has.
+        """
+        now = time.monotonic()
+        with self._lock:
+            kinds: Dict[str, Dict[str, Any]] = {}
+            for kind in CACHED_KINDS:
+                last_event = self._last_event.get(kind)
+                kinds[kind] = {
+                    "size": sum(1 for key in self._entries if key[0] == kind),
+                    "staleness": (
+                        None
+                        if last_event is None
+                        else round(now - last_event, 3)
+                    ),
+                }
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "kinds": kinds,
+            }
+
+    @staticmethod
+    def _key(kind: str, body: Mapping[str, Any]) -> Tuple[str, str, str]:
+        metadata = body["metadata"]
+        return (kind, metadata.get("namespace", ""), metadata["name"])
+
+
+def _uid(body: Mapping[str, Any]) -> Optional[str]:
+    return body["metadata"].get("uid")
@@ -0,0 +1,272 @@
+"""Rolling restarts of Schema Registry deployments after their JKS Secrets
+change.
+
+When the cluster CA certificate changes, every registry needs a restart.
+`roll_out_in_waves` restarts them a few at a time, waiting for each wave of
+Deployments to become ready before starting the next one, so that the
+registries don't all reconnect to the Kafka brokers at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Mapping, Optional
+
+from .deployments import update_deployment
+from .k8s import get_deployment
+from .registrystatus import format_timestamp, update_registry_status
+
+__all__ = (
+    "is_rollout_complete",
+    "roll_out_registry",
+    "roll_out_in_waves",
+    "wait_for_restart",
+    "wait_for_rollout",
+)
+
+
+def is_rollout_complete(
+    deployment: Mapping[str, Any], *, generation: Optional[int] = None
+) -> bool:
+    """Check whether a Deployment finished rolling out.
+
+    Parameters
+    ----------
+    deployment : `dict`
+        The raw Deployment resource.
+    generation : `int`, optional
+        The ``metadata.generation`` that the rollout must have reached, such
+        as the generation returned by the patch that started the rollout.
+        Defaults to the generation of ``deployment``.
+
+    Returns
+    -------
+    complete : `bool`
+        `True` if the Deployment controller observed the generation and every
+        replica is updated and available, with no old replicas left.
+    """
+    if generation is None:
+        generation = deployment["metadata"].get("generation", 0)
+    status = deployment.get("status") or {}
+    replicas = deployment["spec"].get("replicas", 1)
+    return (
+        status.get("observedGeneration", 0) >= generation
+        and status.get("updatedReplicas", 0) == replicas
+        and status.get("replicas", 0) == replicas
+        and status.get("availableReplicas", 0) == replicas
+    )
+
+
+async def roll_out_registry(
+    *,
+    name: str,
+    namespace: str,
+    secret_version: str,
+    k8s_client: Any,
+    logger: Any,
+) -> Optional[int]:
+    """Point a registry's Deployment at a new version of its JKS Secret,
+    which starts a rolling restart.
+
+    The time of the rollout is recorded in the ``lastRolloutTime`` status
+    field of the StrimziSchemaRegistry.
+
+    Returns
+    -------
+    generation : `int` or `None`
+        The Deployment generation of the rollout, or `None` if the pods
+        already use this version of the Secret and no rollout is needed.
+    """
+    deployment = await asyncio.to_thread(
+        get_deployment, name=name, namespace=namespace, k8s_client=k8s_client
+    )
+    # Skip the write if the pods already mount this version of the Secret
+    key_prefix = "strimziregistryoperator.roundtable.lsst.codes"
+    template_annotations = deployment["spec"]["template"]["metadata"].get(
+        "annotations", {}
+    )
+    if template_annotations.get(f"{key_prefix}/jksVersion") == secret_version:
+        logger.info("Deployment already uses JKS secret %s", secret_version)
+        return None
+
+    response = await asyncio.to_thread(
+        update_deployment,
+        secret_version=secret_version,
+        name=name,
+        namespace=namespace,
+        k8s_client=k8s_client,
+    )
+    await update_registry_status(
+        name=name,
+        namespace=namespace,
+        status={"lastRolloutTime": format_timestamp()},
+        k8s_client=k8s_client,
+        logger=logger,
+    )
+    return response.metadata.generation
+
+
+async def wait_for_rollout(
+    *,
+    name: str,
+    namespace: str,
+    k8s_client: Any,
+    generation: Optional[int] = None,
+    poll_interval: float = 2.0,
+) -> None:
+    """Wait until a Deployment's rollout is complete (see
+    `is_rollout_complete`).
+
+    Deployments are read through the resource cache, so polling doesn't
+    load the Kubernetes API server. Wrap the call in `asyncio.wait_for` to
+    limit the wait.
+    """
+    while True:
+        deployment = await asyncio.to_thread(
+            get_deployment,
+            name=name,
+            namespace=namespace,
+            k8s_client=k8s_client,
+        )
+        if is_rollout_complete(deployment, generation=generation):
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def wait_for_restart(
+    *,
+    name: str,
+    namespace: str,
+    k8s_client: Any,
+    generation: Optional[int],
+    timeout: float,
+    logger: Any,
+    poll_interval: float = 2.0,
+) -> bool:
+    """Wait for a registry's pods to restart after a change to its pod
+    template, giving up after a timeout.
+
+    Call it while holding `strimziregistryoperator.state.rollout_slots`, so
+    that registries whose pod templates change together, such as after an
+    operator upgrade, restart a wave at a time instead of all at once.
+
+    Returns
+    -------
+    ready : `bool`
+        `True` if the rollout completed within ``timeout`` seconds.
+    """
+    try:
+        await asyncio.wait_for(
+            wait_for_rollout(
+                name=name,
+                namespace=namespace,
+                k8s_client=k8s_client,
+                generation=generation,
+                poll_interval=poll_interval,
+            ),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Rollout of %s isn't ready after %.0fs", name, timeout)
+        return False
+    return True
+
+
+async def roll_out_in_waves(
+    secret_versions: Mapping[str, str],
+    *,
+    namespace: str,
+    k8s_client: Any,
+    wave_size: int,
+    wave_timeout: float,
+    logger: Any = None,
+    poll_interval: float = 2.0,
+) -> Dict[str, str]:
+    """Restart registries in waves after their JKS Secrets changed.
+
+    Parameters
+    ----------
+    secret_versions : `dict`
+        Mapping of registry names to the ``resourceVersion`` of their new JKS
+        Secrets. Registries are restarted in name order.
+    namespace : `str`
+        The Kubernetes namespace of the registries.
+    k8s_client
+        A Kubernetes client (see
+        `strimziregistryoperator.k8s.create_k8sclient`).
+    wave_size : `int`
+        The maximum number of registries that roll out at once.
+    wave_timeout : `float`
+        The time, in seconds, to wait for a wave to become ready. When it
+        elapses, the registries of the wave that are still rolling out are
+        reported as ``timeout`` and the next wave starts.
+    logger : optional
+        The logger. Defaults to the module's logger.
+    poll_interval : `float`
+        The time, in seconds, between readiness checks.
+
+    Returns
+    -------
+    outcomes : `dict`
+        Mapping of registry names to ``ready``, ``unchanged`` (the
+        Deployment already used the Secret version), ``timeout``, or
+        ``failed``.
+    """
+    if wave_size < 1:
+        raise ValueError("wave_size must be at least 1")
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    names = sorted(secret_versions)
+    waves: List[List[str]] = [
+        names[i : i + wave_size] for i in range(0, len(names), wave_size)
+    ]
+    outcomes: Dict[str, str] = {}
+    for number, wave in enumerate(waves, start=1):
+        logger.info(
+            "Rolling out wave %d of %d: %s",
+            number,
+            len(waves),
+            ", ".join(wave),
+        )
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def roll_out(name: str) -> None:
+            try:
+                generation = await roll_out_registry(
+                    name=name,
+                    namespace=namespace,
+                    secret_version=secret_versions[name],
+                    k8s_client=k8s_client,
+                    logger=logger,
+                )
+                if generation is None:
+                    outcomes[name] = "unchanged"
+                    return
+                remaining = max(0.0, wave_timeout - (loop.time() - start))
+                await asyncio.wait_for(
+                    wait_for_rollout(
+                        name=name,
+                        namespace=namespace,
+                        k8s_client=k8s_client,
+                        generation=generation,
+                        poll_interval=poll_interval,
+                    ),
+                    timeout=remaining,
+                )
+                outcomes[name] = "ready"
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Rollout of %s isn't ready after %.0fs",
+                    name,
+                    wave_timeout,
+                )
+                outcomes[name] = "timeout"
+            except Exception:
+                logger.exception("Failed to roll out %s", name)
+                outcomes[name] = "failed"
+
+        await asyncio.gather(*(roll_out(name) for name in wave))
+    return outcomes
@@ -0,0 +1,227 @@
+"""Index from Strimzi KafkaUser Secrets to the registries that use them.
+
+A Secret event names a KafkaUser Secret and, through its
+``strimzi.io/cluster`` label, a Kafka cluster. `SecretIndex` maps them to
+the records of the registries that connect as that KafkaUser, so routing an
+event, and adopting the JKS Secrets it rebuilds, takes no API calls.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+__all__ = ("RegistryRecord", "SecretIndex", "get_kafka_username")
+
+
+def get_kafka_username(spec: Mapping[str, Any], name: str) -> str:
+    """Get the name of the KafkaUser that a registry connects as.
+
+    This is the ``kafkaUser`` field of the StrimziSchemaRegistry's spec, and
+    defaults to the name of the StrimziSchemaRegistry.
+    """
+    return spec.get("kafkaUser") or name
+
+
+@dataclass(frozen=True)
+class RegistryRecord:
+    """What the operator needs to know about a StrimziSchemaRegistry to
+    refresh its JKS Secret.
+    """
+
+    name: str
+    """The name of the StrimziSchemaRegistry."""
+
+    namespace: str
+    """The namespace of the StrimziSchemaRegistry."""
+
+    kafka_user: str
+    """The name of the KafkaUser, and of its Strimzi Secret (see
+    `get_kafka_username`).
+    """
+
+    listener: str
+    """The name of the Kafka listener that the registry connects to."""
+
+    spec: Dict[str, Any]
+    """The spec of the StrimziSchemaRegistry."""
+
+    owner: Dict[str, Any]
+    """The parts of the StrimziSchemaRegistry that `kopf.adopt` needs to
+    make it the owner of a resource.
+    """
+
+    status: Dict[str, Any]
+    """The status of the StrimziSchemaRegistry (see
+    `strimziregistryoperator.registrystatus`).
+    """
+
+    cluster: Optional[str] = None
+    """The name of the Kafka cluster of the KafkaUser, or `None` if the
+    KafkaUser hasn't been seen yet.
+    """
+
+    @classmethod
+    def from_ssr(cls, ssr: Mapping[str, Any]) -> RegistryRecord:
+        """Create a record from a StrimziSchemaRegistry resource."""
+        metadata = ssr["metadata"]
+        spec = copy.deepcopy(dict(ssr.get("spec") or {}))
+        return cls(
+            name=metadata["name"],
+            namespace=metadata["namespace"],
+            kafka_user=get_kafka_username(spec, metadata["name"]),
+            listener=spec.get("listener", "tls"),
+            spec=spec,
+            owner={
+                "apiVersion": ssr["apiVersion"],
+                "kind": ssr["kind"],
+                "metadata": {
+                    "name": metadata["name"],
+                    "namespace": metadata["namespace"],
+                    "uid": metadata["uid"],
+                    "labels": dict(metadata.get("labels") or {}),
+                },
+            },
+            status=copy.deepcopy(dict(ssr.get("status") or {})),
+        )
+
+
+class SecretIndex:
+    """A multimap from KafkaUser Secrets to the records of the registries
+    that use them.
+
+    The index is fed by the watches on StrimziSchemaRegistry resources
+    (`update` and `discard`) and on KafkaUsers (`observe_kafkauser`), which
+    name the Kafka cluster of each KafkaUser. Several registries can connect
+    as the same KafkaUser.
+    """
+
+    def __init__(self) -> None:
+        self._records: Dict[Tuple[str, str], RegistryRecord] = {}
+        self._by_user: Dict[Tuple[str, str], Dict[str, RegistryRecord]] = {}
+        self._clusters: Dict[Tuple[str, str], str] = {}
+        self._lock = Lock()
+        self.lookups = 0
+        """Number of Secret events routed through the index."""
+
+    def update(self, ssr: Mapping[str, Any]) -> RegistryRecord:
+        """Add or replace the record of a StrimziSchemaRegistry."""
+        record = RegistryRecord.from_ssr(ssr)
+        with self._lock:
+            self._remove(record.namespace, record.name)
+            self._records[(record.namespace, record.name)] = record
+            self._by_user.setdefault(
+                (record.namespace, record.kafka_user), {}
+            )[record.name] = record
+        return record
+
+    def discard(self, namespace: str, name: str) -> None:
+        """Remove the record of a deleted StrimziSchemaRegistry."""
+        with self._lock:
+            self._remove(namespace, name)
+
+    def observe_kafkauser(
+        self, event_type: str, kafkauser: Mapping[str, Any]
+    ) -> None:
+        """Record the Kafka cluster of a KafkaUser from a watch event."""
+        key = (
+            kafkauser["metadata"]["namespace"],
+            kafkauser["metadata"]["name"],
+        )
+        labels = kafkauser["metadata"].get("labels") or {}
+        with self._lock:
+            if event_type == "DELETED" or "strimzi.io/cluster" not in labels:
+                self._clusters.pop(key, None)
+            else:
+                self._clusters[key] = labels["strimzi.io/cluster"]
+
+    def get(self, namespace: str, name: str) -> Optional[RegistryRecord]:
+        """Get the record of a StrimziSchemaRegistry, if it is indexed."""
+        with self._lock:
+            record = self._records.get((namespace, name))
+            if record is None:
+                return None
+            return self._resolve(record)
+
+    def lookup(
+        self, namespace: str, secret_name: str, cluster: Optional[str] = None
+    ) -> List[RegistryRecord]:
+        """Get the records of the registries that use a KafkaUser Secret.
+
+        Parameters
+        ----------
+        namespace : `str`
+            The namespace of the Secret.
+        secret_name : `str`
+            The name of the Secret, which is the name of its KafkaUser.
+        cluster : `str`, optional
+            The Kafka cluster of the Secret (its ``strimzi.io/cluster``
+            label). Registries whose KafkaUser belongs to another cluster
+            are left out.
+
+        Returns
+        -------
+        records : `list` of `RegistryRecord`
+            The records, in name order.
+        """
+        with self._lock:
+            self.lookups += 1
+            records = self._by_user.get((namespace, secret_name), {})
+            return [
+                self._resolve(record)
+                for _, record in sorted(records.items())
+                if cluster is None
+                or self._clusters.get((namespace, secret_name), cluster)
+                == cluster
+            ]
+
+    def for_cluster(
+        self, namespace: str, cluster: str
+    ) -> List[RegistryRecord]:
+        """Get the records of the registries of a Kafka cluster, in name
+        order.
+
+        Registries whose KafkaUser hasn't been seen yet are included.
+        """
+        with self._lock:
+            return [
+                self._resolve(record)
+                for (record_namespace, _), record in sorted(
+                    self._records.items()
+                )
+                if record_namespace == namespace
+                and self._clusters.get((namespace, record.kafka_user), cluster)
+                == cluster
+            ]
+
+    def is_kafka_user(self, namespace: str, name: str) -> bool:
+        """Check whether any registry connects as a KafkaUser."""
+        return bool(self._by_user.get((namespace, name)))
+
+    def stats(self) -> Dict[str, int]:
+        """Get the index size and counters."""
+        with self._lock:
+            return {
+                "registries": len(self._records),
+                "users": len(self._by_user),
+                "lookups": self.lookups,
+            }
+
+    def _remove(self, namespace: str, name: str) -> None:
+        record = self._records.pop((namespace, name), None)
+        if record is None:
+            return
+        user_key = (namespace, record.kafka_user)
+        records = self._by_user.get(user_key, {})
+        records.pop(name, None)
+        if not records:
+            self._by_user.pop(user_key, None)
+
+    def _resolve(self, record: RegistryRecord) -> RegistryRecord:
+        """Fill in the Kafka cluster of a record's KafkaUser."""
+        cluster = self._clusters.get((record.namespace, record.kafka_user))
+        if cluster == record.cluster:
+            return record
+        return replace(record, cluster=cluster)
@@ -1,34 +1,305 @@
-"""Code intended to run on start-up, before running any handlers.
+"""Priming of the operator's state when it starts.
+
+Priming runs in the background, from a kopf startup handler (see
+`strimziregistryoperator.handlers.lifecycle.start_registry_resync`), so that
+it doesn't delay the operator's watches.
 """
 
-__all__ = ("start_operator",)
+__all__ = (
+    "start_operator",
+    "list_registry_names",
+    "warm_up",
+    "warm_up_registry",
+)
+
+import asyncio
+import random
+import time
 
 from kubernetes.client.rest import ApiException
 
 from . import state
-from .k8s import create_k8sclient
+from .k8s import create_k8sclient, get_kafkauser, get_secret, get_ssr
+from .partitions import get_single_namespace, match_namespace
+from .provisioning import get_desired_state
+from .registryindex import registry_key, split_registry_key
+from .registrystatus import get_registry_status, update_registry_status
+from .rollouts import roll_out_registry
+from .secretindex import get_kafka_username
+
+STARTUP_BACKOFF_MAX = 60.0
+"""The longest backoff, in seconds, between attempts to prime the registry
+index.
+"""
+
+
+async def start_operator(*, logger):
+    """Start up the operator, priming its index of StrimziSchemaRegistry
+    names (`state.registry_names`).
+
+    A failed list is retried, after an exponential backoff with full jitter,
+    until it succeeds. The time spent in each phase is recorded in
+    `state.startup_timings` and logged.
 
+    Returns
+    -------
+    timings : dict
+        The startup timings (see `state.startup_timings`).
+    """
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        started = time.monotonic()
+        list_start = time.perf_counter()
+        try:
+            names = await asyncio.to_thread(list_registry_names)
+        except Exception as e:
+            delay = random.uniform(
+                0, min(STARTUP_BACKOFF_MAX, 2 ** (attempt - 1))
+            )
+            logger.warning(
+                "Failed to list StrimziSchemaRegistries (attempt %d): %s; "
+                "retrying in %.1fs",
+                attempt,
+                e,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            continue
+        list_duration = time.perf_counter() - list_start
+        break
 
-def start_operator():
-    """Start up the operator, priming its cache of the application state."""
+    # Add these StrimziSchemaRegistry keys to state.registry_names
+    index_start = time.perf_counter()
+    state.registry_names.sync(names, started=started)
+    index_duration = time.perf_counter() - index_start
+
+    total = time.perf_counter() - start
+    state.startup_timings.update(
+        {
+            "list": list_duration,
+            "retries": total - list_duration - index_duration,
+            "index": index_duration,
+            "total": total,
+            "attempts": attempt,
+            "registries": len(names),
+        }
+    )
+    logger.info(
+        "Primed the registry index with %d registries in %.2fs "
+        "(list %.2fs, %d attempts)",
+        len(names),
+        total,
+        list_duration,
+        attempt,
+    )
+    return state.startup_timings
+
+
+def list_registry_names(*, page_size=None):
+    """List the StrimziSchemaRegistry resources in the operator's namespaces
+    (`state.namespaces`).
+
+    A single namespace is listed directly. Otherwise, the
+    StrimziSchemaRegistries of the whole Kubernetes cluster are listed and
+    filtered by the namespace pattern.
+
+    Parameters
+    ----------
+    page_size : int, optional
+        The number of resources per page of results. Defaults to
+        `state.list_page_size`.
+
+    Returns
+    -------
+    keys : `list` of `str`
+        The ``<namespace>/<name>`` keys of the StrimziSchemaRegistry
+        resources (see
+        `strimziregistryoperator.registryindex.registry_key`).
+    """
+    if page_size is None:
+        page_size = state.list_page_size
     api = create_k8sclient().CustomObjectsApi()
+    namespace = get_single_namespace(state.namespaces)
+    keys = []
+    continue_token = None
+    while True:
+        kwargs = {"_continue": continue_token} if continue_token else {}
+        if namespace is None:
+            response = api.list_cluster_custom_object(
+                "roundtable.lsst.codes",
+                "v1beta1",
+                "strimzischemaregistries",
+                limit=page_size,
+                timeout_seconds=60,
+                **kwargs,
+            )
+        else:
+            response = api.list_namespaced_custom_object(
+                "roundtable.lsst.codes",
+                "v1beta1",
+                namespace,
+                "strimzischemaregistries",
+                limit=page_size,
+                timeout_seconds=60,
+                **kwargs,
+            )
+        keys.extend(
+            registry_key(ssr["metadata"]["namespace"], ssr["metadata"]["name"])
+            for ssr in response["items"]
+            if match_namespace(ssr["metadata"]["namespace"], state.namespaces)
+        )
+        continue_token = response["metadata"].get("continue")
+        if not continue_token:
+            return keys
 
+
+async def warm_up(*, logger):
+    """Check every registry's JKS Secret against the current certificates,
+    filling the keystore, truststore, and bootstrap server caches.
+
+    After a restart, this moves the cost of reading the certificates and
+    validating (or repairing) each JKS Secret from the first certificate
+    event of each registry to startup. Registries are warmed up through
+    `state.refresh_queue`, which bounds the concurrency and keeps the
+    warm-up of a registry from overlapping with its other work. The duration
+    and the number of repaired registries are recorded in
+    `state.startup_timings` and logged.
+
+    Returns
+    -------
+    outcomes : dict
+        Mapping of registry keys (``<namespace>/<name>``) to ``valid``,
+        ``repaired``, or ``failed``.
+    """
+    start = time.perf_counter()
+    k8s_client = create_k8sclient()
+    registry_keys = sorted(state.registry_names)
+
+    async def warm_up_one(key):
+        namespace, registry_name = split_registry_key(key)
+        try:
+            repaired = await state.refresh_queue.submit(
+                f"{key}/warmup",
+                warm_up_registry,
+                group=key,
+                debounce=0,
+                name=registry_name,
+                namespace=namespace,
+                k8s_client=k8s_client,
+                logger=logger,
+            )
+        except Exception as e:
+            logger.warning("Failed to warm up %s: %s", key, e)
+            return "failed"
+        return "repaired" if repaired else "valid"
+
+    results = await asyncio.gather(
+        *(warm_up_one(key) for key in registry_keys)
+    )
+    outcomes = dict(zip(registry_keys, results))
+    duration = time.perf_counter() - start
+    repaired = sum(1 for outcome in results if outcome == "repaired")
+    failed = sum(1 for outcome in results if outcome == "failed")
+    state.startup_timings.update(
+        {"warmup": duration, "repaired": repaired, "warmup_failures": failed}
+    )
+    logger.info(
+        "Warmed up %d registries in %.2fs (%d repaired, %d failed). "
+        "Keystore cache: %s. Bootstrap servers: %s",
+        len(registry_keys),
+        duration,
+        repaired,
+        failed,
+        state.keystore_cache.stats(),
+        state.bootstrap_servers.stats(),
+    )
+    return outcomes
+
+
+async def warm_up_registry(*, name, namespace, k8s_client, logger):
+    """Validate a registry's JKS Secret, repairing it if it doesn't match
+    the current certificates (see `warm_up`).
+
+    The cluster CA certificate of the validated Secret is recorded in the
+    cluster's partition (see `strimziregistryoperator.partitions`), so the
+    startup event of the cluster CA Secret doesn't refresh the registry
+    again. Registries that event already refreshed are skipped.
+
+    Returns
+    -------
+    repaired : bool
+        Whether the JKS Secret was rewritten, in which case the registry's
+        Deployment is rolled out to the new Secret.
+    """
+    record = state.registry_secrets.get(namespace, name)
+    if record is not None and record.cluster is not None:
+        partition = state.partitions.get(namespace, record.cluster)
+        if partition.ca_fingerprint is not None and (
+            partition.is_registry_current(name, partition.ca_fingerprint)
+        ):
+            logger.debug("%s was refreshed with the current cluster CA", name)
+            return False
+
+    ssr = await asyncio.to_thread(
+        get_ssr, name=name, namespace=namespace, k8s_client=k8s_client
+    )
     try:
-        response = api.list_namespaced_custom_object(
-            "roundtable.lsst.codes",
-            "v1beta1",
-            state.namespace,
-            "strimzischemaregistries",
-            timeout_seconds=60,
+        jks_secret = await asyncio.to_thread(
+            get_secret,
+            name=f"{name}-jks",
+            namespace=namespace,
+            k8s_client=k8s_client,
         )
+        previous_version = jks_secret["metadata"]["resourceVersion"]
     except ApiException as e:
-        print(
-            "Exception when calling CustomObjectsApi->"
-            "list_namespaced_custom_object: %s\n" % e
+        if e.status != 404:
+            raise
+        previous_version = None
+
+    # Fills the keystore, truststore, and bootstrap server caches
+    secret, dep_body, _ = await get_desired_state(
+        spec=ssr["spec"],
+        namespace=namespace,
+        name=name,
+        body=ssr,
+        k8s_client=k8s_client,
+        logger=logger,
+    )
+    status = get_registry_status(secret=secret, deployment=dep_body)
+    await update_registry_status(
+        name=name,
+        namespace=namespace,
+        status=status,
+        k8s_client=k8s_client,
+        logger=logger,
+        current=ssr.get("status"),
+    )
+    ca_fingerprint = status["certificateFingerprints"].get("clusterCaCert")
+    if ca_fingerprint is not None:
+        kafkauser = await asyncio.to_thread(
+            get_kafkauser,
+            namespace=namespace,
+            name=get_kafka_username(ssr["spec"], name),
+            k8s_client=k8s_client,
+            version=ssr["spec"].get("strimziVersion", "v1beta2"),
+        )
+        cluster = kafkauser["metadata"]["labels"]["strimzi.io/cluster"]
+        state.partitions.get(namespace, cluster).record_registry(
+            name, ca_fingerprint
         )
-        return
 
-    # Add these StrimziSchemaRegistry names to state.registry_names
-    for ssr in response["items"]:
-        name = ssr["metadata"]["name"]
-        state.registry_names.add(name)
+    secret_version = secret["metadata"]["resourceVersion"]
+    if secret_version == previous_version:
+        return False
+
+    logger.info("Repaired the JKS secret of %s", name)
+    await roll_out_registry(
+        name=name,
+        namespace=namespace,
+        secret_version=secret_version,
+        k8s_client=k8s_client,
+        logger=logger,
+    )
+    return True
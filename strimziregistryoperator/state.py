@@ -3,16 +3,161 @@
 
 import os
 
-cluster_name = os.environ.get("SSR_CLUSTER_NAME", "events")
-"""The name of the Kafka cluster serviced by the operator. """
+from .bootstrapservers import BootstrapServerCache
+from .keystorecache import KeystoreCache, TruststoreCache
+from .keystorepool import KeystorePool
+from .partitions import ClusterPartitions, parse_cluster_names
+from .registryindex import RegistryIndex
+from .resourcecache import ResourceCache
+from .secretindex import SecretIndex
+from .workqueue import CoalescingQueue, ConcurrencyLimit, TokenBucket
 
-namespace = os.environ.get("SSR_NAMESPACE", "events")
-"""The name of the Kubernetes namespace monitored by this operator. """
+cluster_names = parse_cluster_names(
+    os.environ.get("SSR_CLUSTER_NAME", "events")
+)
+"""The names of the Kafka clusters serviced by the operator, from a
+comma-separated list. ``*`` serves every cluster.
+"""
+
+namespaces = os.environ.get("SSR_NAMESPACE", "events")
+"""The Kubernetes namespaces monitored by this operator, as a kopf namespace
+pattern: a namespace, or a comma-separated list of globs (see
+`strimziregistryoperator.partitions.match_namespace`). ``*`` monitors the
+whole Kubernetes cluster.
+"""
+
+partitions = ClusterPartitions()
+"""The state of each Kafka cluster (see
+`strimziregistryoperator.partitions`).
+"""
+
+k8s_pool_size = int(os.environ.get("SSR_K8S_POOL_SIZE", "16"))
+"""The maximum number of pooled connections to the Kubernetes API server.
+"""
+
+keystore_backend = os.environ.get("SSR_KEYSTORE_BACKEND", "python")
+"""The engine used to build JKS truststores and keystores.
+
+Either ``python`` (in-process, the default) or ``keytool`` (the ``keytool``
+and ``openssl`` command-line tools).
+"""
+
+keystore_cache = KeystoreCache(
+    maxsize=int(os.environ.get("SSR_KEYSTORE_CACHE_SIZE", "128"))
+)
+"""In-memory cache of generated stores, keyed by the digest of their inputs.
 
+The ``<user>-jks`` Secrets act as the persistent tier of this cache (see
+`strimziregistryoperator.keystorecache`).
+"""
+keystore_pool = KeystorePool(
+    max_workers=int(os.environ.get("SSR_KEYSTORE_WORKERS", "4")),
+    max_queue_depth=int(os.environ.get("SSR_KEYSTORE_QUEUE_DEPTH", "64")),
+    kind=os.environ.get("SSR_KEYSTORE_POOL", "thread"),
+)
+"""The worker pool that builds truststores and keystores off the event loop.
+"""
+
+rotation_concurrency = int(os.environ.get("SSR_ROTATION_CONCURRENCY", "8"))
+"""The number of registries refreshed concurrently when the cluster CA
+certificate changes.
+"""
+
+rollout_wave_size = int(os.environ.get("SSR_ROLLOUT_WAVE_SIZE", "2"))
+"""The number of registries restarted at once after the cluster CA
+certificate changes.
+"""
+
+rollout_slots = ConcurrencyLimit(limit=rollout_wave_size)
+"""The registries whose pod template is being changed by a reconcile, such
+as when the operator first resumes registries without a status, and that
+are waiting for their pods to be ready. At most `rollout_wave_size` of them
+restart at once (see
+`strimziregistryoperator.rollouts.wait_for_restart`).
+"""
+
+rollout_wave_timeout = float(os.environ.get("SSR_ROLLOUT_WAVE_TIMEOUT", "300"))
+"""The time, in seconds, to wait for a wave of registry restarts to become
+ready before starting the next wave.
+"""
 
-registry_names = set()
-"""Cache of StrimziSchemaRegistry names being tracked.
+refresh_queue = CoalescingQueue(
+    debounce=float(os.environ.get("SSR_REFRESH_DEBOUNCE", "2")),
+    max_delay=float(os.environ.get("SSR_REFRESH_MAX_DELAY", "30")),
+    max_concurrency=rotation_concurrency,
+    max_retries=int(os.environ.get("SSR_RECONCILE_MAX_RETRIES", "5")),
+    rate_limiter=TokenBucket(
+        rate=float(os.environ.get("SSR_RECONCILE_RATE", "10")),
+        burst=int(os.environ.get("SSR_RECONCILE_BURST", "20")),
+    ),
+)
+"""The queue of registry deployments and refreshes, grouped by registry
+(see `strimziregistryoperator.registryindex.registry_key`).
+
+Certificate changes for a registry within the debounce window (in seconds)
+are collapsed into a single rebuild and rollout. At most one deployment or
+refresh runs for each registry at a time, failures are retried with
+backoff, and the overall rate of runs (per second) is limited.
+"""
+
+reconcile_interval = float(os.environ.get("SSR_RECONCILE_INTERVAL", "300"))
+"""The time, in seconds, between periodic reconciliations of each registry's
+resources with their desired state.
+"""
+
+truststore_cache = TruststoreCache()
+"""Truststores shared by the registries of each Kafka cluster, keyed by the
+cluster CA fingerprint and evicted per cluster.
+"""
+
+resource_cache = ResourceCache()
+"""Watch-fed cache of the Secrets, Deployments, Services, Strimzi resources,
+and StrimziSchemaRegistries read by the operator (see
+`strimziregistryoperator.handlers.resourcewatcher`).
+"""
+
+bootstrap_servers = BootstrapServerCache()
+"""Kafka bootstrap server addresses, keyed by cluster and listener name, and
+invalidated by the watch on Kafka resources.
+"""
+
+registry_names = RegistryIndex()
+"""Index of the StrimziSchemaRegistries being tracked, by their
+``<namespace>/<name>`` keys (see
+`strimziregistryoperator.registryindex.registry_key`).
+
+This state is updated as StrimziSchemaRegistry resources are created and
+deleted, and synced with a list call every `registry_resync_interval`
+seconds.
+"""
+
+registry_secrets = SecretIndex()
+"""Index from KafkaUser Secrets to the records of the registries that use
+them, which routes Secret events (see
+`strimziregistryoperator.handlers.secretwatcher`).
+
+This state is fed by the watches on StrimziSchemaRegistry and KafkaUser
+resources (see `strimziregistryoperator.handlers.resourcewatcher`).
+"""
+
+list_page_size = int(os.environ.get("SSR_LIST_PAGE_SIZE", "100"))
+"""The number of resources per page when the operator lists
+StrimziSchemaRegistry resources.
+"""
+
+startup_timings = {}
+"""Time, in seconds, spent in each phase of priming the operator's state
+(see `strimziregistryoperator.startup.start_operator`): ``list`` (the
+successful list call), ``retries`` (failed list calls and their backoff),
+``index``, and ``total``, with the number of ``attempts`` and
+``registries``. The warm-up that follows (see
+`strimziregistryoperator.startup.warm_up`) adds ``warmup``, with the number
+of ``repaired`` registries and of ``warmup_failures``.
+"""
 
-This state is updated as StrimziSchemaRegistry resources are detected and
-monitored.
+registry_resync_interval = float(
+    os.environ.get("SSR_REGISTRY_RESYNC_INTERVAL", "600")
+)
+"""The time, in seconds, between syncs of `registry_names` with the
+StrimziSchemaRegistry resources in the namespace.
 """
@@ -0,0 +1,439 @@
+"""A keyed reconcile queue that coalesces bursts of events into a single
+run, with per-key exclusivity, retries, and a global rate limit.
+
+A Strimzi CA renewal modifies the cluster CA Secret, the clients CA Secret,
+and every KafkaUser Secret, often several times within a few seconds. Each
+event submits work for the affected registries to a `CoalescingQueue`, which
+waits for a quiet window before running the work once per registry with the
+latest inputs. Like a controller work queue, the queue never runs two work
+items for the same registry at once, retries failed work with exponential
+backoff, and limits the overall rate of work with a `TokenBucket`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import kopf
+
+__all__ = ("CoalescingQueue", "ConcurrencyLimit", "TokenBucket")
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """A token-bucket rate limiter for coroutines.
+
+    Parameters
+    ----------
+    rate : `float`
+        The number of tokens added per second. Zero disables the limit.
+    burst : `int`
+        The capacity of the bucket, which is the number of acquisitions that
+        can happen back-to-back after an idle period.
+    """
+
+    def __init__(self, *, rate: float, burst: int = 1) -> None:
+        if rate < 0:
+            raise ValueError("rate can't be negative")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.throttled = 0
+        """Number of acquisitions that had to wait for a token."""
+
+    async def acquire(self) -> None:
+        """Wait for a token and take it."""
+        if self.rate == 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Waiters queue on the lock so that tokens are handed out in order
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            self._refill(loop.time())
+            if self._tokens < 1:
+                self.throttled += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill(loop.time())
+            self._tokens -= 1
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+
+class ConcurrencyLimit:
+    """An async context manager that limits how many coroutines hold it at
+    once, such as the registries that are restarting.
+
+    Parameters
+    ----------
+    limit : `int`
+        The number of coroutines that can hold the limit at once.
+    """
+
+    def __init__(self, *, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.held = 0
+        """Number of coroutines holding the limit."""
+
+        self.waited = 0
+        """Number of acquisitions that had to wait for another holder."""
+
+    async def __aenter__(self) -> None:
+        # The semaphore is created in the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked():
+            self.waited += 1
+        await self._semaphore.acquire()
+        self.held += 1
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.held -= 1
+        assert self._semaphore is not None
+        self._semaphore.release()
+
+
+@dataclass
+class _Pending:
+    """Work waiting to start."""
+
+    fn: Callable[..., Awaitable[Any]]
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    first_submitted: float
+    group: str
+    attempt: int = 0
+    not_before: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = field(default=None)
+
+
+class CoalescingQueue:
+    """A work queue that collapses submissions for the same key.
+
+    Work for a key starts once no new submission for that key has arrived
+    for ``debounce`` seconds, but no later than ``max_delay`` seconds after
+    the first submission of the burst. Submissions during the wait replace
+    the pending function and are merged into its keyword arguments, so the
+    work runs once with the latest inputs.
+
+    Work never runs concurrently with other work of the same group (by
+    default, each key is its own group): work that becomes due while its
+    group is in flight starts when the in-flight work finishes. Failed work
+    is retried up to ``max_retries`` times, after an exponential backoff
+    with full jitter, unless it raises `kopf.PermanentError`. Every run,
+    including retries, first takes a token from ``rate_limiter``.
+
+    Parameters
+    ----------
+    debounce : `float`
+        The quiet window, in seconds.
+    max_delay : `float`
+        The longest time, in seconds, that a burst can postpone its work.
+    max_concurrency : `int`
+        The number of work items (for different keys) that can run at once.
+    max_retries : `int`
+        The number of times failed work is retried.
+    backoff_base : `float`
+        The backoff before the first retry, in seconds. It doubles for each
+        subsequent retry of the same key.
+    backoff_max : `float`
+        The longest backoff, in seconds.
+    rate_limiter : `TokenBucket`, optional
+        The global rate limit for runs. By default, runs aren't rate-limited.
+    """
+
+    def __init__(
+        self,
+        *,
+        debounce: float = 2.0,
+        max_delay: float = 30.0,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        rate_limiter: Optional[TokenBucket] = None,
+    ) -> None:
+        if debounce < 0 or max_delay < 0:
+            raise ValueError("debounce and max_delay can't be negative")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_retries < 0:
+            raise ValueError("max_retries can't be negative")
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self._pending: Dict[str, _Pending] = {}
+        self._due: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+        """Number of submissions."""
+
+        self.collapsed = 0
+        """Number of submissions merged into work that was already pending."""
+
+        self.runs = 0
+        """Number of runs that finished, successfully or not."""
+
+        self.failures = 0
+        """Number of runs that raised an exception."""
+
+        self.retries = 0
+        """Number of runs that were retries of failed work."""
+
+        self.cancelled = 0
+        """Number of work items dropped by `cancel`."""
+
+    def submit(
+        self,
+        key: str,
+        fn: Callable[..., Awaitable[Any]],
+        *,
+        group: Optional[str] = None,
+        debounce: Optional[float] = None,
+        **kwargs: Any,
+    ) -> asyncio.Future:
+        """Submit work for a key.
+
+        Parameters
+        ----------
+        key : `str`
+            The coalescing key, such as the name of a registry.
+        fn : callable
+            Coroutine function to run. It is called with the merged keyword
+            arguments of every submission for the key since the work was last
+            started.
+        group : `str`, optional
+            The exclusivity group of the work, such as the name of the
+            registry that several kinds of work (with different keys) act
+            on. Defaults to ``key``.
+        debounce : `float`, optional
+            Override the queue's quiet window for this submission, such as
+            ``0`` for work that should start as soon as possible.
+        **kwargs
+            Keyword arguments for ``fn``.
+
+        Returns
+        -------
+        future : `asyncio.Future`
+            Resolves to the return value of the run that includes this
+            submission, or to the exception of its last attempt. Submissions
+            that are collapsed together share the same future.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.submitted += 1
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = _Pending(
+                fn=fn,
+                kwargs=dict(kwargs),
+                future=loop.create_future(),
+                first_submitted=now,
+                group=key if group is None else group,
+            )
+            self._pending[key] = pending
+        else:
+            self.collapsed += 1
+            pending.fn = fn
+            pending.kwargs.update(kwargs)
+            if key in self._due:
+                # Already waiting for the in-flight work of its group
+                return pending.future
+            if pending.timer is not None:
+                pending.timer.cancel()
+
+        if debounce is None:
+            debounce = self.debounce
+        deadline = pending.first_submitted + self.max_delay
+        delay = max(0.0, min(debounce, deadline - now))
+        # New submissions don't cut a retry's backoff short
+        delay = max(delay, pending.not_before - now)
+        pending.timer = loop.call_later(delay, self._on_due, key)
+        return pending.future
+
+    def cancel(self, group: str) -> int:
+        """Drop the pending work of a group, such as the work of a registry
+        that was deleted.
+
+        Work that is already running isn't interrupted. The futures of the
+        dropped work resolve to `kopf.PermanentError`.
+
+        Returns
+        -------
+        cancelled : `int`
+            The number of work items that were dropped.
+        """
+        cancelled = 0
+        for key, pending in list(self._pending.items()):
+            if pending.group != group:
+                continue
+            if pending.timer is not None:
+                pending.timer.cancel()
+            del self._pending[key]
+            self._due.discard(key)
+            if not pending.future.done():
+                pending.future.set_exception(
+                    kopf.PermanentError(f"Work for {key} was cancelled.")
+                )
+            cancelled += 1
+        self.cancelled += cancelled
+        return cancelled
+
+    async def join(self) -> None:
+        """Wait until no work is pending or running."""
+        while self._pending or self._tasks:
+            futures = [p.future for p in self._pending.values()]
+            await asyncio.wait(
+                [*futures, *self._tasks], return_when=asyncio.ALL_COMPLETED
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Get the queue's counters."""
+        return {
+            "pending": len(self._pending),
+            "running": len(self._in_flight),
+            "submitted": self.submitted,
+            "collapsed": self.collapsed,
+            "runs": self.runs,
+            "failures": self.failures,
+            "retries": self.retries,
+            "cancelled": self.cancelled,
+            "throttled": (
+                self.rate_limiter.throttled if self.rate_limiter else 0
+            ),
+        }
+
+    def _on_due(self, key: str) -> None:
+        if self._pending[key].group in self._in_flight:
+            # Started by _finish once the in-flight work is done
+            self._due.add(key)
+            return
+        self._start(key)
+
+    def _start(self, key: str) -> None:
+        pending = self._pending.pop(key)
+        self._due.discard(key)
+        self._in_flight.add(pending.group)
+        task = asyncio.ensure_future(self._run(key, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: str, pending: _Pending) -> None:
+        if self._semaphore is None:
+            # Created lazily so that it binds to the operator's event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                if pending.attempt > 0:
+                    self.retries += 1
+                try:
+                    result = await pending.fn(**pending.kwargs)
+                except Exception as e:
+                    self.failures += 1
+                    if not self._retry(key, pending, e):
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+                else:
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+                finally:
+                    self.runs += 1
+        finally:
+            self._finish(pending.group)
+
+    def _retry(self, key: str, pending: _Pending, error: Exception) -> bool:
+        """Requeue failed work with backoff, merging it with any newer
+        submission for the key.
+
+        Returns
+        -------
+        retried : `bool`
+            `False` if the work isn't retried.
+        """
+        if pending.attempt >= self.max_retries or isinstance(
+            error, kopf.PermanentError
+        ):
+            return False
+
+        loop = asyncio.get_running_loop()
+        backoff = min(
+            self.backoff_max, self.backoff_base * 2**pending.attempt
+        )
+        # Full jitter spreads out the retries of registries that failed
+        # together
+        delay = random.uniform(0, backoff)
+        logger.warning(
+            "Work for %s failed (%s); retrying in %.1fs", key, error, delay
+        )
+
+        newer = self._pending.get(key)
+        if newer is not None:
+            # Newer inputs replace the failed ones, and their submitters get
+            # the outcome of the retry too
+            if newer.timer is not None:
+                newer.timer.cancel()
+            self._due.discard(key)
+            kwargs = {**pending.kwargs, **newer.kwargs}
+            newer.future.add_done_callback(
+                lambda f: _copy_outcome(f, pending.future)
+            )
+            fn = newer.fn
+        else:
+            kwargs = pending.kwargs
+            fn = pending.fn
+
+        retry = _Pending(
+            fn=fn,
+            kwargs=kwargs,
+            future=pending.future if newer is None else newer.future,
+            first_submitted=loop.time(),
+            group=pending.group,
+            attempt=pending.attempt + 1,
+            not_before=loop.time() + delay,
+        )
+        self._pending[key] = retry
+        retry.timer = loop.call_later(delay, self._on_due, key)
+        return True
+
+    def _finish(self, group: str) -> None:
+        self._in_flight.discard(group)
+        for key in sorted(self._due):
+            if self._pending[key].group == group:
+                self._start(key)
+                break
+
+
+def _copy_outcome(source: asyncio.Future, target: asyncio.Future) -> None:
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())  # type: ignore[arg-type]
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,199 @@
+"""Tests for the strimziregistryoperator.bootstrapservers module."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from strimziregistryoperator import provisioning, state
+from strimziregistryoperator.bootstrapservers import BootstrapServerCache
+from strimziregistryoperator.handlers import reconcileregistry
+from strimziregistryoperator.registryindex import RegistryIndex
+from strimziregistryoperator.resourcecache import ResourceCache
+from strimziregistryoperator.workqueue import CoalescingQueue
+
+
+def make_kafka(address: str, *, generation: int = 1) -> Dict[str, Any]:
+    return {
+        "apiVersion": "kafka.strimzi.io/v1beta2",
+        "metadata": {
+            "name": "events",
+            "namespace": "kafka",
+            "generation": generation,
+        },
+        "spec": {
+            "kafka": {"listeners": [{"name": "tls", "type": "internal"}]}
+        },
+        "status": {
+            "listeners": [{"name": "tls", "bootstrapServers": address}]
+        },
+    }
+
+
+def test_lookup_and_put() -> None:
+    cache = BootstrapServerCache()
+    key = {"namespace": "kafka", "cluster": "events", "listener_name": "tls"}
+    assert cache.lookup(registry="a", **key) is None
+
+    cache.put(
+        make_kafka("kafka:9093"), registry="a", address="kafka:9093", **key
+    )
+    assert cache.lookup(registry="b", **key) == "kafka:9093"
+    assert cache.stats() == {
+        "size": 1,
+        "hits": 1,
+        "misses": 1,
+        "invalidations": 0,
+    }
+
+
+def test_observe() -> None:
+    cache = BootstrapServerCache()
+    key = {"namespace": "kafka", "cluster": "events", "listener_name": "tls"}
+    cache.put(
+        make_kafka("kafka:9093"), registry="b", address="kafka:9093", **key
+    )
+    cache.lookup(registry="a", **key)
+
+    # Changes that don't touch the listeners keep the address
+    assert (
+        cache.observe("MODIFIED", make_kafka("kafka:9093", generation=2)) == []
+    )
+    assert cache.lookup(registry="a", **key) == "kafka:9093"
+
+    # New listener addresses drop the cached address and report its users
+    assert cache.observe("MODIFIED", make_kafka("kafka:9094")) == ["a", "b"]
+    assert cache.lookup(registry="a", **key) is None
+    assert cache.stats()["invalidations"] == 1
+
+    # Deleted clusters are forgotten
+    cache.put(
+        make_kafka("kafka:9094"), registry="a", address="kafka:9094", **key
+    )
+    assert cache.observe("DELETED", make_kafka("kafka:9094")) == []
+    assert cache.stats()["size"] == 0
+
+
+def test_listener_change_patches_deployment(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A Kafka event with a new listener address patches the bootstrap
+    server of the registries' Deployments, even though the resource cache
+    only sees the event after the handler.
+    """
+    ssr = {
+        "apiVersion": "roundtable.lsst.codes/v1beta1",
+        "kind": "StrimziSchemaRegistry",
+        "metadata": {"name": "registry", "namespace": "kafka", "uid": "1"},
+        "spec": {"listener": "tls", "strimziVersion": "v1beta2"},
+    }
+    kafkauser = {
+        "apiVersion": "kafka.strimzi.io/v1beta2",
+        "metadata": {
+            "name": "registry",
+            "namespace": "kafka",
+            "labels": {"strimzi.io/cluster": "events"},
+        },
+    }
+    jks_secret = {
+        "metadata": {
+            "name": "registry-jks",
+            "namespace": "kafka",
+            "resourceVersion": "7",
+        }
+    }
+    resource_cache = ResourceCache()
+    for kind, body in (
+        ("strimzischemaregistries", ssr),
+        ("kafkausers", kafkauser),
+        ("kafkas", make_kafka("kafka:9093")),
+        ("secrets", jks_secret),
+    ):
+        resource_cache.observe(kind, "ADDED", body)
+    monkeypatch.setattr(state, "resource_cache", resource_cache)
+    monkeypatch.setattr(state, "bootstrap_servers", BootstrapServerCache())
+    monkeypatch.setattr(
+        state, "refresh_queue", CoalescingQueue(debounce=0, max_retries=0)
+    )
+    registry_names = RegistryIndex()
+    registry_names.add("kafka/registry")
+    monkeypatch.setattr(state, "registry_names", registry_names)
+
+    async def update_registry_status(**kwargs: Any) -> bool:
+        return False
+
+    monkeypatch.setattr(
+        reconcileregistry, "update_registry_status", update_registry_status
+    )
+
+    # The live resources match the desired state with the old address
+    _, deployment, service = asyncio.run(
+        provisioning.get_desired_state(
+            spec=ssr["spec"],
+            namespace="kafka",
+            name="registry",
+            body=ssr,
+            k8s_client=None,
+            logger=logging.getLogger(__name__),
+            refresh_secret=False,
+        )
+    )
+    for kind, body in (("deployments", deployment), ("services", service)):
+        live = copy.deepcopy(body)
+        live["metadata"]["namespace"] = "kafka"
+        resource_cache.observe(kind, "ADDED", live)
+
+    patches: List[List[Dict[str, Any]]] = []
+
+    def patch_deployment(*, body: Any, **kwargs: Any) -> Dict[str, Any]:
+        patches.append(body)
+        # The pods restart right away
+        replicas = deployment["spec"].get("replicas", 1)
+        return {
+            **deployment,
+            "metadata": {**deployment["metadata"], "namespace": "kafka"},
+            "status": {
+                "replicas": replicas,
+                "updatedReplicas": replicas,
+                "availableReplicas": replicas,
+            },
+        }
+
+    def unexpected(**kwargs: Any) -> None:
+        raise AssertionError("Only the Deployment should be written")
+
+    k8s_client = SimpleNamespace(
+        AppsV1Api=lambda: SimpleNamespace(
+            create_namespaced_deployment=unexpected,
+            patch_namespaced_deployment=patch_deployment,
+        ),
+        CoreV1Api=lambda: SimpleNamespace(
+            create_namespaced_service=unexpected,
+            patch_namespaced_service=unexpected,
+            api_client=SimpleNamespace(
+                sanitize_for_serialization=lambda body: body
+            ),
+        ),
+    )
+    monkeypatch.setattr(
+        reconcileregistry, "create_k8sclient", lambda: k8s_client
+    )
+
+    asyncio.run(
+        reconcileregistry.refresh_bootstrap_servers(
+            event={"type": "MODIFIED"},
+            body=make_kafka("kafka:9094", generation=2),
+            name="events",
+            logger=logging.getLogger(__name__),
+        )
+    )
+
+    assert len(patches) == 1
+    assert [
+        op["path"] for op in patches[0] if op.get("value") == "kafka:9094"
+    ] == ["/spec/template/spec/containers/0/env/2/value"]
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import kopf
 import pytest
@@ -10,6 +10,7 @@ import yaml
 
 from strimziregistryoperator.deployments import (
     create_deployment,
+    create_deployment_patch,
     create_service,
     get_kafka_bootstrap_server,
 )
@@ -247,3 +248,91 @@ def test_create_deployment_resource_settings() -> None:
     assert resources["limits"]["memory"] == "1000M"
     assert resources["requests"]["cpu"] == "100m"
     assert resources["requests"]["memory"] == "768M"
+
+
+def test_create_deployment_keystore_types() -> None:
+    """The keystore type sets the store locations, types, and passwords."""
+    kwargs: Dict[str, Any] = dict(
+        name="example-server",
+        bootstrap_server="example-server.default.svc:9093",
+        secret_name="example-server",
+        secret_version="1",
+        registry_image="demo/testimage",
+        registry_image_tag="1.2.3",
+        registry_cpu_limit=None,
+        registry_mem_limit=None,
+        registry_cpu_request=None,
+        registry_mem_request=None,
+        compatibility_level="forward",
+        security_protocol="SSL",
+    )
+
+    dep_body = create_deployment(**kwargs)
+    env = dep_body["spec"]["template"]["spec"]["containers"][0]["env"]
+    assert (
+        get_env_value(env, "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_LOCATION")
+        == "/var/schemaregistry/keystore.jks"
+    )
+    assert (
+        get_env_value(env, "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_TYPE")
+        == "JKS"
+    )
+
+    dep_body = create_deployment(keystore_type="PKCS12", **kwargs)
+    env = dep_body["spec"]["template"]["spec"]["containers"][0]["env"]
+    assert (
+        get_env_value(
+            env, "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_LOCATION"
+        )
+        == "/var/schemaregistry/truststore.p12"
+    )
+    assert (
+        get_env_value(env, "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_TYPE")
+        == "PKCS12"
+    )
+    env_names = [item["name"] for item in env]
+    assert "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_PASSWORD" in env_names
+
+    dep_body = create_deployment(keystore_type="PEM", **kwargs)
+    env = dep_body["spec"]["template"]["spec"]["containers"][0]["env"]
+    assert (
+        get_env_value(env, "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_LOCATION")
+        == "/var/schemaregistry/keystore.pem"
+    )
+    env_names = [item["name"] for item in env]
+    assert "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEYSTORE_PASSWORD" not in env_names
+    assert (
+        "SCHEMA_REGISTRY_KAFKASTORE_SSL_TRUSTSTORE_PASSWORD" not in env_names
+    )
+    key_password = [
+        item
+        for item in env
+        if item["name"] == "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEY_PASSWORD"
+    ]
+    assert key_password == [
+        {
+            "name": "SCHEMA_REGISTRY_KAFKASTORE_SSL_KEY_PASSWORD",
+            "valueFrom": {
+                "secretKeyRef": {
+                    "name": kwargs["secret_name"],
+                    "key": "keystore_password",
+                }
+            },
+        }
+    ]
+
+
+def test_create_deployment_patch() -> None:
+    key = "strimziregistryoperator.roundtable.lsst.codes/jksVersion"
+    patch = create_deployment_patch(secret_version="12345")
+    assert patch == {
+        "spec": {"template": {"metadata": {"annotations": {key: "12345"}}}}
+    }
+
+    patch = create_deployment_patch(
+        secret_version="12345", resource_version="678"
+    )
+    assert patch["metadata"] == {"resourceVersion": "678"}
+    assert patch["spec"]["template"]["metadata"]["annotations"] == {
+        key: "12345"
+    }
@@ -0,0 +1,163 @@
+"""Tests for the strimziregistryoperator.desiredstate module."""
+
+import copy
+
+from strimziregistryoperator.deployments import (
+    create_deployment,
+    create_service,
+)
+from strimziregistryoperator.desiredstate import (
+    DESIRED_STATE_HASH_KEY,
+    compute_state_hash,
+    create_json_patch,
+    get_drift,
+    project,
+    stamp_state_hash,
+)
+
+
+def make_live(desired):
+    """Simulate the live resource that Kubernetes returns for a desired
+    resource, with defaults and bookkeeping fields.
+    """
+    live = copy.deepcopy(desired)
+    live["metadata"].update(
+        {"namespace": "events", "resourceVersion": "42", "uid": "abc"}
+    )
+    live["spec"]["clusterIP"] = "10.0.0.1"
+    live["spec"]["ports"][0]["protocol"] = "TCP"
+    live["status"] = {"loadBalancer": {}}
+    return live
+
+
+def test_stamp_state_hash() -> None:
+    service = create_service(name="registry", service_type="ClusterIP")
+    stamped = stamp_state_hash(service)
+
+    assert DESIRED_STATE_HASH_KEY not in service["metadata"].get(
+        "annotations", {}
+    )
+    assert stamped["metadata"]["annotations"][DESIRED_STATE_HASH_KEY] == (
+        compute_state_hash(service)
+    )
+    # The annotation doesn't change the hash
+    assert compute_state_hash(stamped) == compute_state_hash(service)
+
+
+def test_project() -> None:
+    desired = {"spec": {"ports": [{"port": 8081}], "type": "ClusterIP"}}
+    live = {
+        "spec": {
+            "ports": [{"port": 8081, "protocol": "TCP"}],
+            "type": "ClusterIP",
+            "clusterIP": "10.0.0.1",
+        },
+        "status": {},
+    }
+    assert project(live, desired) == desired
+    assert project({"spec": {}}, desired) == {
+        "spec": {"ports": None, "type": None}
+    }
+
+
+def test_get_drift() -> None:
+    desired = stamp_state_hash(
+        create_service(name="registry", service_type="ClusterIP")
+    )
+
+    # Defaults and bookkeeping fields aren't drift
+    assert get_drift(make_live(desired), desired) is None
+
+    # The operator's desired state changed
+    new_desired = stamp_state_hash(
+        create_service(name="registry", service_type="NodePort")
+    )
+    assert get_drift(make_live(desired), new_desired) == (
+        "the desired state changed"
+    )
+
+    # Resources created before the hash annotation existed are patched once
+    unstamped = make_live(desired)
+    del unstamped["metadata"]["annotations"]
+    assert get_drift(unstamped, desired) == "the desired state changed"
+
+    # A field that the operator sets was edited by hand
+    edited = make_live(desired)
+    edited["spec"]["type"] = "LoadBalancer"
+    assert get_drift(edited, desired) == "the live resource was modified"
+
+
+def test_create_json_patch() -> None:
+    desired = stamp_state_hash(
+        create_service(name="registry", service_type="ClusterIP")
+    )
+    live = make_live(desired)
+    assert create_json_patch(live, desired) == []
+
+    new_desired = stamp_state_hash(
+        create_service(name="registry", service_type="NodePort")
+    )
+    hash_key = DESIRED_STATE_HASH_KEY.replace("/", "~1")
+    assert create_json_patch(live, new_desired) == [
+        {"op": "test", "path": "/metadata/resourceVersion", "value": "42"},
+        {
+            "op": "replace",
+            "path": f"/metadata/annotations/{hash_key}",
+            "value": new_desired["metadata"]["annotations"][
+                DESIRED_STATE_HASH_KEY
+            ],
+        },
+        {"op": "replace", "path": "/spec/type", "value": "NodePort"},
+    ]
+
+    # Missing fields are added, and defaulted fields are left alone
+    del live["spec"]["selector"]
+    live["spec"]["ports"][0]["port"] = 80
+    operations = create_json_patch(live, desired)
+    assert operations[1:] == [
+        {"op": "replace", "path": "/spec/ports/0/port", "value": 8081},
+        {
+            "op": "add",
+            "path": "/spec/selector",
+            "value": desired["spec"]["selector"],
+        },
+    ]
+
+
+def test_normalized_quantities_are_not_drift() -> None:
+    """The API server normalizes resource quantities, which isn't drift."""
+    desired = stamp_state_hash(
+        create_deployment(
+            name="registry",
+            bootstrap_server="events-kafka-bootstrap:9093",
+            secret_name="registry-jks",
+            secret_version="1",
+            registry_image="confluentinc/cp-schema-registry",
+            registry_image_tag="7.2.1",
+            registry_cpu_limit="0.5",
+            registry_cpu_request="0.25",
+            registry_mem_limit="1024Mi",
+            registry_mem_request="768M",
+            compatibility_level="forward",
+            security_protocol="SSL",
+        )
+    )
+    live = copy.deepcopy(desired)
+    live["metadata"]["resourceVersion"] = "42"
+    resources = live["spec"]["template"]["spec"]["containers"][0]["resources"]
+    resources["limits"].update({"cpu": "500m", "memory": "1Gi"})
+    resources["requests"]["cpu"] = "250m"
+
+    assert get_drift(live, desired) is None
+    assert create_json_patch(live, desired) == []
+
+    # A different quantity is still drift
+    resources["limits"]["cpu"] = "1"
+    assert get_drift(live, desired) == "the live resource was modified"
+    assert create_json_patch(live, desired)[1:] == [
+        {
+            "op": "replace",
+            "path": "/spec/template/spec/containers/0/resources/limits/cpu",
+            "value": "0.5",
+        }
+    ]
@@ -0,0 +1,85 @@
+"""Tests for the strimziregistryoperator.k8s module."""
+
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import kubernetes
+import pytest
+
+from strimziregistryoperator import k8s
+from strimziregistryoperator.resourcecache import ResourceCache
+
+
+def test_k8sclient_shares_api_client() -> None:
+    configuration = kubernetes.client.Configuration()
+    configuration.host = "https://kubernetes.example"
+    client = k8s.K8sClient(configuration)
+
+    core_api = client.CoreV1Api()
+    assert client.CoreV1Api() is core_api
+    assert core_api.api_client is client.api_client
+    assert client.AppsV1Api().api_client is client.api_client
+    assert client.CustomObjectsApi().api_client is client.api_client
+
+    # Models are looked up in kubernetes.client
+    assert client.V1Secret is kubernetes.client.V1Secret
+    client.close()
+
+
+def test_create_k8sclient_loads_config_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    loads = []
+
+    def load_incluster_config(
+        client_configuration: kubernetes.client.Configuration,
+        try_refresh_token: bool,
+    ) -> None:
+        loads.append(try_refresh_token)
+        client_configuration.host = "https://kubernetes.example"
+
+    monkeypatch.setattr(
+        kubernetes.config, "load_incluster_config", load_incluster_config
+    )
+    monkeypatch.setattr(k8s.state, "k8s_pool_size", 7)
+    k8s.close_k8sclient()
+
+    client = k8s.create_k8sclient()
+    assert k8s.create_k8sclient() is client
+    assert loads == [True]
+    assert client.configuration.host == "https://kubernetes.example"
+    assert client.configuration.connection_pool_maxsize == 7
+
+    k8s.close_k8sclient()
+    assert k8s.create_k8sclient() is not client
+    assert len(loads) == 2
+    k8s.close_k8sclient()
+
+
+def test_get_ssr_reads_the_api(monkeypatch: pytest.MonkeyPatch) -> None:
+    """StrimziSchemaRegistries that aren't cached are read by their plural
+    name; the API server doesn't resolve short names in paths.
+    """
+    calls: List[Dict[str, Any]] = []
+    ssr = {"metadata": {"name": "registry", "namespace": "events"}}
+
+    def get_namespaced_custom_object(**kwargs: Any) -> SimpleNamespace:
+        calls.append(kwargs)
+        return SimpleNamespace(data=json.dumps(ssr))
+
+    k8s_client = SimpleNamespace(
+        CustomObjectsApi=lambda: SimpleNamespace(
+            get_namespaced_custom_object=get_namespaced_custom_object
+        )
+    )
+    monkeypatch.setattr(k8s.state, "resource_cache", ResourceCache())
+
+    assert (
+        k8s.get_ssr(name="registry", namespace="events", k8s_client=k8s_client)
+        == ssr
+    )
+    assert calls[0]["group"] == "roundtable.lsst.codes"
+    assert calls[0]["plural"] == "strimzischemaregistries"
@@ -0,0 +1,202 @@
+"""Tests for the strimziregistryoperator.keystorecache module."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+from typing import Optional, Tuple
+
+import pytest
+
+from strimziregistryoperator.keystorecache import (
+    KeystoreBundle,
+    KeystoreCache,
+    TruststoreCache,
+    compute_input_digest,
+)
+
+
+def make_bundle(name: str) -> KeystoreBundle:
+    return KeystoreBundle(
+        keystore_type="JKS",
+        truststore=f"{name}-truststore".encode(),
+        truststore_password="truststore-password",
+        keystore=f"{name}-keystore".encode(),
+        keystore_password="keystore-password",
+    )
+
+
+def test_compute_input_digest() -> None:
+    inputs = {
+        "cluster_ca_cert": "cluster-ca",
+        "client_ca_cert": "client-ca",
+        "client_cert": "client-cert",
+        "client_key": "client-key",
+        "keystore_type": "JKS",
+    }
+    digest = compute_input_digest(**inputs)
+    assert len(digest) == 64
+    assert digest == compute_input_digest(**inputs)
+
+    # Any change to the inputs changes the digest
+    assert digest != compute_input_digest(**{**inputs, "client_key": "other"})
+    assert digest != compute_input_digest(**{**inputs, "keystore_type": "PEM"})
+    # Field boundaries are part of the digest
+    assert digest != compute_input_digest(
+        **{
+            **inputs,
+            "cluster_ca_cert": "cluster-caclient-ca",
+            "client_ca_cert": "",
+        }
+    )
+
+
+def test_lru_eviction_and_counters() -> None:
+    cache = KeystoreCache(maxsize=2)
+    cache.put("a", make_bundle("a"))
+    cache.put("b", make_bundle("b"))
+
+    # Touch "a" so that "b" is the least-recently used entry
+    assert cache.get("a") == make_bundle("a")
+    cache.put("c", make_bundle("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("c") == make_bundle("c")
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 2,
+        "persistent_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+    cache.record_persistent_hit("d", make_bundle("d"))
+    assert cache.persistent_hits == 1
+    assert cache.get("d") == make_bundle("d")
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == 0
+
+
+def test_bundle_from_secret() -> None:
+    def encode(value: bytes) -> str:
+        return base64.b64encode(value).decode("utf-8")
+
+    secret = {
+        "data": {
+            "truststore.pem": encode(b"truststore"),
+            "keystore.pem": encode(b"keystore"),
+        }
+    }
+    bundle = KeystoreBundle.from_secret(
+        secret, keystore_type="PEM", extension="pem"
+    )
+    assert bundle.truststore == b"truststore"
+    assert bundle.keystore == b"keystore"
+    assert bundle.truststore_password is None
+    assert bundle.keystore_password is None
+
+
+def test_truststore_cache_builds_once_per_ca() -> None:
+    cache = TruststoreCache()
+    builds = []
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return f"truststore-{len(builds)}".encode(), f"password-{len(builds)}"
+
+    async def get(ca_fingerprint: str) -> Tuple[bytes, Optional[str]]:
+        return await cache.get_or_build(
+            cluster="events",
+            ca_fingerprint=ca_fingerprint,
+            store_type="JKS",
+            build=build,
+        )
+
+    async def main() -> None:
+        # Every registry of the cluster gets the same truststore and
+        # password, even when they ask concurrently
+        results = await asyncio.gather(*(get("ca1") for _ in range(3)))
+        assert results == [(b"truststore-1", "password-1")] * 3
+        assert cache.stats() == {"size": 1, "hits": 2, "builds": 1}
+
+        # A new CA fingerprint requires a new truststore
+        truststore, _ = await get("ca2")
+        assert truststore == b"truststore-2"
+        assert len(builds) == 2
+
+    asyncio.run(main())
+
+
+def test_truststore_cache_failed_build() -> None:
+    """A failed build is retried by the next caller and leaves no lock."""
+    cache = TruststoreCache()
+    attempts = []
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("keytool failed")
+        return b"truststore", None
+
+    async def get() -> Tuple[bytes, Optional[str]]:
+        return await cache.get_or_build(
+            cluster="events/events",
+            ca_fingerprint="ca1",
+            store_type="PEM",
+            build=build,
+        )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(get())
+    assert cache._build_locks == {}
+    assert asyncio.run(get()) == (b"truststore", None)
+    assert cache._build_locks == {}
+    assert len(attempts) == 2
+
+
+def test_truststore_cache_evicts_per_cluster() -> None:
+    """A CA rotation in one cluster doesn't evict the truststores of
+    another.
+    """
+    cache = TruststoreCache(maxsize=1)
+    cache.put(
+        cluster="kafka-a/events",
+        ca_fingerprint="a1",
+        store_type="JKS",
+        truststore=b"a1",
+        password=None,
+    )
+    cache.put(
+        cluster="kafka-b/events",
+        ca_fingerprint="b1",
+        store_type="JKS",
+        truststore=b"b1",
+        password=None,
+    )
+    assert len(cache) == 2
+
+    cache.put(
+        cluster="kafka-a/events",
+        ca_fingerprint="a2",
+        store_type="JKS",
+        truststore=b"a2",
+        password=None,
+    )
+    assert len(cache) == 2
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        raise AssertionError("The truststore should be cached")
+
+    truststore, _ = asyncio.run(
+        cache.get_or_build(
+            cluster="kafka-b/events",
+            ca_fingerprint="b1",
+            store_type="JKS",
+            build=build,
+        )
+    )
+    assert truststore == b"b1"
@@ -0,0 +1,50 @@
+"""Tests for the strimziregistryoperator.keystorepool module."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from strimziregistryoperator.keystorepool import (
+    KeystorePool,
+    KeystorePoolFullError,
+)
+
+
+def test_run_and_reject_when_full() -> None:
+    pool = KeystorePool(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+
+    def build(value: str) -> str:
+        release.wait(timeout=5)
+        return value.upper()
+
+    async def main() -> None:
+        running = asyncio.create_task(pool.run(build, "a"))
+        queued = asyncio.create_task(pool.run(build, "b"))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 1
+        assert pool.queue_depth == 1
+
+        # One build is running and one is queued, so the pool is full
+        with pytest.raises(KeystorePoolFullError):
+            await pool.run(build, "c")
+
+        release.set()
+        assert await running == "A"
+        assert await queued == "B"
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert pool.stats() == {
+        "kind": "thread",
+        "max_workers": 1,
+        "running": 0,
+        "queued": 0,
+        "completed": 2,
+        "rejected": 1,
+    }
@@ -0,0 +1,53 @@
+"""Tests for the strimziregistryoperator.partitions module."""
+
+from __future__ import annotations
+
+from strimziregistryoperator.partitions import (
+    ClusterPartitions,
+    get_single_namespace,
+    is_served_cluster,
+    match_namespace,
+    parse_cluster_names,
+)
+
+
+def test_cluster_names() -> None:
+    cluster_names = parse_cluster_names("events, alerts,")
+    assert cluster_names == ("events", "alerts")
+    assert is_served_cluster("alerts", cluster_names)
+    assert not is_served_cluster("other", cluster_names)
+    assert not is_served_cluster(None, cluster_names)
+    assert is_served_cluster("other", parse_cluster_names("*"))
+
+
+def test_match_namespace() -> None:
+    assert match_namespace("events", "events")
+    assert not match_namespace("events-dev", "events")
+    assert match_namespace("kafka-a", "*")
+    assert match_namespace("kafka-a", "events,kafka-*")
+    assert not match_namespace("kafka-test", "kafka-*,!kafka-test")
+    assert match_namespace("events", "!kube-*")
+    assert not match_namespace("kube-system", "!kube-*")
+
+    assert get_single_namespace("events") == "events"
+    assert get_single_namespace("*") is None
+    assert get_single_namespace("events,alerts") is None
+
+
+def test_cluster_partitions() -> None:
+    partitions = ClusterPartitions()
+    partition = partitions.get("kafka-a", "events")
+    assert partitions.get("kafka-a", "events") is partition
+    assert partitions.get("kafka-b", "events") is not partition
+
+    assert not partition.is_current("ca1")
+    partition.record_rotation("ca1")
+    assert partition.is_current("ca1")
+    assert not partition.is_current("ca2")
+
+    assert partitions.stats() == [
+        {"namespace": "kafka-a", "cluster": "events", "rotations": 1},
+        {"namespace": "kafka-b", "cluster": "events", "rotations": 0},
+    ]
+    partitions.discard("kafka-b", "events")
+    assert len(partitions) == 1
@@ -0,0 +1,134 @@
+"""Tests for the strimziregistryoperator.provisioning module."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from strimziregistryoperator import provisioning, state
+from strimziregistryoperator.bootstrapservers import BootstrapServerCache
+from strimziregistryoperator.resourcecache import ResourceCache
+
+LATENCY = 0.05
+"""Simulated latency, in seconds, of each Kubernetes API call."""
+
+OWNER = {
+    "apiVersion": "roundtable.lsst.codes/v1beta1",
+    "kind": "StrimziSchemaRegistry",
+    "metadata": {"name": "registry", "namespace": "events", "uid": "1234"},
+}
+
+
+def make_kafka() -> Dict[str, Any]:
+    return {
+        "apiVersion": "kafka.strimzi.io/v1beta2",
+        "spec": {
+            "kafka": {"listeners": [{"name": "tls", "type": "internal"}]}
+        },
+        "status": {
+            "listeners": [
+                {"name": "tls", "bootstrapServers": "events-kafka:9093"}
+            ]
+        },
+    }
+
+
+def test_deploy_registry_overlaps_io(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Benchmark the creation of a registry against a Kubernetes API with a
+    fixed latency per call.
+
+    Creating a registry takes nine dependent-or-not API round trips (the
+    JKS Secret counts as two: its concurrent reads and its write). Run one
+    after another, they would take ``9 * LATENCY``; with the overlapping
+    calls, the longest chain is five round trips, the last of which writes
+    the status.
+    """
+    calls: List[str] = []
+
+    def api_call(name: str, result: Any = None) -> Any:
+        calls.append(name)
+        time.sleep(LATENCY)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def not_found(name: str, **kwargs: Any) -> Any:
+        return api_call(name, ApiException(status=404))
+
+    async def create_secret(**kwargs: Any) -> Dict[str, Any]:
+        # Concurrent reads of the Secrets, then the write of the JKS Secret
+        await asyncio.to_thread(api_call, "read secrets")
+        await asyncio.to_thread(api_call, "write secret")
+        return {"metadata": {"name": "registry-jks", "resourceVersion": "7"}}
+
+    kafkauser = {"metadata": {"labels": {"strimzi.io/cluster": "events"}}}
+    monkeypatch.setattr(
+        provisioning,
+        "get_kafkauser",
+        lambda **kwargs: api_call("get kafkauser", kafkauser),
+    )
+    monkeypatch.setattr(
+        provisioning,
+        "get_kafka",
+        lambda **kwargs: api_call("get kafka", make_kafka()),
+    )
+    monkeypatch.setattr(provisioning, "create_secret", create_secret)
+    monkeypatch.setattr(
+        provisioning,
+        "get_deployment",
+        lambda **kwargs: not_found("get deployment"),
+    )
+    monkeypatch.setattr(
+        provisioning, "get_service", lambda **kwargs: not_found("get service")
+    )
+    apps_api = SimpleNamespace(
+        create_namespaced_deployment=lambda **kwargs: api_call(
+            "create deployment"
+        )
+    )
+    core_api = SimpleNamespace(
+        create_namespaced_service=lambda **kwargs: api_call("create service")
+    )
+    custom_objects_api = SimpleNamespace(
+        patch_namespaced_custom_object_status=lambda *args, **kwargs: (
+            api_call("patch status", {**OWNER, "status": args[-1]["status"]})
+        )
+    )
+    k8s_client = SimpleNamespace(
+        AppsV1Api=lambda: apps_api,
+        CoreV1Api=lambda: core_api,
+        CustomObjectsApi=lambda: custom_objects_api,
+    )
+    monkeypatch.setattr(provisioning, "create_k8sclient", lambda: k8s_client)
+    monkeypatch.setattr(state, "registry_names", type(state.registry_names)())
+    monkeypatch.setattr(state, "bootstrap_servers", BootstrapServerCache())
+    monkeypatch.setattr(state, "resource_cache", ResourceCache())
+
+    start = time.perf_counter()
+    asyncio.run(
+        provisioning.deploy_registry(
+            spec={"listener": "tls", "strimziVersion": "v1beta2"},
+            namespace="events",
+            name="registry",
+            logger=logging.getLogger(__name__),
+            body=OWNER,
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    assert len(calls) == 9
+    assert calls[-1] == "patch status"
+    assert "events/registry" in state.registry_names
+    sequential = len(calls) * LATENCY
+    assert elapsed < 0.75 * sequential, (
+        f"Creating a registry took {elapsed:.3f}s; one call at a time, "
+        f"it takes {sequential:.3f}s"
+    )
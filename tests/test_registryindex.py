@@ -0,0 +1,40 @@
+"""Tests for the strimziregistryoperator.registryindex module."""
+
+import time
+
+from strimziregistryoperator.registryindex import RegistryIndex
+
+
+def test_add_and_discard() -> None:
+    index = RegistryIndex()
+    index.add("b")
+    index.add("a")
+    assert "a" in index
+    assert sorted(index) == ["a", "b"]
+
+    index.discard("a")
+    index.discard("missing")
+    assert "a" not in index
+    assert list(index) == ["b"]
+    assert len(index) == 1
+
+
+def test_sync() -> None:
+    index = RegistryIndex()
+    index.add("stale")
+    index.add("kept")
+
+    started = time.monotonic()
+    # Deleted while the list call was in flight
+    index.add("deleted")
+    index.discard("deleted")
+
+    added, removed = index.sync(["kept", "new", "deleted"], started=started)
+    assert added == ["new"]
+    assert removed == ["stale"]
+    assert sorted(index) == ["kept", "new"]
+
+    # A later list call no longer includes the deleted registry, and its
+    # deletion is forgotten
+    index.sync(["kept", "new"], started=time.monotonic())
+    assert index.stats() == {"size": 2, "deleted": 0, "syncs": 2}
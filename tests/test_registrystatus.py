@@ -0,0 +1,137 @@
+"""Tests for the strimziregistryoperator.registrystatus module."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from strimziregistryoperator import state
+from strimziregistryoperator.registrystatus import (
+    diff_status,
+    format_timestamp,
+    get_registry_status,
+    is_reconciled,
+    update_registry_status,
+)
+from strimziregistryoperator.resourcecache import ResourceCache
+
+KEY_PREFIX = "strimziregistryoperator.roundtable.lsst.codes"
+
+
+def test_get_registry_status() -> None:
+    secret = {
+        "metadata": {
+            "resourceVersion": "42",
+            "annotations": {
+                f"{KEY_PREFIX}/clusterCaCertFingerprint": "aa",
+                f"{KEY_PREFIX}/clientCaCertFingerprint": "bb",
+                f"{KEY_PREFIX}/userCertFingerprint": "cc",
+                f"{KEY_PREFIX}/userKeyFingerprint": "dd",
+            },
+        }
+    }
+    deployment = {
+        "spec": {
+            "template": {
+                "spec": {
+                    "containers": [
+                        {
+                            "env": [
+                                {
+                                    "name": (
+                                        "SCHEMA_REGISTRY_KAFKASTORE_"
+                                        "BOOTSTRAP_SERVERS"
+                                    ),
+                                    "value": "events-kafka-bootstrap:9093",
+                                }
+                            ]
+                        }
+                    ]
+                }
+            }
+        }
+    }
+
+    status = get_registry_status(
+        secret=secret, deployment=deployment, generation=3, rolled_out=True
+    )
+
+    assert status.pop("lastRolloutTime").endswith("Z")
+    assert status == {
+        "jksSecretVersion": "42",
+        "certificateFingerprints": {
+            "clusterCaCert": "aa",
+            "clientCaCert": "bb",
+            "userCert": "cc",
+        },
+        "bootstrapServer": "events-kafka-bootstrap:9093",
+        "observedGeneration": 3,
+    }
+    assert get_registry_status(secret=secret).keys() == {
+        "jksSecretVersion",
+        "certificateFingerprints",
+    }
+
+
+def test_is_reconciled() -> None:
+    body: Dict[str, Any] = {"metadata": {"generation": 2}}
+    assert not is_reconciled(body)
+    body["status"] = {"observedGeneration": 1, "jksSecretVersion": "7"}
+    assert not is_reconciled(body)
+    body["status"]["observedGeneration"] = 2
+    assert is_reconciled(body)
+
+
+def test_format_timestamp() -> None:
+    now = datetime.datetime(
+        2022, 8, 3, 12, 30, 5, tzinfo=datetime.timezone.utc
+    )
+    assert format_timestamp(now) == "2022-08-03T12:30:05Z"
+
+
+def test_update_registry_status_writes_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    patches: List[Dict[str, Any]] = []
+
+    def patch_status(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        patches.append(args[-1])
+        return {
+            "metadata": {"name": "registry", "namespace": "events"},
+            **args[-1],
+        }
+
+    k8s_client = SimpleNamespace(
+        CustomObjectsApi=lambda: SimpleNamespace(
+            patch_namespaced_custom_object_status=patch_status
+        )
+    )
+    monkeypatch.setattr(state, "resource_cache", ResourceCache())
+    current = {"jksSecretVersion": "7", "observedGeneration": 1}
+    status = {"jksSecretVersion": "7", "observedGeneration": 2}
+    assert diff_status(current, status) == {"observedGeneration": 2}
+
+    async def update(current: Dict[str, Any]) -> bool:
+        return await update_registry_status(
+            name="registry",
+            namespace="events",
+            status=status,
+            k8s_client=k8s_client,
+            logger=logging.getLogger(__name__),
+            current=current,
+        )
+
+    assert asyncio.run(update(current))
+    # Nothing changed, so nothing is written
+    assert not asyncio.run(update(status))
+    assert patches == [{"status": {"observedGeneration": 2}}]
+    cached = state.resource_cache.get(
+        "strimzischemaregistries", "events", "registry"
+    )
+    assert cached is not None
+    assert cached["status"] == {"observedGeneration": 2}
@@ -0,0 +1,62 @@
+"""Tests for the strimziregistryoperator.resourcecache module."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from strimziregistryoperator.resourcecache import ResourceCache
+
+
+def make_secret(name: str, uid: str, version: str) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "events",
+            "uid": uid,
+            "resourceVersion": version,
+        },
+        "data": {},
+    }
+
+
+def test_observe_and_get() -> None:
+    cache = ResourceCache()
+    assert cache.get("secrets", "events", "registry-jks") is None
+
+    cache.observe("secrets", None, make_secret("registry-jks", "a", "1"))
+    cache.observe("secrets", "MODIFIED", make_secret("registry-jks", "a", "2"))
+    secret = cache.get("secrets", "events", "registry-jks")
+    assert secret is not None
+    assert secret["metadata"]["resourceVersion"] == "2"
+
+    # Callers get copies that don't affect the cache
+    secret["data"]["keystore.jks"] = "changed"
+    cached = cache.get("secrets", "events", "registry-jks")
+    assert cached is not None
+    assert cached["data"] == {}
+
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["kinds"]["secrets"]["size"] == 1
+    assert stats["kinds"]["secrets"]["staleness"] >= 0
+    assert stats["kinds"]["kafkas"] == {"size": 0, "staleness": None}
+
+
+def test_delete_of_replaced_resource() -> None:
+    cache = ResourceCache()
+    cache.observe("secrets", "ADDED", make_secret("registry-jks", "a", "1"))
+
+    # The operator deletes and re-creates the Secret, and caches the write
+    cache.invalidate("secrets", "events", "registry-jks")
+    cache.put("secrets", make_secret("registry-jks", "b", "5"))
+
+    # The late DELETED event for the old Secret doesn't drop the new one
+    cache.observe("secrets", "DELETED", make_secret("registry-jks", "a", "4"))
+    secret = cache.get("secrets", "events", "registry-jks")
+    assert secret is not None
+    assert secret["metadata"]["uid"] == "b"
+
+    cache.observe("secrets", "DELETED", make_secret("registry-jks", "b", "6"))
+    assert cache.get("secrets", "events", "registry-jks") is None
@@ -0,0 +1,123 @@
+"""Tests for the strimziregistryoperator.rollouts module."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from strimziregistryoperator import rollouts
+from strimziregistryoperator.rollouts import (
+    is_rollout_complete,
+    roll_out_in_waves,
+)
+
+JKS_VERSION_KEY = "strimziregistryoperator.roundtable.lsst.codes/jksVersion"
+
+
+def make_deployment(
+    *, generation: int, observed: int, ready: int, version: str = "1"
+) -> Dict[str, Any]:
+    return {
+        "metadata": {"generation": generation},
+        "spec": {
+            "replicas": 1,
+            "template": {
+                "metadata": {"annotations": {JKS_VERSION_KEY: version}}
+            },
+        },
+        "status": {
+            "observedGeneration": observed,
+            "replicas": 1,
+            "updatedReplicas": ready,
+            "availableReplicas": ready,
+        },
+    }
+
+
+def test_is_rollout_complete() -> None:
+    assert is_rollout_complete(
+        make_deployment(generation=2, observed=2, ready=1)
+    )
+    # The controller hasn't seen the new generation yet
+    assert not is_rollout_complete(
+        make_deployment(generation=2, observed=1, ready=1)
+    )
+    # The new pod isn't available yet
+    assert not is_rollout_complete(
+        make_deployment(generation=2, observed=2, ready=0)
+    )
+    # A stale read of the Deployment is checked against the patch generation
+    assert not is_rollout_complete(
+        make_deployment(generation=2, observed=2, ready=1), generation=3
+    )
+
+
+def test_roll_out_in_waves(monkeypatch: pytest.MonkeyPatch) -> None:
+    deployments = {
+        "a": make_deployment(generation=1, observed=1, ready=1),
+        "b": make_deployment(generation=1, observed=1, ready=1),
+        "c": make_deployment(generation=1, observed=1, ready=1, version="9"),
+        "stuck": make_deployment(generation=1, observed=1, ready=1),
+    }
+    patched: List[List[str]] = []
+
+    def get_deployment(*, name: str, **kwargs: Any) -> Dict[str, Any]:
+        deployment = deployments[name]
+        if name != "stuck":
+            # The rollout finishes as soon as it is observed
+            generation = deployment["metadata"]["generation"]
+            deployment["status"]["observedGeneration"] = generation
+        return deployment
+
+    def update_deployment(
+        *, name: str, secret_version: str, **kwargs: Any
+    ) -> Any:
+        if not patched or len(patched[-1]) == 2:
+            patched.append([])
+        patched[-1].append(name)
+        deployment = deployments[name]
+        deployment["metadata"]["generation"] += 1
+        return SimpleNamespace(
+            metadata=SimpleNamespace(
+                generation=deployment["metadata"]["generation"]
+            )
+        )
+
+    statuses: Dict[str, Dict[str, Any]] = {}
+
+    async def update_registry_status(
+        *, name: str, status: Dict[str, Any], **kwargs: Any
+    ) -> bool:
+        statuses[name] = status
+        return True
+
+    monkeypatch.setattr(rollouts, "get_deployment", get_deployment)
+    monkeypatch.setattr(rollouts, "update_deployment", update_deployment)
+    monkeypatch.setattr(
+        rollouts, "update_registry_status", update_registry_status
+    )
+
+    outcomes = asyncio.run(
+        roll_out_in_waves(
+            {"a": "2", "b": "2", "c": "9", "stuck": "2"},
+            namespace="events",
+            k8s_client=None,
+            wave_size=2,
+            wave_timeout=0.1,
+            poll_interval=0.01,
+        )
+    )
+    assert outcomes == {
+        "a": "ready",
+        "b": "ready",
+        "c": "unchanged",
+        "stuck": "timeout",
+    }
+    # Each wave has at most two rollouts, in name order
+    assert patched == [["a", "b"], ["stuck"]]
+    # The rollout time is recorded in the status of each restarted registry
+    assert sorted(statuses) == ["a", "b", "stuck"]
+    assert all("lastRolloutTime" in status for status in statuses.values())
@@ -0,0 +1,98 @@
+"""Tests for the strimziregistryoperator.secretindex module."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from strimziregistryoperator.secretindex import SecretIndex
+
+
+def make_ssr(name: str, kafka_user: Optional[str] = None) -> Dict[str, Any]:
+    spec: Dict[str, Any] = {"listener": "tls", "keystoreType": "PKCS12"}
+    if kafka_user is not None:
+        spec["kafkaUser"] = kafka_user
+    return {
+        "apiVersion": "roundtable.lsst.codes/v1beta1",
+        "kind": "StrimziSchemaRegistry",
+        "metadata": {
+            "name": name,
+            "namespace": "events",
+            "uid": f"uid-{name}",
+            "generation": 1,
+        },
+        "spec": spec,
+        "status": {"observedGeneration": 1},
+    }
+
+
+def make_kafkauser(name: str, cluster: str) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "events",
+            "labels": {"strimzi.io/cluster": cluster},
+        }
+    }
+
+
+def test_lookup_shared_kafka_user() -> None:
+    index = SecretIndex()
+    index.update(make_ssr("registry-a", kafka_user="shared"))
+    index.update(make_ssr("registry-b", kafka_user="shared"))
+    index.update(make_ssr("registry-c"))
+    index.observe_kafkauser("ADDED", make_kafkauser("shared", "events"))
+
+    records = index.lookup("events", "shared", "events")
+    assert [record.name for record in records] == ["registry-a", "registry-b"]
+    assert all(record.cluster == "events" for record in records)
+    assert records[0].owner["metadata"]["uid"] == "uid-registry-a"
+    assert records[0].spec["keystoreType"] == "PKCS12"
+    assert records[0].status == {"observedGeneration": 1}
+
+    # The KafkaUser defaults to the name of the registry
+    assert [r.name for r in index.lookup("events", "registry-c")] == [
+        "registry-c"
+    ]
+    assert index.is_kafka_user("events", "shared")
+    assert not index.is_kafka_user("events", "registry-a")
+    assert not index.is_kafka_user("other", "shared")
+
+    # A Secret of another cluster doesn't match
+    assert index.lookup("events", "shared", "other") == []
+
+
+def test_update_moves_record() -> None:
+    index = SecretIndex()
+    index.update(make_ssr("registry-a", kafka_user="old"))
+    index.update(make_ssr("registry-a", kafka_user="new"))
+    assert index.lookup("events", "old") == []
+    assert [r.name for r in index.lookup("events", "new")] == ["registry-a"]
+
+    index.discard("events", "registry-a")
+    assert index.lookup("events", "new") == []
+    assert index.get("events", "registry-a") is None
+    assert index.stats() == {"registries": 0, "users": 0, "lookups": 3}
+
+
+def test_for_cluster() -> None:
+    index = SecretIndex()
+    index.update(make_ssr("registry-a"))
+    index.update(make_ssr("registry-b"))
+    index.update(make_ssr("registry-c"))
+    index.observe_kafkauser("ADDED", make_kafkauser("registry-a", "events"))
+    index.observe_kafkauser("ADDED", make_kafkauser("registry-b", "other"))
+
+    # registry-c's KafkaUser hasn't been seen, so it could be in any cluster
+    assert [r.name for r in index.for_cluster("events", "events")] == [
+        "registry-a",
+        "registry-c",
+    ]
+    assert [r.name for r in index.for_cluster("events", "other")] == [
+        "registry-b",
+        "registry-c",
+    ]
+
+    index.observe_kafkauser("DELETED", make_kafkauser("registry-b", "other"))
+    record = index.get("events", "registry-b")
+    assert record is not None
+    assert record.cluster is None
@@ -0,0 +1,252 @@
+"""Tests for the strimziregistryoperator.handlers.secretwatcher module."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+from typing import Any, Dict, List
+
+import kopf
+import pytest
+from kubernetes.client.rest import ApiException
+
+from strimziregistryoperator import state
+from strimziregistryoperator.handlers import secretwatcher
+from strimziregistryoperator.keystorecache import fingerprint
+from strimziregistryoperator.partitions import ClusterPartitions
+from strimziregistryoperator.registryindex import RegistryIndex
+from strimziregistryoperator.secretindex import SecretIndex
+from strimziregistryoperator.workqueue import CoalescingQueue
+
+
+def make_ssr(name: str) -> Dict[str, Any]:
+    return {
+        "apiVersion": "roundtable.lsst.codes/v1beta1",
+        "kind": "StrimziSchemaRegistry",
+        "metadata": {"name": name, "namespace": "kafka", "uid": name},
+        "spec": {"listener": "tls", "strimziVersion": "v1beta2"},
+    }
+
+
+def make_kafkauser(name: str, cluster: str) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "kafka",
+            "labels": {"strimzi.io/cluster": cluster},
+        }
+    }
+
+
+def test_cluster_ca_refresh_skips_other_clusters(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A CA rotation only refreshes the registries of its cluster, when two
+    clusters share a namespace and the KafkaUsers of some registries
+    haven't been seen yet.
+    """
+    kafkausers = {
+        "a": make_kafkauser("a", "events"),
+        "b": make_kafkauser("b", "alerts"),
+        "c": make_kafkauser("c", "alerts"),
+        "d": make_kafkauser("d", "events"),
+    }
+    registry_secrets = SecretIndex()
+    # "a" and "b" are indexed, but only the KafkaUser of "a" was seen;
+    # "c" and "d" aren't indexed yet
+    registry_secrets.update(make_ssr("a"))
+    registry_secrets.observe_kafkauser("ADDED", kafkausers["a"])
+    registry_secrets.update(make_ssr("b"))
+    registry_names = RegistryIndex()
+    for name in "abcd":
+        registry_names.add(f"kafka/{name}")
+    monkeypatch.setattr(state, "registry_secrets", registry_secrets)
+    monkeypatch.setattr(state, "registry_names", registry_names)
+    monkeypatch.setattr(state, "partitions", ClusterPartitions())
+    monkeypatch.setattr(
+        state, "refresh_queue", CoalescingQueue(debounce=0, max_retries=0)
+    )
+
+    refreshed: List[str] = []
+
+    async def refresh_registry(*, record: Any, **kwargs: Any) -> str:
+        refreshed.append(record.name)
+        return "2"
+
+    async def roll_out_in_waves(
+        secret_versions: Dict[str, str], **kwargs: Any
+    ) -> Dict[str, str]:
+        return {name: "ready" for name in secret_versions}
+
+    monkeypatch.setattr(secretwatcher, "create_k8sclient", lambda: None)
+    monkeypatch.setattr(secretwatcher, "refresh_registry", refresh_registry)
+    monkeypatch.setattr(secretwatcher, "roll_out_in_waves", roll_out_in_waves)
+    monkeypatch.setattr(
+        secretwatcher, "get_ssr", lambda *, name, **kwargs: make_ssr(name)
+    )
+    monkeypatch.setattr(
+        secretwatcher,
+        "get_kafkauser",
+        lambda *, name, **kwargs: kafkausers[name],
+    )
+
+    cluster_ca_secret = {
+        "metadata": {
+            "name": "events-cluster-ca-cert",
+            "labels": {"strimzi.io/cluster": "events"},
+        },
+        "data": {"ca.crt": base64.b64encode(b"events-ca").decode()},
+    }
+    asyncio.run(
+        secretwatcher.refresh_with_new_cluster_ca(
+            cluster_ca_secret=cluster_ca_secret,
+            namespace="kafka",
+            logger=logging.getLogger(__name__),
+        )
+    )
+
+    assert sorted(refreshed) == ["a", "d"]
+    # The KafkaUsers that were read are now indexed
+    alerts = registry_secrets.for_cluster("kafka", "alerts")
+    assert [record.name for record in alerts] == ["b", "c"]
+    assert state.partitions.get("kafka", "events").rotations == 1
+
+
+def test_cluster_ca_refresh_skips_validated_registries(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Registries whose JKS Secret already has the CA, such as those the
+    startup warm-up validated, aren't refreshed again, but still count
+    towards the cluster's rotation.
+    """
+    registry_secrets = SecretIndex()
+    registry_names = RegistryIndex()
+    for name in "ab":
+        registry_secrets.update(make_ssr(name))
+        registry_secrets.observe_kafkauser(
+            "ADDED", make_kafkauser(name, "events")
+        )
+        registry_names.add(f"kafka/{name}")
+    partitions = ClusterPartitions()
+    partitions.get("kafka", "events").record_registry(
+        "a", fingerprint("events-ca")
+    )
+    monkeypatch.setattr(state, "registry_secrets", registry_secrets)
+    monkeypatch.setattr(state, "registry_names", registry_names)
+    monkeypatch.setattr(state, "partitions", partitions)
+    monkeypatch.setattr(
+        state, "refresh_queue", CoalescingQueue(debounce=0, max_retries=0)
+    )
+
+    refreshed: List[str] = []
+
+    async def refresh_registry(*, record: Any, **kwargs: Any) -> str:
+        refreshed.append(record.name)
+        return "2"
+
+    async def roll_out_in_waves(
+        secret_versions: Dict[str, str], **kwargs: Any
+    ) -> Dict[str, str]:
+        return {name: "ready" for name in secret_versions}
+
+    monkeypatch.setattr(secretwatcher, "create_k8sclient", lambda: None)
+    monkeypatch.setattr(secretwatcher, "refresh_registry", refresh_registry)
+    monkeypatch.setattr(secretwatcher, "roll_out_in_waves", roll_out_in_waves)
+
+    cluster_ca_secret = {
+        "metadata": {
+            "name": "events-cluster-ca-cert",
+            "labels": {"strimzi.io/cluster": "events"},
+        },
+        "data": {"ca.crt": base64.b64encode(b"events-ca").decode()},
+    }
+    asyncio.run(
+        secretwatcher.refresh_with_new_cluster_ca(
+            cluster_ca_secret=cluster_ca_secret,
+            namespace="kafka",
+            logger=logging.getLogger(__name__),
+        )
+    )
+
+    assert refreshed == ["b"]
+    partition = partitions.get("kafka", "events")
+    assert partition.is_registry_current("b", fingerprint("events-ca"))
+    assert partition.is_current(fingerprint("events-ca"))
+
+
+def test_client_secret_refresh_failure_is_retried(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A refresh that fails after the queue's retries raises a
+    TemporaryError, and is retried with the current KafkaUser Secret.
+    """
+    registry_secrets = SecretIndex()
+    registry_secrets.update(make_ssr("a"))
+    registry_names = RegistryIndex()
+    registry_names.add("kafka/a")
+    monkeypatch.setattr(state, "registry_secrets", registry_secrets)
+    monkeypatch.setattr(state, "registry_names", registry_names)
+    monkeypatch.setattr(
+        state, "refresh_queue", CoalescingQueue(debounce=0, max_retries=0)
+    )
+    monkeypatch.setattr(secretwatcher, "REFRESH_RETRY_DELAY", 0)
+    monkeypatch.setattr(secretwatcher, "create_k8sclient", lambda: None)
+
+    calls: List[Dict[str, Any]] = []
+
+    async def refresh_registry(**kwargs: Any) -> str:
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError("API server unavailable")
+        return "2"
+
+    monkeypatch.setattr(secretwatcher, "refresh_registry", refresh_registry)
+
+    kafkauser_secret = {
+        "metadata": {
+            "name": "a",
+            "labels": {"strimzi.io/cluster": "events"},
+        }
+    }
+
+    async def main() -> None:
+        with pytest.raises(kopf.TemporaryError):
+            await secretwatcher.refresh_with_new_client_secret(
+                kafkauser_secret=kafkauser_secret,
+                namespace="kafka",
+                logger=logging.getLogger(__name__),
+            )
+        await secretwatcher._retries["kafka/a"]
+
+    asyncio.run(main())
+
+    assert len(calls) == 2
+    assert calls[0]["client_secret"] is kafkauser_secret
+    # The retry reads the current Secret instead of the event's
+    assert "client_secret" not in calls[1]
+    assert secretwatcher._retries == {}
+
+
+def test_load_record_keeps_missing_registries(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A registry that can't be read is retried, not dropped: only the
+    delete handler and the resync decide that a registry is gone.
+    """
+    registry_names = RegistryIndex()
+    registry_names.add("kafka/a")
+    monkeypatch.setattr(state, "registry_names", registry_names)
+
+    def get_ssr(**kwargs: Any) -> Dict[str, Any]:
+        raise ApiException(status=404)
+
+    monkeypatch.setattr(secretwatcher, "get_ssr", get_ssr)
+
+    with pytest.raises(kopf.TemporaryError):
+        asyncio.run(
+            secretwatcher.load_record(
+                registry_name="a", namespace="kafka", k8s_client=None
+            )
+        )
+    assert "kafka/a" in state.registry_names
@@ -0,0 +1,209 @@
+"""Tests for the strimziregistryoperator.startup module."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from strimziregistryoperator import startup, state
+from strimziregistryoperator.partitions import ClusterPartitions
+from strimziregistryoperator.registryindex import RegistryIndex
+from strimziregistryoperator.secretindex import SecretIndex
+from strimziregistryoperator.workqueue import CoalescingQueue
+
+
+class FakeCustomObjectsApi:
+    """Serve StrimziSchemaRegistry names in pages, after some failures.
+
+    Names are ``<namespace>/<name>`` keys; plain names are in the ``events``
+    namespace.
+    """
+
+    def __init__(self, names: List[str], *, failures: int = 0) -> None:
+        self.names = [
+            name if "/" in name else f"events/{name}" for name in names
+        ]
+        self.failures = failures
+        self.calls: List[Dict[str, Any]] = []
+        self.cluster_calls = 0
+
+    def list_cluster_custom_object(
+        self, *args: Any, limit: int, **kwargs: Any
+    ) -> Dict[str, Any]:
+        self.cluster_calls += 1
+        return self.list_namespaced_custom_object(limit=limit, **kwargs)
+
+    def list_namespaced_custom_object(
+        self, *args: Any, limit: int, **kwargs: Any
+    ) -> Dict[str, Any]:
+        self.calls.append(kwargs)
+        if self.failures > 0:
+            self.failures -= 1
+            raise ApiException(status=500)
+        offset = int(kwargs.get("_continue", 0))
+        page = self.names[offset : offset + limit]
+        next_offset = offset + limit
+        return {
+            "metadata": {
+                "continue": (
+                    str(next_offset) if next_offset < len(self.names) else ""
+                )
+            },
+            "items": [
+                {
+                    "metadata": {
+                        "namespace": key.split("/")[0],
+                        "name": key.split("/")[1],
+                    }
+                }
+                for key in page
+            ],
+        }
+
+
+def test_list_registry_names(monkeypatch: pytest.MonkeyPatch) -> None:
+    api = FakeCustomObjectsApi(["a", "b", "c", "d", "e"])
+    monkeypatch.setattr(
+        startup,
+        "create_k8sclient",
+        lambda: SimpleNamespace(CustomObjectsApi=lambda: api),
+    )
+    monkeypatch.setattr(state, "namespaces", "events")
+    assert startup.list_registry_names(page_size=2) == [
+        "events/a",
+        "events/b",
+        "events/c",
+        "events/d",
+        "events/e",
+    ]
+    assert [call.get("_continue") for call in api.calls] == [None, "2", "4"]
+    assert api.cluster_calls == 0
+
+
+def test_list_registry_names_cluster_wide(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    api = FakeCustomObjectsApi(["kafka-a/a", "kafka-b/b", "kube-system/c"])
+    monkeypatch.setattr(
+        startup,
+        "create_k8sclient",
+        lambda: SimpleNamespace(CustomObjectsApi=lambda: api),
+    )
+    monkeypatch.setattr(state, "namespaces", "kafka-*")
+    assert startup.list_registry_names(page_size=2) == [
+        "kafka-a/a",
+        "kafka-b/b",
+    ]
+    assert api.cluster_calls == 2
+
+
+def test_start_operator_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    api = FakeCustomObjectsApi(["a", "b"], failures=2)
+    monkeypatch.setattr(
+        startup,
+        "create_k8sclient",
+        lambda: SimpleNamespace(CustomObjectsApi=lambda: api),
+    )
+    monkeypatch.setattr(startup, "STARTUP_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(state, "namespaces", "events")
+    monkeypatch.setattr(state, "registry_names", RegistryIndex())
+    monkeypatch.setattr(state, "startup_timings", {})
+
+    timings = asyncio.run(
+        startup.start_operator(logger=logging.getLogger(__name__))
+    )
+
+    assert sorted(state.registry_names) == ["events/a", "events/b"]
+    assert timings["attempts"] == 3
+    assert timings["registries"] == 2
+    assert timings["total"] >= timings["list"]
+
+
+def test_warm_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Warm-up reports, for each registry, whether its JKS Secret was valid,
+    repaired, or failed to load, and records the cluster CA of the valid
+    Secrets so that the startup CA event doesn't refresh them again.
+    """
+    fingerprint_annotation = (
+        "strimziregistryoperator.roundtable.lsst.codes/"
+        "clusterCaCertFingerprint"
+    )
+    secret_versions = {"a": "1", "b": "1"}
+    rollouts: List[str] = []
+    statuses: Dict[str, Dict[str, Any]] = {}
+
+    def get_ssr(*, name: str, **kwargs: Any) -> Dict[str, Any]:
+        if name == "c":
+            raise ApiException(status=404)
+        return {"metadata": {"name": name}, "spec": {}}
+
+    def get_secret(*, name: str, **kwargs: Any) -> Dict[str, Any]:
+        version = secret_versions[name[: -len("-jks")]]
+        return {"metadata": {"resourceVersion": version}}
+
+    async def get_desired_state(*, name: str, **kwargs: Any) -> Any:
+        if name == "b":
+            # The certificates changed, so the JKS Secret is rebuilt
+            secret_versions[name] = "2"
+        secret = {
+            "metadata": {
+                "resourceVersion": secret_versions[name],
+                "annotations": {fingerprint_annotation: "ca"},
+            }
+        }
+        deployment = {"spec": {"template": {"spec": {"containers": [{}]}}}}
+        return secret, deployment, {}
+
+    async def roll_out_registry(*, name: str, **kwargs: Any) -> int:
+        rollouts.append(name)
+        return 1
+
+    async def update_registry_status(
+        *, name: str, status: Dict[str, Any], **kwargs: Any
+    ) -> bool:
+        statuses[name] = status
+        return True
+
+    monkeypatch.setattr(startup, "create_k8sclient", lambda: None)
+    monkeypatch.setattr(startup, "get_ssr", get_ssr)
+    monkeypatch.setattr(startup, "get_secret", get_secret)
+    monkeypatch.setattr(startup, "get_desired_state", get_desired_state)
+    monkeypatch.setattr(
+        startup,
+        "get_kafkauser",
+        lambda **kwargs: {
+            "metadata": {"labels": {"strimzi.io/cluster": "events"}}
+        },
+    )
+    monkeypatch.setattr(startup, "roll_out_registry", roll_out_registry)
+    monkeypatch.setattr(
+        startup, "update_registry_status", update_registry_status
+    )
+    monkeypatch.setattr(state, "refresh_queue", CoalescingQueue(max_retries=0))
+    index = RegistryIndex()
+    index.sync(["events/a", "events/b", "events/c"], started=0)
+    monkeypatch.setattr(state, "registry_names", index)
+    monkeypatch.setattr(state, "startup_timings", {})
+    monkeypatch.setattr(state, "registry_secrets", SecretIndex())
+    monkeypatch.setattr(state, "partitions", ClusterPartitions())
+
+    outcomes = asyncio.run(startup.warm_up(logger=logging.getLogger(__name__)))
+
+    assert outcomes == {
+        "events/a": "valid",
+        "events/b": "repaired",
+        "events/c": "failed",
+    }
+    assert rollouts == ["b"]
+    assert statuses["b"]["jksSecretVersion"] == "2"
+    assert state.startup_timings["repaired"] == 1
+    assert state.startup_timings["warmup_failures"] == 1
+    assert state.startup_timings["warmup"] > 0
+    partition = state.partitions.get("events", "events")
+    assert partition.is_registry_current("a", "ca")
+    assert partition.is_registry_current("b", "ca")
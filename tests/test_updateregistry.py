@@ -0,0 +1,61 @@
+"""Tests for the strimziregistryoperator.handlers.updateregistry module."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+import pytest
+
+from strimziregistryoperator import state
+from strimziregistryoperator.handlers import updateregistry
+from strimziregistryoperator.registryindex import RegistryIndex
+from strimziregistryoperator.workqueue import CoalescingQueue
+
+
+def test_is_tls_change() -> None:
+    assert updateregistry.is_tls_change(
+        [("change", ("keystoreType",), "JKS", "PKCS12")]
+    )
+    assert updateregistry.is_tls_change([("add", (), None, {})])
+    assert not updateregistry.is_tls_change(
+        [("change", ("registryImageTag",), "7.2.1", "7.3.0")]
+    )
+
+
+def test_kafka_user_change_rebuilds_secret(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A new ``kafkaUser`` rebuilds the JKS Secret with the new user's
+    certificates.
+    """
+    calls: List[Dict[str, Any]] = []
+
+    async def reconcile_resources(**kwargs: Any) -> int:
+        calls.append(kwargs)
+        return 1
+
+    monkeypatch.setattr(
+        updateregistry, "reconcile_resources", reconcile_resources
+    )
+    monkeypatch.setattr(
+        state, "refresh_queue", CoalescingQueue(debounce=0, max_retries=0)
+    )
+    monkeypatch.setattr(state, "registry_names", RegistryIndex())
+
+    spec = {"listener": "tls", "kafkaUser": "shared"}
+    asyncio.run(
+        updateregistry.update_registry(
+            spec=spec,
+            diff=[("add", ("kafkaUser",), None, "shared")],
+            namespace="events",
+            name="registry",
+            logger=logging.getLogger(__name__),
+            body={"spec": spec},
+        )
+    )
+
+    assert len(calls) == 1
+    assert calls[0]["refresh_secret"] is True
+    assert "events/registry" in state.registry_names
@@ -0,0 +1,169 @@
+"""Tests for the strimziregistryoperator.workqueue module."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import kopf
+import pytest
+
+from strimziregistryoperator.workqueue import CoalescingQueue, TokenBucket
+
+
+def test_burst_is_coalesced() -> None:
+    queue = CoalescingQueue(debounce=0.05, max_delay=1.0)
+    runs: List[Dict[str, Any]] = []
+
+    async def refresh(**kwargs: Any) -> str:
+        runs.append(kwargs)
+        return "refreshed"
+
+    async def main() -> None:
+        # A CA renewal modifies several Secrets in quick succession
+        futures = [
+            queue.submit("registry", refresh, cluster_ca="ca-1"),
+            queue.submit("registry", refresh, client="client-1"),
+            queue.submit("registry", refresh, cluster_ca="ca-2"),
+            queue.submit("other", refresh, cluster_ca="ca-2"),
+        ]
+        assert await asyncio.gather(*futures) == ["refreshed"] * 4
+        await queue.join()
+
+    asyncio.run(main())
+
+    # One run per key, with the latest inputs
+    assert sorted(runs, key=len) == [
+        {"cluster_ca": "ca-2"},
+        {"cluster_ca": "ca-2", "client": "client-1"},
+    ]
+    assert queue.stats() == {
+        "pending": 0,
+        "running": 0,
+        "submitted": 4,
+        "collapsed": 2,
+        "runs": 2,
+        "failures": 0,
+        "retries": 0,
+        "cancelled": 0,
+        "throttled": 0,
+    }
+
+
+def test_max_delay_and_failures() -> None:
+    queue = CoalescingQueue(debounce=0.05, max_delay=0.1, max_retries=0)
+    runs = []
+
+    async def refresh() -> None:
+        runs.append(1)
+        raise RuntimeError("boom")
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        future = queue.submit("registry", refresh)
+        # Keep submitting faster than the debounce window
+        while not future.done():
+            queue.submit("registry", refresh)
+            await asyncio.sleep(0.01)
+        # The burst can't postpone the work past max_delay
+        assert loop.time() - start < 0.5
+        with pytest.raises(RuntimeError):
+            await future
+        await queue.join()
+
+    asyncio.run(main())
+    assert queue.failures >= 1
+    assert queue.runs == len(runs)
+
+
+def test_one_run_in_flight_per_group() -> None:
+    queue = CoalescingQueue(debounce=0, max_concurrency=4)
+    running: List[str] = []
+    overlaps = []
+
+    async def work(name: str) -> None:
+        if running:
+            overlaps.append((running[0], name))
+        running.append(name)
+        await asyncio.sleep(0.05)
+        running.remove(name)
+
+    async def main() -> None:
+        # Deploying and refreshing the same registry never overlap
+        await asyncio.gather(
+            queue.submit("registry/create", work, group="registry", name="a"),
+            queue.submit("registry", work, name="b"),
+        )
+
+    asyncio.run(main())
+    assert overlaps == []
+    assert queue.runs == 2
+
+
+def test_retry_with_backoff() -> None:
+    queue = CoalescingQueue(
+        debounce=0, max_retries=3, backoff_base=0.01, backoff_max=0.02
+    )
+    attempts = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("API server unavailable")
+        return "done"
+
+    async def permanent() -> None:
+        raise kopf.PermanentError("invalid spec")
+
+    async def main() -> None:
+        assert await queue.submit("registry", flaky) == "done"
+        with pytest.raises(kopf.PermanentError):
+            await queue.submit("other", permanent)
+
+    asyncio.run(main())
+    assert len(attempts) == 3
+    assert queue.retries == 2
+    # Permanent errors aren't retried
+    assert queue.failures == 3
+
+
+def test_cancel_group() -> None:
+    queue = CoalescingQueue(debounce=0.05)
+    runs: List[str] = []
+
+    async def work(name: str) -> None:
+        runs.append(name)
+
+    async def main() -> None:
+        deleted = [
+            queue.submit("registry", work, name="a"),
+            queue.submit("registry/update", work, group="registry", name="b"),
+        ]
+        kept = queue.submit("other", work, name="c")
+        assert queue.cancel("registry") == 2
+        for future in deleted:
+            with pytest.raises(kopf.PermanentError):
+                await future
+        await kept
+        await queue.join()
+
+    asyncio.run(main())
+    assert runs == ["c"]
+    assert queue.stats()["cancelled"] == 2
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=100, burst=2)
+
+    async def main() -> float:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(4):
+            await bucket.acquire()
+        return loop.time() - start
+
+    elapsed = asyncio.run(main())
+    # Two tokens are available at once, and the others take 10 ms each
+    assert bucket.throttled == 2
+    assert elapsed >= 0.015